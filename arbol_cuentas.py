@@ -0,0 +1,140 @@
+# arbol_cuentas.py
+#
+# Jerarquía del plan de cuentas. Los códigos AB-CD-EFG cuelgan del primer
+# código existente entre AB-CD-000, AB-C0-000, AB-00-000 y A0-00-000
+# (así 12-31-010 sube a 12-30-000 aunque falte 12-31-000).
+#
+# Balance: los totales (debe, haber) de cada cuenta del mayor se acumulan
+# hacia todos sus ancestros en una sola pasada de hojas a raíces, y
+# después cada partida nueva o descontada sólo recorre su línea de
+# ancestros.
+
+import mayor
+from storage import load_plan_cuentas, version_archivo, PLAN_FILE
+
+
+def candidatos_padre(codigo):
+    """Posibles padres de `codigo`, del más cercano al más lejano."""
+    partes = str(codigo).strip().split('-')
+    if len(partes) != 3 or len(partes[0]) != 2 or len(partes[1]) != 2:
+        return []
+    a, b, _ = partes
+    return [f'{a}-{b}-000', f'{a}-{b[0]}0-000', f'{a}-00-000', f'{a[0]}0-00-000']
+
+
+class ArbolCuentas:
+    """Índice padre / hijos / nivel de un plan [(codigo, nombre), ...]."""
+
+    def __init__(self, plan):
+        self.nombres = {}
+        for codigo, nombre in plan:
+            self.nombres.setdefault(str(codigo).strip(), nombre)
+        self.padre = {c: self._buscar_padre(c) for c in self.nombres}
+        self.hijos = {c: [] for c in self.nombres}
+        self.raices = []
+        for c in sorted(self.nombres):
+            p = self.padre[c]
+            (self.hijos[p] if p else self.raices).append(c)
+        self.nivel = {}
+        for c in sorted(self.nombres):
+            self.nivel[c] = len(self.ancestros(c))
+        # De hojas a raíces: cada cuenta antes que su padre
+        self.de_hojas_a_raices = sorted(self.nombres, key=lambda c: -self.nivel[c])
+
+    def _buscar_padre(self, codigo):
+        for candidato in candidatos_padre(codigo):
+            if candidato != codigo and candidato in self.nombres:
+                return candidato
+        return None
+
+    def ancestros(self, codigo):
+        """Padre, abuelo, ... de `codigo` (que puede no estar en el plan)."""
+        codigo = str(codigo).strip()
+        p = self.padre[codigo] if codigo in self.nombres else self._buscar_padre(codigo)
+        linea = []
+        while p:
+            linea.append(p)
+            p = self.padre[p]
+        return linea
+
+    def recorrer(self):
+        """Códigos en orden de árbol (cada cuenta seguida de sus hijas)."""
+        pila = list(reversed(self.raices))
+        while pila:
+            c = pila.pop()
+            yield c
+            pila.extend(reversed(self.hijos[c]))
+
+
+class Balance:
+    """
+    Totales [debe, haber] de cada cuenta incluyendo los de todas sus
+    descendientes. Se mantiene al día suscripto a las partidas del mayor.
+    """
+
+    def __init__(self, arbol, totales):
+        self.arbol = arbol
+        self.reiniciar(totales)
+
+    def reiniciar(self, totales):
+        acumulado = {}
+        for cuenta, (debe, haber) in totales.items():
+            if cuenta not in self.arbol.nombres:
+                # Cuentas usadas que no están en el plan: se suman a su
+                # ancestro más cercano y desde ahí suben con el resto
+                acumulado[cuenta] = [debe, haber]
+                ancestros = self.arbol.ancestros(cuenta)
+                if ancestros:
+                    t = acumulado.setdefault(ancestros[0], [0, 0])
+                    t[0] += debe
+                    t[1] += haber
+        for c in self.arbol.de_hojas_a_raices:
+            propio = totales.get(c, (0, 0))
+            t = acumulado.setdefault(c, [0, 0])
+            t[0] += propio[0]
+            t[1] += propio[1]
+            p = self.arbol.padre[c]
+            if p:
+                tp = acumulado.setdefault(p, [0, 0])
+                tp[0] += t[0]
+                tp[1] += t[1]
+        self.acumulado = acumulado
+
+    def mover(self, cuenta, debe, haber):
+        for c in [cuenta] + self.arbol.ancestros(cuenta):
+            t = self.acumulado.setdefault(c, [0, 0])
+            t[0] += debe
+            t[1] += haber
+
+    def sumas_y_saldos(self, con_movimiento=True):
+        """
+        Filas (codigo, nombre, nivel, debe, haber, saldo deudor, saldo
+        acreedor) del plan completo en orden de árbol.
+        """
+        filas = []
+        for c in self.arbol.recorrer():
+            debe, haber = self.acumulado.get(c, (0, 0))
+            if con_movimiento and not debe and not haber:
+                continue
+            saldo = debe - haber
+            filas.append((c, self.arbol.nombres[c], self.arbol.nivel[c], debe, haber,
+                          max(saldo, 0), max(-saldo, 0)))
+        return filas
+
+
+_balance = None
+_version_plan = None
+
+
+def obtener_balance():
+    """Balance compartido: al día con el mayor y rearmado si cambió el plan."""
+    global _balance, _version_plan
+    m = mayor.obtener()
+    version = version_archivo(PLAN_FILE)
+    if _balance is None or version != _version_plan:
+        if _balance is not None:
+            m.desuscribir(_balance)
+        _balance = Balance(ArbolCuentas(load_plan_cuentas()), m.totales)
+        _version_plan = version
+        m.suscribir(_balance)
+    return _balance
@@ -0,0 +1,240 @@
+# asientos.py
+#
+# Libro diario: cada cobro y cada pago se convierte en un asiento de
+# partida doble con las mismas partidas que usa el mayor (mayor.py):
+# debe en las cuentas A/B, haber en las imputaciones 1-3 y las líneas de
+# impuestos. Sólo se graban asientos balanceados (debe == haber); los que
+# no cierran se informan para corregir el registro.
+#
+# data/asientos.txt guarda una línea por partida:
+#   (fecha 'DD/MM/AAAA', tipo, id, cuenta, debe, haber, detalle)
+# y data/_asientos_estado.txt la versión de cobros.txt / pagos.txt hasta
+# donde se convirtió y la tabla de tasas de cobros con la que se hizo (el
+# reparto de IIBB y DByCR entre las cuentas A y B depende de ella).
+# actualizar() convierte sólo lo agregado desde la última vez; si un
+# archivo se reescribió (edición o borrado) se regenera todo en una pasada.
+# Si cambió la tabla de tasas se rehacen sólo los asientos de los cobros
+# del archivo vivo fechados desde el primer día en que cambia alguna tasa,
+# como en el mayor: los de meses cerrados (archivados) quedan como estaban.
+# regenerar(anio) rehace sólo los asientos de un año.
+
+import os
+import ast
+import csv
+
+import tasas
+from mayor import FUENTES
+from fechas import parse_fecha
+from money import a_pesos
+from storage import ensure_data_directory, version_archivo, leer_desde, leer_vivos, TAX_COBROS_FILE
+
+ASIENTOS_FILE = 'asientos.txt'
+ESTADO_FILE = '_asientos_estado.txt'
+
+
+def asiento(filename, registro, tbl=None):
+    """
+    Líneas (fecha, tipo, id, cuenta, debe, haber, detalle) de un registro.
+    `tbl` es el tasas.IndiceTasas de cobros (por defecto, el actual).
+    """
+    tipo, partidas_de, campo_detalle = FUENTES[filename]
+    fecha = str(registro.fecha).strip()
+    detalle = getattr(registro, campo_detalle)
+    partidas = partidas_de(registro, tbl) if tipo == 'cobro' else partidas_de(registro)
+    return [(fecha, tipo, registro.id, cuenta, debe, haber, detalle)
+            for cuenta, debe, haber in partidas]
+
+
+def validar(lineas):
+    """Devuelve '' si el asiento es válido o el motivo por el que no lo es."""
+    if not lineas:
+        return 'sin importes'
+    if parse_fecha(lineas[0][0]) is None:
+        return f'fecha inválida {lineas[0][0]!r}'
+    debe = sum(l[4] for l in lineas)
+    haber = sum(l[5] for l in lineas)
+    if debe != haber:
+        return f'no balancea: debe {a_pesos(debe)} / haber {a_pesos(haber)}'
+    return ''
+
+
+def _convertir(filename, registros, anio=None, tbl=None):
+    """
+    (líneas válidas, [(tipo, id, motivo), ...]) de `registros`
+    (opcionalmente de un año), con la tabla de tasas de cobros `tbl`.
+    """
+    lineas, descuadrados = [], []
+    if tbl is None:
+        tbl = tasas.obtener(TAX_COBROS_FILE)
+    for r in registros:
+        if anio is not None:
+            f = parse_fecha(r.fecha)
+            if f is None or f.year != anio:
+                continue
+        asi = asiento(filename, r, tbl)
+        motivo = validar(asi)
+        if motivo:
+            descuadrados.append((FUENTES[filename][0], r.id, motivo))
+        else:
+            lineas.extend(asi)
+    return lineas, descuadrados
+
+
+def _path(nombre):
+    return os.path.join(ensure_data_directory(), nombre)
+
+
+def _leer_estado():
+    path = _path(ESTADO_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        contenido = f.read().strip()
+    return ast.literal_eval(contenido) if contenido else {}
+
+
+def _grabar_estado(estado):
+    with open(_path(ESTADO_FILE), 'w', encoding='utf-8') as f:
+        f.write(repr(estado) + "\n")
+
+
+def leer_asientos():
+    """Recorre las líneas del diario sin cargarlo entero."""
+    path = _path(ASIENTOS_FILE)
+    if not os.path.exists(path):
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for l in f:
+            if l.strip():
+                yield ast.literal_eval(l)
+
+
+def _agregar(lineas):
+    with open(_path(ASIENTOS_FILE), 'a', encoding='utf-8') as f:
+        for l in lineas:
+            f.write(repr(l) + "\n")
+
+
+def actualizar():
+    """
+    Convierte los cobros y pagos agregados desde la última vez. Devuelve
+    (cantidad de líneas grabadas, descuadrados).
+    """
+    estado = _leer_estado()
+    if TAX_COBROS_FILE not in estado:
+        return regenerar()
+    for filename in FUENTES:
+        generacion, tam = version_archivo(filename)
+        if filename not in estado:
+            return regenerar()
+        gen_previa, offset = estado[filename]
+        if gen_previa != generacion or tam < offset:
+            return regenerar()
+
+    actual = tasas.obtener(TAX_COBROS_FILE)
+    if estado[TAX_COBROS_FILE] == actual.filas:
+        tbl = actual
+    else:
+        # Las altas van con la tabla de los demás asientos; después se
+        # cambia de tabla para todos juntos
+        tbl = tasas.IndiceTasas(estado[TAX_COBROS_FILE], tasas.DEFECTO[TAX_COBROS_FILE])
+    total, descuadrados = 0, []
+    for filename in FUENTES:
+        generacion, _ = version_archivo(filename)
+        _, offset = estado[filename]
+        registros, offset = leer_desde(filename, offset)
+        lineas, malos = _convertir(filename, registros, tbl=tbl)
+        _agregar(lineas)
+        total += len(lineas)
+        descuadrados += malos
+        estado[filename] = (generacion, offset)
+
+    desde = tasas.primer_cambio(tbl, actual) if tbl is not actual else None
+    if desde is not None:
+        registros, offset = leer_vivos('cobros.txt')
+        if offset != estado['cobros.txt'][1]:
+            return regenerar()
+        afectados = [c for c in registros
+                     if parse_fecha(c.fecha) and parse_fecha(c.fecha).toordinal() >= desde]
+        lineas, malos = _convertir('cobros.txt', afectados, tbl=actual)
+        _reemplazar_cobros({c.id for c in afectados}, lineas)
+        descuadrados += malos
+    estado[TAX_COBROS_FILE] = actual.filas
+    _grabar_estado(estado)
+    return total, descuadrados
+
+
+def _reemplazar_cobros(ids, lineas):
+    """Cambia las líneas de los cobros `ids` en el diario por `lineas`."""
+    path = _path(ASIENTOS_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as out:
+        for l in leer_asientos():
+            if not (l[1] == 'cobro' and l[2] in ids):
+                out.write(repr(l) + "\n")
+        for l in lineas:
+            out.write(repr(l) + "\n")
+    os.replace(tmp, path)
+
+
+def regenerar(anio=None):
+    """
+    Rehace el diario en una pasada por cobros y pagos: completo, o sólo el
+    año `anio` (se conservan las líneas de los demás años). Devuelve
+    (cantidad de líneas grabadas, descuadrados).
+    """
+    conservar = []
+    if anio is not None:
+        # Los demás años tienen que estar al día antes de conservarlos; se
+        # copian como texto, mirando sólo la fecha (primer campo de la línea)
+        actualizar()
+        path = _path(ASIENTOS_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                conservar = [l for l in f
+                             if l.strip() and parse_fecha(l.split("'", 2)[1]).year != anio]
+
+    estado, nuevas, descuadrados = {TAX_COBROS_FILE: tasas.obtener(TAX_COBROS_FILE).filas}, [], []
+    for filename in FUENTES:
+        generacion, _ = version_archivo(filename)
+        registros, offset = leer_desde(filename, 0)
+        lineas, malos = _convertir(filename, registros, anio)
+        nuevas += lineas
+        descuadrados += malos
+        estado[filename] = (generacion, offset)
+
+    tmp = _path(ASIENTOS_FILE) + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.writelines(conservar)
+        for l in nuevas:
+            f.write(repr(l) + "\n")
+    os.replace(tmp, _path(ASIENTOS_FILE))
+    _grabar_estado(estado)
+    return len(nuevas), descuadrados
+
+
+def exportar_csv(ruta_csv, desde=None, hasta=None):
+    """
+    Exporta el diario (entre las fechas `desde` y `hasta`, datetime.date,
+    inclusive) ordenado por fecha, numerando los asientos. Devuelve la
+    cantidad de asientos exportados.
+    """
+    lineas = []
+    for l in leer_asientos():
+        f = parse_fecha(l[0])
+        if (desde and f < desde) or (hasta and f > hasta):
+            continue
+        lineas.append((f, l))
+    lineas.sort(key=lambda x: (x[0], x[1][1], x[1][2]))
+
+    numero, actual = 0, None
+    with open(ruta_csv, 'w', encoding='utf-8', newline='') as out:
+        w = csv.writer(out)
+        w.writerow(['Asiento', 'Fecha', 'Origen', 'ID', 'Cuenta', 'Debe', 'Haber', 'Detalle'])
+        for _, (fecha, tipo, id_reg, cuenta, debe, haber, detalle) in lineas:
+            if (tipo, id_reg) != actual:
+                numero += 1
+                actual = (tipo, id_reg)
+            w.writerow([numero, fecha, tipo, id_reg, cuenta,
+                        a_pesos(debe), a_pesos(haber), detalle])
+    return numero
@@ -0,0 +1,115 @@
+# cache_reportes.py
+#
+# Caché en disco de resultados de reportes. La clave de cada resultado es
+# (nombre del reporte, parámetros, versión de cada archivo del que depende)
+# con las versiones de storage.version_archivo: cualquier alta cambia el
+# tamaño y cualquier edición o borrado cambia la generación, así que un
+# resultado sólo se reutiliza si ninguno de sus archivos cambió. Las
+# entradas viejas no se borran al invalidarse: dejan de encontrarse y las
+# descarta el límite LRU.
+#
+# Cada entrada es un pickle en data/_cache_reportes/ cuyo nombre es el hash
+# de la clave. La fecha de modificación del archivo hace de "último uso":
+# se actualiza en cada acierto y al superar MAX_ENTRADAS o MAX_BYTES se
+# borran las menos usadas.
+
+import os
+import pickle
+import hashlib
+
+from storage import ensure_data_directory, version_archivo
+
+CACHE_DIR = '_cache_reportes'
+MAX_ENTRADAS = 200
+MAX_BYTES = 64 * 1024 * 1024
+
+_SIN_RESULTADO = object()
+
+
+def _directorio():
+    path = os.path.join(ensure_data_directory(), CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def clave(nombre, parametros, dependencias):
+    """Clave del resultado: incluye la versión actual de cada dependencia."""
+    return (nombre, tuple(parametros), tuple((d, version_archivo(d)) for d in dependencias))
+
+
+def _path(k):
+    return os.path.join(_directorio(), hashlib.sha1(repr(k).encode('utf-8')).hexdigest() + '.pkl')
+
+
+def _leer(k):
+    path = _path(k)
+    try:
+        with open(path, 'rb') as f:
+            guardada, resultado = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, AttributeError, ImportError):
+        return _SIN_RESULTADO
+    if guardada != k:
+        return _SIN_RESULTADO
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return resultado
+
+
+def _grabar(k, resultado):
+    path = _path(k)
+    tmp = path + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump((k, resultado), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except (OSError, pickle.PicklingError):
+        # Un reporte que no se puede guardar se recalcula la próxima vez
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    podar()
+
+
+def podar(max_entradas=MAX_ENTRADAS, max_bytes=MAX_BYTES):
+    """Borra las entradas menos usadas hasta quedar dentro de los límites."""
+    directorio = _directorio()
+    entradas = []
+    for nombre in os.listdir(directorio):
+        if not nombre.endswith('.pkl'):
+            continue
+        try:
+            st = os.stat(os.path.join(directorio, nombre))
+        except OSError:
+            continue
+        entradas.append((st.st_mtime_ns, st.st_size, nombre))
+    entradas.sort(reverse=True)
+    total = 0
+    for i, (_, tam, nombre) in enumerate(entradas):
+        total += tam
+        if i >= max_entradas or total > max_bytes:
+            try:
+                os.remove(os.path.join(directorio, nombre))
+            except OSError:
+                pass
+
+
+def cacheado(nombre, parametros, dependencias, calcular):
+    """
+    Devuelve el resultado de `calcular()` para el reporte `nombre` con
+    `parametros` (tupla de valores con repr estable: textos, números,
+    fechas), reutilizando el guardado si ninguno de los archivos de
+    `dependencias` cambió desde que se calculó.
+    """
+    k = clave(nombre, parametros, dependencias)
+    resultado = _leer(k)
+    if resultado is _SIN_RESULTADO:
+        resultado = calcular()
+        _grabar(k, resultado)
+    return resultado
+
+
+def vaciar():
+    """Borra todas las entradas."""
+    podar(0, 0)
@@ -0,0 +1,238 @@
+# cierre.py
+#
+# Cierre de períodos. Cerrar un mes 'AAAA-MM' graba un resumen inmutable
+# en data/resumenes/AAAA-MM.txt con los totales del mes:
+#   'cuentas':     cuenta → (debe, haber)            (partidas del mayor)
+#   'impuestos':   (cuenta, impuesto) → centavos     (reporte_impuestos)
+#   'clientes':    pagador (normalizado) → total imputado de sus cobros
+#   'proveedores': razón social (normalizada) → monto neto de sus pagos
+# y lo anota en data/cierres.txt. Desde ese momento los cobros y pagos del
+# mes no se pueden agregar, editar ni borrar (verificar() lanza
+# ValueError) hasta que se reabra el mes, lo que borra su resumen.
+#
+# Los acumulados (por ejemplo, del año) leen el resumen de cada mes
+# cerrado y calculan sólo los meses abiertos.
+#
+# Al cerrar, los registros del mes se archivan comprimidos fuera de
+# cobros.txt / pagos.txt (storage.archivar) y al reabrir vuelven. Antes de
+# mover líneas se ponen al día todos los lectores incrementales (mayor,
+# reporte de impuestos, snapshots, índices y libro diario), que así no
+# tienen que reconstruirse.
+
+import os
+import ast
+import datetime
+
+import mayor
+import indices
+import asientos
+import columnar
+import reporte_impuestos
+from columnar import np
+from fechas import periodo, formatear_fecha
+from storage import ensure_data_directory, rewrite_tuples, archivar, desarchivar, terminar_ultima_linea
+
+CIERRES_FILE = 'cierres.txt'
+RESUMENES_DIR = 'resumenes'
+ARCHIVADOS = ('cobros.txt', 'pagos.txt')
+
+
+def _path(nombre):
+    return os.path.join(ensure_data_directory(), nombre)
+
+
+def _path_resumen(mes):
+    return os.path.join(ensure_data_directory(), RESUMENES_DIR, f'{mes}.txt')
+
+
+def _validar_mes(mes):
+    try:
+        datetime.datetime.strptime(mes, '%Y-%m')
+    except (TypeError, ValueError):
+        raise ValueError(f'Período inválido: {mes!r} (AAAA-MM).')
+
+
+def cierres():
+    """Lista de (mes 'AAAA-MM', fecha de cierre 'DD/MM/AAAA'), ordenada por mes."""
+    path = _path(CIERRES_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted(ast.literal_eval(l) for l in f if l.strip())
+
+
+def meses_cerrados():
+    return {mes for mes, _ in cierres()}
+
+
+def verificar(registros, cerrados=None):
+    """
+    Lanza ValueError si algún registro (cobro o pago) tiene fecha en un
+    mes cerrado. Los registros sin fecha (clientes, proveedores) no se
+    controlan.
+    """
+    cerrados = meses_cerrados() if cerrados is None else cerrados
+    if not cerrados:
+        return
+    for r in registros:
+        if not hasattr(r, 'fecha'):
+            continue
+        mes = periodo(r.fecha)
+        if mes in cerrados:
+            raise ValueError(f'El período {mes} está cerrado (registro con fecha {r.fecha}). '
+                             'Hay que reabrirlo para modificarlo.')
+
+
+# — Resúmenes ———————————————————————————
+
+def _limites(mes):
+    """Días ordinales del primero y el último día de `mes`."""
+    anio, m = map(int, mes.split('-'))
+    ini = datetime.date(anio, m, 1)
+    fin = datetime.date(anio + m // 12, m % 12 + 1, 1) - datetime.timedelta(days=1)
+    return ini.toordinal(), fin.toordinal()
+
+
+def _por_texto(filename, campo, importes, mes):
+    """{texto normalizado: centavos} de los registros de `filename` en `mes`."""
+    snap = columnar.obtener(filename)
+    if not len(snap):
+        return {}
+    mascara = snap['fecha'].astype('datetime64[M]') == np.datetime64(mes, 'M')
+    total = sum(snap[c] for c in importes)
+    codigos = snap[campo][mascara]
+    etiquetas = snap.textos[campo].valores
+    sumas = columnar.sumar_por_grupo(codigos, total[mascara], len(etiquetas))
+    return {etiquetas[c]: int(sumas[c]) for c in np.unique(codigos) if sumas[c]}
+
+
+def calcular_resumen(mes):
+    """Resumen del mes calculado desde los datos (esté o no cerrado)."""
+    _validar_mes(mes)
+    if not columnar.HAY_NUMPY:
+        raise RuntimeError('El cierre de períodos necesita NumPy.')
+    ini, fin = _limites(mes)
+    cuentas = {}
+    for cuenta, dias in mayor.obtener().saldos.items():
+        debe = haber = 0
+        for dia, (d, h) in dias.items():
+            if ini <= dia <= fin:
+                debe += d
+                haber += h
+        if debe or haber:
+            cuentas[cuenta] = (debe, haber)
+
+    impuestos = {}
+    for meses in reporte_impuestos.obtener().meses.values():
+        for clave, importe in meses.get(mes, {}).items():
+            impuestos[clave] = impuestos.get(clave, 0) + importe
+
+    return {
+        'mes': mes,
+        'cuentas': cuentas,
+        'impuestos': impuestos,
+        'clientes': _por_texto('cobros.txt', 'nombreCompleto',
+                               ('importeBruto1', 'importeBruto2', 'importeBruto3'), mes),
+        'proveedores': _por_texto('pagos.txt', 'razonSocial', ('montoNeto',), mes),
+    }
+
+
+def resumen(mes):
+    """Resumen del mes: el grabado si está cerrado, si no calculado."""
+    path = _path_resumen(mes)
+    if mes in meses_cerrados() and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return ast.literal_eval(f.read())
+    return calcular_resumen(mes)
+
+
+def _sumar(destino, origen):
+    for clave, valor in origen.items():
+        if isinstance(valor, tuple):
+            previo = destino.get(clave, (0,) * len(valor))
+            destino[clave] = tuple(a + b for a, b in zip(previo, valor))
+        else:
+            destino[clave] = destino.get(clave, 0) + valor
+
+
+def acumulado(desde, hasta):
+    """
+    Suma de los resúmenes de los meses 'AAAA-MM' entre `desde` y `hasta`
+    (inclusive), con las mismas claves que un resumen más 'meses'.
+    """
+    _validar_mes(desde)
+    _validar_mes(hasta)
+    total = {'meses': [], 'cuentas': {}, 'impuestos': {}, 'clientes': {}, 'proveedores': {}}
+    anio, m = map(int, desde.split('-'))
+    mes = desde
+    while mes <= hasta:
+        r = resumen(mes)
+        total['meses'].append(mes)
+        for parte in ('cuentas', 'impuestos', 'clientes', 'proveedores'):
+            _sumar(total[parte], r[parte])
+        anio, m = anio + m // 12, m % 12 + 1
+        mes = f'{anio:04d}-{m:02d}'
+    return total
+
+
+def acumulado_anual(anio, hasta_mes=12):
+    """Acumulado de enero a `hasta_mes` de `anio`."""
+    return acumulado(f'{anio:04d}-01', f'{anio:04d}-{hasta_mes:02d}')
+
+
+# — Cerrar / reabrir ——————————————————————
+
+def _poner_al_dia():
+    """Lleva a todos los lectores incrementales hasta el final de los archivos."""
+    for filename in ARCHIVADOS:
+        terminar_ultima_linea(filename)
+    mayor.obtener()
+    reporte_impuestos.obtener()
+    for filename in ARCHIVADOS:
+        columnar.obtener(filename)
+        indices.obtener(filename)
+    asientos.actualizar()
+
+
+def cerrar(mes, hoy=None):
+    """
+    Cierra `mes` ('AAAA-MM'): graba su resumen, lo anota como cerrado y
+    archiva sus cobros y pagos. Sólo se pueden cerrar meses ya
+    terminados. Devuelve el resumen.
+    """
+    _validar_mes(mes)
+    hoy = hoy or datetime.date.today()
+    if mes >= f'{hoy.year:04d}-{hoy.month:02d}':
+        raise ValueError(f'El período {mes} todavía no terminó.')
+    if mes in meses_cerrados():
+        raise ValueError(f'El período {mes} ya está cerrado.')
+
+    datos = calcular_resumen(mes)
+    path = _path_resumen(mes)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(repr(datos) + "\n")
+    os.replace(tmp, path)
+    with open(_path(CIERRES_FILE), 'a', encoding='utf-8') as f:
+        f.write(repr((mes, formatear_fecha(hoy))) + "\n")
+    _poner_al_dia()
+    for filename in ARCHIVADOS:
+        archivar(filename, mes)
+    return datos
+
+
+def reabrir(mes):
+    """
+    Vuelve a abrir `mes`: devuelve sus registros al archivo vivo, borra su
+    resumen y permite modificarlos.
+    """
+    if mes not in meses_cerrados():
+        raise ValueError(f'El período {mes} no está cerrado.')
+    _poner_al_dia()
+    for filename in ARCHIVADOS:
+        desarchivar(filename, mes)
+    rewrite_tuples(CIERRES_FILE, [c for c in cierres() if c[0] != mes])
+    path = _path_resumen(mes)
+    if os.path.exists(path):
+        os.remove(path)
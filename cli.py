@@ -1,17 +1,41 @@
 import os
-import ast
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import datetime
+import multiprocessing
 
 from model import cobro, pago, cliente
+from fechas import parse_fecha
+from money import a_centavos, a_pesos, PCT_IVA
+from impuestos import (
+    impuestos_cobro, impuestos_pago, calcular_cobro, calcular_pago, tasas_cobro, tasa_pago,
+)
+import indices
+import mayor
+import arbol_cuentas
+import reporte_impuestos
+import estado_cuenta
+import expensas
+import asientos
+import flujo_caja
+import pivot
+import cierre
+import recibos
+import tasas
+import recalculo
+from import_movimientos import (
+    importar_movimientos_desde_csv, CUENTA_COBROS_DEFECTO, CUENTA_PAGOS_DEFECTO
+)
+from conciliacion import conciliar_extracto
+from exportar import exportar as exportar_registros
 from storage import (
     save_cobros, save_pagos, save_clients,
-    load_plan_cuentas, load_tax_cobros, save_tax_cobros,
-    load_tax_pagos, save_tax_pagos,
+    load_records, load_clients,
+    load_plan_cuentas, load_tax_historial, save_tax_cobros, save_tax_pagos,
+    TAX_COBROS_FILE, TAX_PAGOS_FILE,
     save_plan_cuentas,
     get_next_cobro_id, get_next_pago_id, get_next_clients_id,
-    ensure_data_directory
+    ensure_data_directory, rewrite_tuples
 )
 
 BRANCH_CODE = "0001"
@@ -50,38 +74,61 @@ class PlaceholderEntry(ttk.Entry):
             self.configure(foreground="black")
             self._ph_visible = False
 
-# Lectura genérica de registros
-def read_records(path):
-    if not os.path.exists(path):
-        return []
-    with open(path, 'r', encoding='utf-8') as f:
-        return [ast.literal_eval(line) for line in f if line.strip()]
-
 def overwrite_records(path, lista_registros):
     """
     Reescribe completamente el archivo `path` con la lista de tuplas `lista_registros`.
     Cada elemento de lista_registros debe ser una tupla (o lista) que represente
     exactamente el record a guardar (igual que hace save_cobros o save_pagos).
+    Cambia la generación del archivo, así que los reportes cacheados que
+    dependen de él se recalculan.
+    """
+    rewrite_tuples(os.path.basename(path), lista_registros)
+
+
+def confirmar_duplicados(filename, registro):
+    """
+    Si `registro` coincide con otro ya grabado (ver indices.py), pregunta
+    si se quiere guardar igual. Devuelve True si se puede guardar.
     """
-    with open(path, 'w', encoding='utf-8') as f:
-        for r in lista_registros:
-            f.write(repr(r) + "\n")
+    dups = indices.obtener(filename).duplicados(registro)
+    if not dups:
+        return True
+    detalle = '\n'.join(f'- mismo {motivo} que el ID {id_existente}' for motivo, id_existente in dups)
+    return messagebox.askyesno('Posible duplicado', f'Ya hay un registro parecido:\n{detalle}\n\n¿Guardar igual?')
+
+
+def fecha_vigencia(texto):
+    """Fecha de vigencia de una tasa: 'DD/MM/AAAA' o '' (sin límite)."""
+    texto = str(texto).strip()
+    if texto and parse_fecha(texto) is None:
+        raise ValueError(f'Fecha inválida: {texto!r} (DD/MM/AAAA).')
+    return texto
+
+
+def valores_para_mostrar(registro):
+    """Tupla del registro con los importes (centavos) formateados en pesos."""
+    importes = type(registro).IMPORTES
+    return tuple(
+        a_pesos(getattr(registro, campo)) if campo in importes else getattr(registro, campo)
+        for campo in registro.__slots__
+    )
 
 
 def filter_rows(lista_registros, filtros):
     """
-    Dada la lista completa de registros (lista de tuplas) y un diccionario `filtros`
-    donde la clave es el índice de columna (0, 1, 2, ...) y el valor es la cadena
-    de filtro (se busca substring, case-insensitive),
-    retorna solo aquellas filas que coincidan en todas las columnas filtradas.
+    Dada la lista completa de registros (cobro, pago o cliente) y un diccionario
+    `filtros` donde la clave es el índice de columna (0, 1, 2, ...) y el valor es
+    la cadena de filtro (se busca substring, case-insensitive),
+    retorna solo aquellos registros que coincidan en todas las columnas filtradas.
     """
     resultado = []
     for row in lista_registros:
+        valores = valores_para_mostrar(row)
         match = True
         for col_idx, texto in filtros.items():
             if texto.strip() == "":
                 continue
-            celda = str(row[col_idx])
+            celda = str(valores[col_idx])
             if texto.lower() not in celda.lower():
                 match = False
                 break
@@ -108,7 +155,7 @@ class App(tk.Tk):
         for name in [
             'cobro', 'pago', 'cliente',
             'lst_cobros', 'lst_pagos', 'lst_clientes',
-            'plan', 'tax_cobros', 'tax_pagos'
+            'plan', 'tax_cobros', 'tax_pagos', 'importar', 'conciliar', 'mayor', 'rep_impuestos', 'estado_cuenta', 'expensas', 'diario', 'flujo', 'pivot', 'cierre', 'recalculo'
         ]:
             self.frames[name] = ttk.Frame(self.content)
 
@@ -122,16 +169,26 @@ class App(tk.Tk):
         self._build_plan(self.frames['plan'])
         self._build_tax_cobros(self.frames['tax_cobros'])
         self._build_tax_pagos(self.frames['tax_pagos'])
+        self._build_importar(self.frames['importar'])
+        self._build_conciliar(self.frames['conciliar'])
+        self._build_mayor(self.frames['mayor'])
+        self._build_rep_impuestos(self.frames['rep_impuestos'])
+        self._build_estado_cuenta(self.frames['estado_cuenta'])
+        self._build_expensas(self.frames['expensas'])
+        self._build_diario(self.frames['diario'])
+        self._build_flujo(self.frames['flujo'])
+        self._build_pivot(self.frames['pivot'])
+        self._build_cierre(self.frames['cierre'])
+        self._build_recalculo(self.frames['recalculo'])
 
         # 4) Al arrancar, muestro sólo la vista "cobro"
         self._show_frame('cobro')
 
 
     def _load_data(self):
-        data_dir = ensure_data_directory()
         self.clientes = {
-            str(r[0]): r
-            for r in read_records(os.path.join(data_dir, 'clientes.txt'))
+            str(c.id): c
+            for c in load_clients()
         }
         self.plan = {
             str(pc[0]): pc[1]
@@ -155,6 +212,17 @@ class App(tk.Tk):
             ('Plan Ctas', 'plan'),
             ('Imp. Cobros', 'tax_cobros'),
             ('Imp. Pagos',  'tax_pagos'),
+            ('Importar Banco', 'importar'),
+            ('Conciliar Banco', 'conciliar'),
+            ('Libro Mayor', 'mayor'),
+            ('Impuestos x Mes', 'rep_impuestos'),
+            ('Estado Cuenta', 'estado_cuenta'),
+            ('Expensas', 'expensas'),
+            ('Libro Diario', 'diario'),
+            ('Flujo de Caja', 'flujo'),
+            ('Tablas Dinámicas', 'pivot'),
+            ('Cierre de Período', 'cierre'),
+            ('Recalcular Impuestos', 'recalculo'),
         ]
         for txt, name in pages:
             ttk.Button(
@@ -209,8 +277,7 @@ class App(tk.Tk):
         cont.pack(expand=True, fill='both')
 
         # 3) Leer registros desde disco
-        full_path = os.path.join(ensure_data_directory(), filename)
-        registros = read_records(full_path)
+        registros = load_records(filename)
         if not registros:
             ttk.Label(cont, text='No hay registros.', style='Field.TLabel')\
                 .pack(pady=20)
@@ -238,7 +305,7 @@ class App(tk.Tk):
                 'Superficie','Observaciones'
             ]
         }
-        headers = headers_map.get(filename, [f'C{i+1}' for i in range(len(registros[0]))])
+        headers = headers_map[filename]
 
         # 5) Creamos un sub-frame para la tabla y otro Canvas para la fila de
         #    filtros para que se desplace junto con el Treeview.
@@ -308,16 +375,18 @@ class App(tk.Tk):
                 tree.delete(item)
             # Insertar filas
             for row in lista_para_mostrar:
-                tree.insert('', 'end', values=row)
+                tree.insert('', 'end', values=valores_para_mostrar(row))
 
         # Llenamos inicialmente con todos los registros
         poblar_treeview(registros)
+        vista = list(registros)
 
         # 8) Función de filtrado
         def aplicar_filtros(event=None):
             filtros = {idx: ent.get() for idx, ent in filtro_entrys.items()}
             filtrados = filter_rows(registros, filtros)
             poblar_treeview(filtrados)
+            vista[:] = filtrados
 
         # Enlazamos cada Entry de filtro para que, al soltar tecla, se aplique el filtro
         for ent in filtro_entrys.values():
@@ -331,6 +400,47 @@ class App(tk.Tk):
         boton_editar = ttk.Button(btn_frame, text='Editar seleccionado', style='Big.TButton')
         boton_editar.grid(row=0, column=1, padx=5)
 
+        def exportar(todo):
+            ruta = filedialog.asksaveasfilename(
+                title='Exportar ' + ('todo' if todo else 'lo filtrado'), defaultextension='.csv',
+                filetypes=[('CSV', '*.csv'), ('Excel', '*.xlsx'), ('Parquet', '*.parquet')]
+            )
+            if not ruta:
+                return
+            try:
+                n = exportar_registros(filename, ruta, None if todo else [vista])
+            except (OSError, ValueError, RuntimeError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            messagebox.showinfo('Éxito', f'Se exportaron {n} registros.')
+
+        ttk.Button(btn_frame, text='Exportar filtrado', style='Big.TButton',
+                   command=lambda: exportar(False)).grid(row=0, column=2, padx=5)
+        ttk.Button(btn_frame, text='Exportar todo', style='Big.TButton',
+                   command=lambda: exportar(True)).grid(row=0, column=3, padx=5)
+
+        def generar_recibos():
+            # Los seleccionados o, si no hay selección, todo lo filtrado
+            ids = {str(tree.item(i, 'values')[0]) for i in tree.selection()}
+            elegidos = [r for r in vista if str(r.id) in ids] if ids else list(vista)
+            if not elegidos:
+                messagebox.showwarning('Atención', 'No hay cobros para generar recibos.')
+                return
+            directorio = filedialog.askdirectory(title='Carpeta de los recibos',
+                                                 initialdir=recibos.directorio_defecto())
+            if not directorio:
+                return
+            try:
+                rutas = recibos.generar_recibos(elegidos, directorio, sucursal=BRANCH_CODE)
+            except OSError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            messagebox.showinfo('Éxito', f'Se generaron {len(rutas)} recibos en {directorio}.')
+
+        if filename == 'cobros.txt':
+            ttk.Button(btn_frame, text='Recibos PDF', style='Big.TButton',
+                       command=generar_recibos).grid(row=0, column=4, padx=5)
+
         def eliminar_seleccionado():
             sel = tree.selection()
             if not sel:
@@ -342,9 +452,16 @@ class App(tk.Tk):
                 return
 
             # Releer archivo y filtrar por ID
-            todos = read_records(full_path)
-            nuevos = [r for r in todos if str(r[0]) != str(id_seleccion)]
-            overwrite_records(full_path, nuevos)
+            todos = load_records(filename)
+            nuevos = [r for r in todos if str(r.id) != str(id_seleccion)]
+            quitados = [r for r in todos if str(r.id) == str(id_seleccion)]
+            try:
+                if filename in cierre.ARCHIVADOS:
+                    cierre.verificar(quitados)
+            except ValueError as e:
+                messagebox.showerror('Período cerrado', str(e))
+                return
+            mayor.reescribir(filename, nuevos, quitados=quitados)
 
             nonlocal registros
             registros = nuevos
@@ -361,13 +478,15 @@ class App(tk.Tk):
             id_sel = valores[0]
             idx_reg = None
             for i, r in enumerate(registros):
-                if str(r[0]) == str(id_sel):
+                if str(r.id) == str(id_sel):
                     idx_reg = i
                     break
             if idx_reg is None:
                 return
 
-            orig_row = list(registros[idx_reg])
+            orig_row = registros[idx_reg].to_tuple()
+            campos = registros[idx_reg].__slots__
+            importes = type(registros[idx_reg]).IMPORTES
 
             win = tk.Toplevel(self)
             win.title('Editar registro')
@@ -381,19 +500,30 @@ class App(tk.Tk):
 
             def guardar():
                 nuevos = []
-                for val, orig in zip(entries, orig_row):
+                for val, orig, campo in zip(entries, orig_row, campos):
                     txt = val.get()
                     try:
-                        if isinstance(orig, int):
+                        if campo in importes:
+                            nuevos.append(a_centavos(txt))
+                        elif isinstance(orig, int):
                             nuevos.append(int(txt))
                         elif isinstance(orig, float):
                             nuevos.append(float(txt))
                         else:
                             nuevos.append(txt)
                     except ValueError:
-                        nuevos.append(txt)
-                registros[idx_reg] = tuple(nuevos)
-                overwrite_records(full_path, registros)
+                        messagebox.showerror('Error', f'Valor inválido en {campo}: {txt!r}')
+                        return
+                viejo = registros[idx_reg]
+                nuevo = type(viejo).from_tuple(nuevos)
+                try:
+                    if filename in cierre.ARCHIVADOS:
+                        cierre.verificar([viejo, nuevo])
+                except ValueError as e:
+                    messagebox.showerror('Período cerrado', str(e))
+                    return
+                registros[idx_reg] = nuevo
+                mayor.reescribir(filename, registros, quitados=[viejo], agregados=[registros[idx_reg]])
                 aplicar_filtros()
                 win.destroy()
 
@@ -529,8 +659,8 @@ class App(tk.Tk):
             e_nombre.delete(0, 'end')
             e_par.delete(0, 'end')
             if r:
-                e_nombre.insert(0, r[1])
-                e_par.insert(0, r[7] or '')
+                e_nombre.insert(0, r.nombreCompleto)
+                e_par.insert(0, r.parcela1 or '')
 
         e_cli.bind('<FocusOut>', load_cli)
     
@@ -574,11 +704,11 @@ class App(tk.Tk):
                 hide_suggestions()
                 return
             matches = []
-            for tup in self.clientes.values():
-                name = str(tup[1]).lower()
+            for cli in self.clientes.values():
+                name = str(cli.nombreCompleto).lower()
                 pos = name.find(query)
                 if pos != -1:
-                    matches.append((pos, len(name), tup))
+                    matches.append((pos, len(name), cli))
             matches.sort(key=lambda x: (x[0], x[1]))
             matches = [m[2] for m in matches[:5]]
             if not matches:
@@ -605,8 +735,8 @@ class App(tk.Tk):
             else:
                 for item in tree_sug.get_children():
                     tree_sug.delete(item)
-            for tup in matches:
-                tree_sug.insert('', 'end', values=(tup[0], tup[1], tup[7]))
+            for cli in matches:
+                tree_sug.insert('', 'end', values=(cli.id, cli.nombreCompleto, cli.parcela1))
             x = e_nombre.winfo_rootx()
             y = e_nombre.winfo_rooty() + e_nombre.winfo_height()
             suggest_win.geometry(f'+{x}+{y}')
@@ -752,6 +882,15 @@ class App(tk.Tk):
 
         ttk.Label(taxf, text='% IVA:', style='Field.TLabel').grid(row=2, column=0, sticky='e')
         e_iva = ttk.Entry(taxf, style='Field.TEntry', width=10, state='readonly')
+        e_iva.grid(row=2, column=1, sticky='w', padx=(5,10))
+        ttk.Label(taxf, text='Importe:', style='Field.TLabel').grid(row=2, column=2, sticky='e')
+        l_iva = ttk.Label(taxf, text='0.00', style='Field.TLabel')
+        l_iva.grid(row=2, column=3, sticky='w', padx=(5,15))
+
+        ttk.Label(taxf, text='TOTAL c/ Impuestos:', style='Field.TLabel')\
+            .grid(row=3, column=0, columnspan=2, sticky='e', pady=(10,0))
+        l_total_imp = ttk.Label(taxf, text='0.00', style='Field.TLabel')
+        l_total_imp.grid(row=3, column=2, columnspan=2, sticky='w', pady=(10,0), padx=(5,0))
 
         # — 5.3) CAJA O CUENTA BANCARIA DONDE INGRESA EL PAGO —
         ttk.Label(
@@ -816,7 +955,7 @@ class App(tk.Tk):
 
         def show_cash_popup(code_entry, name_entry, event=None):
             nonlocal cash_win, cash_tree
-            taxes = load_tax_cobros()
+            taxes = tasas.obtener(TAX_COBROS_FILE).vigentes(entry_fecha.get())
             matches = [
                 (c, self.plan.get(c, ''), taxes[c][0], taxes[c][1])
                 for c in taxes
@@ -873,74 +1012,62 @@ class App(tk.Tk):
         db.bind('<FocusOut>', hide_cash_popup_later)
     
             # — 7) Recalcular Totales e Impuestos en cada cambio —
-        def upd_tot(e=None):
+        def centavos_o_cero(texto):
+            # Mientras se escribe, un importe incompleto cuenta como 0
             try:
-                # 1) (Opcional) Subtotal de imputaciones
-                subtotal_imput = sum(float(r[2].get() or 0) for r in imps)
-                l_tot.config(text=f"{subtotal_imput:.2f}")
-    
-                # 2) Obtener porcentajes IIBB / DByCR para Cuenta A y Cuenta B
-                tbl = load_tax_cobros()
-                pA_iibb, pA_dbcr = tbl.get(ca.get().strip(), (0.0, 0.0))
-                pB_iibb, pB_dbcr = tbl.get(cb.get().strip(), (0.0, 0.0))
-    
-                # 3) Leer montos numéricos “Monto A” y “Monto B”
-                try:
-                    montoA_val = float(ma.get() or 0)
-                except ValueError:
-                    montoA_val = 0.0
-                try:
-                    montoB_val = float(mb.get() or 0)
-                except ValueError:
-                    montoB_val = 0.0
-    
-                # 4) Calcular IIBB y DByCR sobre Monto A y Monto B
-                monto_iibb_A  = montoA_val * (pA_iibb / 100)
-                monto_dbcr_A  = montoA_val * (pA_dbcr / 100)
-                monto_iibb_B  = montoB_val * (pB_iibb / 100)
-                monto_dbcr_B  = montoB_val * (pB_dbcr / 100)
-    
-                # 5) Calcular IVA (21%) **sobre el monto de cada cuenta**, no sobre el subtotal de imputaciones
-                pct_iva = 21.0
-                base_sin_iva = subtotal_imput / 1.21 if subtotal_imput else 0.0
-                monto_iva = subtotal_imput - base_sin_iva
-    
-                # 6) Mostrar los porcentajes combinados (suman de A+B)
-                total_pct_iibb = pA_iibb + pB_iibb
-                total_pct_dbcr = pA_dbcr + pB_dbcr
-    
-                e_iibb.config(state='normal')
-                e_iibb.delete(0, 'end')
-                e_iibb.insert(0, f"{total_pct_iibb:.2f}")
-                e_iibb.config(state='readonly')
-    
-                e_dby.config(state='normal')
-                e_dby.delete(0, 'end')
-                e_dby.insert(0, f"{total_pct_dbcr:.2f}")
-                e_dby.config(state='readonly')
-    
-                e_iva.config(state='normal')
-                e_iva.delete(0, 'end')
-                e_iva.insert(0, f"{pct_iva:.2f}")
-                e_iva.config(state='readonly')
-    
-                l_iibb.config(text=f"{monto_iibb_A + monto_iibb_B:.2f}")
-                l_dby.config(text=f"{monto_dbcr_A + monto_dbcr_B:.2f}")
-                l_iva.config(text=f"{monto_iva:.2f}")
-                # 7) Total con impuestos:
-                #    - montoA + montoB
-                #    - más impuestos IIBB y DByCR correspondientes a A y B
-                #    - más IVA correspondiente a A y B
-                total_con_imp = (
-                    montoA_val + montoB_val
-                    + monto_iibb_A + monto_iibb_B
-                    + monto_dbcr_A + monto_dbcr_B
-                    + monto_iva
-                )
-    
-            except Exception:
-                # Si ocurre cualquier error (por ej. campo vacío), no interrumpe la app
-                pass
+                return a_centavos(texto)
+            except ValueError:
+                return 0
+
+        def upd_tot(e=None):
+            # 1) (Opcional) Subtotal de imputaciones (en centavos)
+            subtotal_imput = sum(centavos_o_cero(fila[2].get()) for fila in imps)
+            l_tot.config(text=a_pesos(subtotal_imput))
+
+            # 2) Porcentajes IIBB / DByCR de Cuenta A y Cuenta B vigentes en la fecha
+            tasa_a, tasa_b = tasas_cobro(ca.get(), cb.get(), entry_fecha.get())
+            pA_iibb, pA_dbcr = tasa_a
+            pB_iibb, pB_dbcr = tasa_b
+
+            # 3) Leer montos “Monto A” y “Monto B” (en centavos)
+            montoA_val = centavos_o_cero(ma.get())
+            montoB_val = centavos_o_cero(mb.get())
+
+            # 4) IIBB y DByCR sobre Monto A y Monto B, e IVA (21%) incluido en el
+            #    subtotal de imputaciones: la misma cuenta que al guardar
+            monto_dbcr, monto_iibb, monto_iva = calcular_cobro(
+                montoA_val, montoB_val, subtotal_imput, tasa_a, tasa_b
+            )
+            pct_iva = PCT_IVA
+
+            # 5) Mostrar los porcentajes combinados (suman de A+B)
+            total_pct_iibb = pA_iibb + pB_iibb
+            total_pct_dbcr = pA_dbcr + pB_dbcr
+
+            e_iibb.config(state='normal')
+            e_iibb.delete(0, 'end')
+            e_iibb.insert(0, f"{total_pct_iibb:.2f}")
+            e_iibb.config(state='readonly')
+
+            e_dby.config(state='normal')
+            e_dby.delete(0, 'end')
+            e_dby.insert(0, f"{total_pct_dbcr:.2f}")
+            e_dby.config(state='readonly')
+
+            e_iva.config(state='normal')
+            e_iva.delete(0, 'end')
+            e_iva.insert(0, f"{pct_iva:.2f}")
+            e_iva.config(state='readonly')
+
+            l_iibb.config(text=a_pesos(monto_iibb))
+            l_dby.config(text=a_pesos(monto_dbcr))
+            l_iva.config(text=a_pesos(monto_iva))
+            # 6) Total con impuestos:
+            #    - montoA + montoB
+            #    - más impuestos IIBB y DByCR correspondientes a A y B
+            #    - más IVA correspondiente a A y B
+            total_con_imp = montoA_val + montoB_val + monto_iibb + monto_dbcr + monto_iva
+            l_total_imp.config(text=a_pesos(total_con_imp))
     
         # Vincular eventos a upd_tot (DEBE SER DESPUÉS de definirla)
         for _, _, ent_importe in imps:
@@ -949,23 +1076,36 @@ class App(tk.Tk):
         ma.bind('<KeyRelease>', upd_tot)
         cb.bind('<KeyRelease>', upd_tot)
         mb.bind('<KeyRelease>', upd_tot)
+        # La tasa depende de la fecha del cobro
+        entry_fecha.bind('<KeyRelease>', upd_tot, add='+')
 
     
         # — 8) Botón Guardar Cobro —
+        def guardar_cobro():
+            campo = ''
+            try:
+                importes = []
+                for i in range(3):
+                    campo = f'Importe {i + 1}'
+                    importes.append(a_centavos(imps[i][2].get()))
+                campo = 'Monto A'
+                montoA_val = a_centavos(ma.get())
+                campo = 'Monto B'
+                montoB_val = a_centavos(mb.get())
+            except ValueError as e:
+                messagebox.showerror('Error', f'{campo}: {e}')
+                return
+            self._save_cobro(
+                entry_fecha.get(),
+                e_nombre.get(), e_par.get(),
+                [(imps[i][0].get(), imps[i][1].get(), importes[i]) for i in range(3)],
+                ca.get(), montoA_val,
+                cb.get(), montoB_val,
+                obs.get()
+            )
+
         ttk.Button(cont, text='Guardar Cobro', style='Big.TButton',
-                   command=lambda: (
-                       self._save_cobro(
-                           entry_fecha.get(),
-                           e_nombre.get(), e_par.get(),
-                           [
-                               (imps[i][0].get(), imps[i][1].get(), float(imps[i][2].get() or 0))
-                               for i in range(3)
-                           ],
-                           ca.get(), ma.get(),
-                           cb.get(), mb.get(),
-                           obs.get()
-                       )
-                   )).pack(pady=15)
+                   command=guardar_cobro).pack(pady=15)
 
 
 
@@ -973,35 +1113,21 @@ class App(tk.Tk):
     def _save_cobro(self, fecha, nombre_cli, parcela, imputaciones,
                     cuentaA, montoA, cuentaB, montoB, obs):
         total_imputaciones = sum(imp[2] for imp in imputaciones)
-        montoA_val = float(montoA or 0)
-        montoB_val = float(montoB or 0)
+        montoA_val = a_centavos(montoA)
+        montoB_val = a_centavos(montoB)
 
-        if round(total_imputaciones, 2) != round(montoA_val + montoB_val, 2):
+        if total_imputaciones != montoA_val + montoB_val:
             messagebox.showerror(
                 'Error',
                 'La suma de "Monto A" y "Monto B" debe coincidir con el total de imputaciones.'
             )
             return
-        # Leer porcentajes de cuentaA y cuentaB
-        tbl = load_tax_cobros()
-        pA_iibb, pA_dbcr = tbl.get(cuentaA.strip(), (0.0, 0.0))
-        pB_iibb, pB_dbcr = tbl.get(cuentaB.strip(), (0.0, 0.0))
-
-        # Montos de impuestos IIBB / DByCR por cuenta
-        monto_iibb_A  = montoA_val * (pA_iibb  / 100)
-        monto_dbcr_A  = montoA_val * (pA_dbcr  / 100)
-        monto_iibb_B  = montoB_val * (pB_iibb  / 100)
-        monto_dbcr_B  = montoB_val * (pB_dbcr  / 100)
-
-        monto_iibb = monto_iibb_A + monto_iibb_B
-        monto_dbcr = monto_dbcr_A + monto_dbcr_B
-
-        # IVA 21% **sobre montoA y montoB**, no sobre total de imputaciones
-        pct_iva = 21.0
-        base_sin_iva = total_imputaciones / 1.21 if total_imputaciones else 0.0
-        iva_val = total_imputaciones - base_sin_iva
-
-        # Construir el objeto cobro con los impuestos ya en pesos
+        # Impuestos IIBB / DByCR de las cuentas A y B, e IVA incluido (en centavos)
+        monto_dbcr, monto_iibb, iva_val = impuestos_cobro(
+            cuentaA, montoA_val, cuentaB, montoB_val, total_imputaciones, fecha
+        )
+
+        # Construir el objeto cobro con importes e impuestos en centavos
         c = cobro(
             get_next_cobro_id(),
             fecha,
@@ -1013,11 +1139,18 @@ class App(tk.Tk):
             imputaciones[2][0], imputaciones[2][1], imputaciones[2][2],
             cuentaA, montoA_val,
             cuentaB, montoB_val,
-            monto_dbcr,   # DByCR en pesos (A+B)
-            monto_iibb,   # IIBB en pesos (A+B)
-            iva_val,      # IVA en pesos (A+B)
+            monto_dbcr,   # DByCR en centavos (A+B)
+            monto_iibb,   # IIBB en centavos (A+B)
+            iva_val,      # IVA en centavos (A+B)
             obs
         )
+        try:
+            cierre.verificar((c,))
+        except ValueError as e:
+            messagebox.showerror('Período cerrado', str(e))
+            return
+        if not confirmar_duplicados('cobros.txt', c):
+            return
         save_cobros((c,))
         messagebox.showinfo('Éxito', 'Cobro guardado.')
         self._load_data()
@@ -1147,70 +1280,65 @@ class App(tk.Tk):
         pago_cuenta.bind('<KeyRelease>', fill_pago)
 
         def upd_tot(e=None):
+            # 1) Leer el monto neto que se va a pagar (en centavos); mientras
+            #    se escribe, un importe incompleto cuenta como 0
             try:
-                # 1) Leer el monto neto que se va a pagar
-                try:
-                    neto_val = float(imput_imp.get() or 0)
-                except ValueError:
-                    neto_val = 0.0
-
-                # 2) Obtener porcentaje DByCR de la tabla de pagos
-                tblp = load_tax_pagos()  # dict: { 'cuenta': pct_dbcr }
-                pct_dbcr = tblp.get(pago_cuenta.get().strip(), 0.0)
+                neto_val = a_centavos(imput_imp.get())
+            except ValueError:
+                neto_val = 0
 
-                # 3) Calcular IVA (21%) sobre el neto
-                pct_iva = 21.0
-                base_sin_iva = neto_val / 1.21 if neto_val else 0.0
-                monto_iva = neto_val - base_sin_iva
+            # 2) Porcentaje DByCR de la cuenta que paga vigente en la fecha
+            pct_dbcr = tasa_pago(pago_cuenta.get(), fecha_entry.get())
 
-                # 4) Calcular Monto DByCR bancario
-                monto_dbcr = neto_val * (pct_dbcr / 100)
+            # 3) IVA (21%) incluido en el neto y DByCR bancario: la misma cuenta que al guardar
+            pct_iva = PCT_IVA
+            _, monto_dbcr = calcular_pago(neto_val, pct_dbcr)
 
-                # 5) Mostrar porcentajes
-                e_dbcr_pct.config(state='normal')
-                e_dbcr_pct.delete(0, 'end')
-                e_dbcr_pct.insert(0, f"{pct_dbcr:.2f}")
-                e_dbcr_pct.config(state='readonly')
+            # 4) Mostrar porcentajes
+            e_dbcr_pct.config(state='normal')
+            e_dbcr_pct.delete(0, 'end')
+            e_dbcr_pct.insert(0, f"{pct_dbcr:.2f}")
+            e_dbcr_pct.config(state='readonly')
 
-                e_iva_pct.config(state='normal')
-                e_iva_pct.delete(0, 'end')
-                e_iva_pct.insert(0, f"{pct_iva:.2f}")
-                e_iva_pct.config(state='readonly')
+            e_iva_pct.config(state='normal')
+            e_iva_pct.delete(0, 'end')
+            e_iva_pct.insert(0, f"{pct_iva:.2f}")
+            e_iva_pct.config(state='readonly')
 
-                # 6) Total con impuestos = neto + IVA + DByCR
-                total_imp = neto_val + monto_dbcr
-                l_total_imp.config(text=f"{total_imp:.2f}")
-            except Exception:
-                pass
+            # 5) Total con impuestos = neto (ya incluye el IVA) + DByCR
+            total_imp = neto_val + monto_dbcr
+            l_total_imp.config(text=a_pesos(total_imp))
 
         imput_imp.bind('<KeyRelease>', upd_tot)
+        fecha_entry.bind('<KeyRelease>', upd_tot, add='+')
 
         # 8) Botón “Guardar Pago”
+        def guardar_pago():
+            try:
+                neto = a_centavos(imput_imp.get())
+            except ValueError as e:
+                messagebox.showerror('Error', f'Importe: {e}')
+                return
+            self._save_pago(
+                fecha_entry.get(),
+                razon_entry.get(),
+                concepto_entry.get(),
+                tipo_entry.get(),
+                imput_cuenta.get().strip(),       # cuenta imputación (sin impuesto)
+                neto,                             # monto neto (centavos)
+                pago_cuenta.get().strip(),        # cuenta A para impuestos
+                None                              # si deseas, puedes agregar un campo de observaciones
+            )
+
         ttk.Button(cont, text='Guardar Pago', style='Big.TButton',
-                   command=lambda: (
-                       self._save_pago(
-                           fecha_entry.get(),
-                           razon_entry.get(),
-                           concepto_entry.get(),
-                           tipo_entry.get(),
-                           imput_cuenta.get().strip(),       # cuenta imputación (sin impuesto)
-                           float(imput_imp.get() or 0),      # monto neto
-                           pago_cuenta.get().strip(),        # cuenta A para impuestos
-                           None                              # si deseas, puedes agregar un campo de observaciones
-                       )
-                   )).pack(pady=15)
+                   command=guardar_pago).pack(pady=15)
 
 
     def _save_pago(self, fecha, razon, concepto, tipo, cod_cuenta, monto_neto, cod_paga, obs):
-        # 1) Obtener porcentaje DByCR bancario de la cuenta A
-        tblp = load_tax_pagos()  # dict: { 'cuenta': pct_dbcr }
-        pct_dbcr = tblp.get(cod_paga.strip(), 0.0)
-
-        # 2) Calcular montos de impuestos sobre el neto
-        base_sin_iva = monto_neto / 1.21 if monto_neto else 0.0
-        monto_iva_val  = monto_neto - base_sin_iva
+        # 1) IVA incluido en el neto y DByCR bancario de la cuenta A vigente en la fecha (en centavos)
+        monto_iva_val, monto_dbcr_val = impuestos_pago(cod_paga, monto_neto, fecha)
 
-        # 3) Crear objeto pago con los valores en pesos
+        # 2) Crear objeto pago con los valores en centavos
         p = pago(
             get_next_pago_id(),
             fecha,
@@ -1219,10 +1347,17 @@ class App(tk.Tk):
             tipo,
             cod_cuenta,         # cuenta imputación
             monto_neto,         # importe neto
-            monto_iva_val,      # importe IVA en pesos
+            monto_iva_val,      # importe IVA en centavos
             cod_paga,           # cuenta que paga (para impuesto bancario)
-            monto_dbcr_val      # importe DByCR en pesos
+            monto_dbcr_val      # importe DByCR en centavos
         )
+        try:
+            cierre.verificar((p,))
+        except ValueError as e:
+            messagebox.showerror('Período cerrado', str(e))
+            return
+        if not confirmar_duplicados('pagos.txt', p):
+            return
         save_pagos((p,))
         messagebox.showinfo('Éxito', 'Pago registrado.')
         self._show_frame('lst_pagos')
@@ -1323,6 +1458,8 @@ class App(tk.Tk):
             p1, p2, p3,
             sup, obs
         )
+        if not confirmar_duplicados('clientes.txt', c):
+            return
         save_clients((c,))
         messagebox.showinfo('Éxito', 'Cliente registrado.')
         self._show_frame('lst_clientes')
@@ -1349,8 +1486,11 @@ class App(tk.Tk):
             lbl_empty.grid(row=1, column=0, columnspan=2, pady=20)
             return
 
-        # Columnas: Num cuenta, Nombre
+        # Columnas: Num cuenta, Nombre (con filtro) y los totales acumulados
+        # de cada cuenta con sus subcuentas
         cols = ['Num cuenta', 'Nombre']
+        cols_saldos = ['Debe', 'Haber', 'Saldo']
+        balance = arbol_cuentas.obtener_balance()
 
         # PREPARAMOS GRID COLUMNS = 2
         cont.grid_columnconfigure(0, weight=1)
@@ -1388,12 +1528,13 @@ class App(tk.Tk):
 
         tree = ttk.Treeview(
             table,
-            columns=cols,
-            show='headings',
+            columns=cols + cols_saldos,
+            show='tree headings',
             yscrollcommand=vsb.set,
             xscrollcommand=_tree_xview
         )
         vsb.config(command=tree.yview)
+        tree.column('#0', width=40, stretch=False)
 
         # Ubicamos el Treeview en row=2, columna 0..1
         def _scroll_x(*args):
@@ -1409,22 +1550,38 @@ class App(tk.Tk):
 
         table.grid_rowconfigure(1, weight=1)
 
-        for c in cols:
+        for c in cols + cols_saldos:
             tree.heading(c, text=c, anchor='center')
             tree.column(c, width=150, anchor='center')
 
-        # Función para llenar el Treeview
-        def poblar_plan(lista):
-            for item in tree.get_children():
-                tree.delete(item)
-            for row in lista:
-                tree.insert('', 'end', values=row)
+        def valores_cuenta(row):
+            debe, haber = balance.acumulado.get(str(row[0]).strip(), (0, 0))
+            return (row[0], row[1], a_pesos(debe), a_pesos(haber), a_pesos(debe - haber))
+
+        # Función para llenar el Treeview: completo se muestra como árbol
+        # (colapsado debajo del primer nivel); filtrado, como lista
+        def poblar_plan(lista, como_arbol=False):
+            tree.delete(*tree.get_children())
+            if not como_arbol:
+                for row in lista:
+                    tree.insert('', 'end', values=valores_cuenta(row))
+                return
+            arbol = balance.arbol
+            items = {}
+            for row in sorted(lista, key=lambda r: str(r[0]).strip()):
+                codigo = str(row[0]).strip()
+                if codigo in items:
+                    continue
+                padre = items.get(arbol.padre.get(codigo), '')
+                items[codigo] = tree.insert(
+                    padre, 'end', values=valores_cuenta(row), open=arbol.nivel.get(codigo, 0) == 0
+                )
 
-        poblar_plan(regs)
+        poblar_plan(regs, como_arbol=True)
 
         # Función de filtrado (se aplica sobre cada columna en su índice correspondiente)
         def aplicar_filtros_plan(event=None):
-            filtros = {idx: ent.get() for idx, ent in filtro_entrys.items()}
+            filtros = {idx: '' if ent._ph_visible else ent.get() for idx, ent in filtro_entrys.items()}
             filtrados = []
             for row in regs:
                 match = True
@@ -1436,7 +1593,7 @@ class App(tk.Tk):
                         break
                 if match:
                     filtrados.append(row)
-            poblar_plan(filtrados)
+            poblar_plan(filtrados, como_arbol=not any(t.strip() for t in filtros.values()))
 
         for ent in filtro_entrys.values():
             ent.bind('<KeyRelease>', aplicar_filtros_plan)
@@ -1540,12 +1697,11 @@ class App(tk.Tk):
 
         # 3) Leo registros de disco
         full_path = os.path.join(ensure_data_directory(), 'tax_cobros.txt')
-        tbl = load_tax_cobros()  # dict { 'cuenta': (iibb, dbcr) }
-        regs = [(num, *tbl[num]) for num in tbl]
-        # regs = [(cuenta, iibb_pct, dbcr_pct), ...]
+        regs = [(num, *pcts, desde, hasta) for num, pcts, desde, hasta in load_tax_historial(TAX_COBROS_FILE)]
+        # regs = [(cuenta, iibb_pct, dbcr_pct, desde, hasta), ...] (la historia completa)
 
-        # 4) Columnas definidas (se mostrarán: Cuenta, Nombre, %IIBB, %DByCR)
-        cols = ['Cuenta', 'Nombre', '%IIBB', '%DByCR']
+        # 4) Columnas definidas (se mostrarán: Cuenta, Nombre, %IIBB, %DByCR, Desde, Hasta)
+        cols = ['Cuenta', 'Nombre', '%IIBB', '%DByCR', 'Desde', 'Hasta']
 
         cont.grid_columnconfigure(0, weight=1)
 
@@ -1572,8 +1728,8 @@ class App(tk.Tk):
         filtro_frame.grid_columnconfigure(1, weight=1)
         filtro_entrys[1] = ent_nombre
 
-        ttk.Label(filtro_frame, text='').grid(row=0, column=2, padx=1, pady=(0,5))
-        ttk.Label(filtro_frame, text='').grid(row=0, column=3, padx=1, pady=(0,5))
+        for col in range(2, len(cols)):
+            ttk.Label(filtro_frame, text='').grid(row=0, column=col, padx=1, pady=(0,5))
 
         filtro_canvas.update_idletasks()
         filtro_canvas.configure(scrollregion=filtro_canvas.bbox('all'))
@@ -1610,24 +1766,24 @@ class App(tk.Tk):
             tree.heading(c, text=c, anchor='center')
             tree.column(c, anchor='center', stretch=True)
 
-        # 9) Poblamos inicialmente
-        def poblar_tax_cobros(lista):
+        # 9) Poblamos inicialmente (el iid de cada fila es su posición en regs)
+        def poblar_tax_cobros(posiciones):
             for item in tree.get_children():
                 tree.delete(item)
-            for row in lista:
-                cuenta, iibb_pct, dbcr_pct = row
+            for i in posiciones:
+                cuenta, iibb_pct, dbcr_pct, desde, hasta = regs[i]
                 nombre = self.plan.get(cuenta, '')
-                tree.insert('', 'end', values=(cuenta, nombre, iibb_pct, dbcr_pct))
+                tree.insert('', 'end', iid=str(i), values=(cuenta, nombre, iibb_pct, dbcr_pct, desde, hasta))
 
-        poblar_tax_cobros(regs)
+        poblar_tax_cobros(range(len(regs)))
 
         # 10) Función de filtrado (solo "Cuenta" y "Nombre")
         def aplicar_filtros_tax_cobros(event=None):
             filtros = {idx: ent.get().strip() for idx, ent in filtro_entrys.items()}
             filtrados = []
 
-            for row in regs:
-                cuenta, iibb_pct, dbcr_pct = row
+            for i, row in enumerate(regs):
+                cuenta = row[0]
                 match = True
 
                 # Filtrar por "Cuenta" (col_idx = 0)
@@ -1644,7 +1800,7 @@ class App(tk.Tk):
                         match = False
 
                 if match:
-                    filtrados.append(row)
+                    filtrados.append(i)
 
             poblar_tax_cobros(filtrados)
 
@@ -1664,24 +1820,14 @@ class App(tk.Tk):
             if not sel:
                 messagebox.showwarning('Atención', 'Seleccione un registro.')
                 return
-            vals = tree.item(sel[0], 'values')
-            num_cuenta = vals[0]
-            if not messagebox.askyesno('Confirmar', f'¿Eliminar impuestos para cuenta {num_cuenta}?'):
+            idx_reg = int(sel[0])
+            num_cuenta, desde = regs[idx_reg][0], regs[idx_reg][3]
+            if not messagebox.askyesno('Confirmar', f'¿Eliminar la tasa de la cuenta {num_cuenta} '
+                                                    f'vigente desde {desde or "siempre"}?'):
                 return
 
-            originales = []
-            with open(full_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    tup = ast.literal_eval(line)
-                    if str(tup[0]) == str(num_cuenta):
-                        continue
-                    originales.append(tup)
-            overwrite_records(full_path, originales)
-
-            nonlocal regs
-            regs = [(str(r[0]), float(r[1]), float(r[2])) for r in originales]
+            del regs[idx_reg]
+            overwrite_records(full_path, regs)
             aplicar_filtros_tax_cobros()
 
         boton_elim.config(command=eliminar_tax_cobros)
@@ -1691,15 +1837,8 @@ class App(tk.Tk):
             if not sel:
                 messagebox.showwarning('Atención', 'Seleccione un registro.')
                 return
+            idx_reg = int(sel[0])
             vals = tree.item(sel[0], 'values')
-            num_cuenta = vals[0]
-            idx_reg = None
-            for i, r in enumerate(regs):
-                if str(r[0]) == str(num_cuenta):
-                    idx_reg = i
-                    break
-            if idx_reg is None:
-                return
 
             orig_row = list(regs[idx_reg])
 
@@ -1717,17 +1856,26 @@ class App(tk.Tk):
             e_d = ttk.Entry(win, style='Field.TEntry')
             e_d.grid(row=2, column=1, padx=5, pady=2)
             e_d.insert(0, vals[3])
+            ttk.Label(win, text='Desde:', style='Field.TLabel').grid(row=3, column=0, sticky='e', padx=5, pady=2)
+            e_desde = ttk.Entry(win, style='Field.TEntry')
+            e_desde.grid(row=3, column=1, padx=5, pady=2)
+            e_desde.insert(0, vals[4])
+            ttk.Label(win, text='Hasta:', style='Field.TLabel').grid(row=4, column=0, sticky='e', padx=5, pady=2)
+            e_hasta = ttk.Entry(win, style='Field.TEntry')
+            e_hasta.grid(row=4, column=1, padx=5, pady=2)
+            e_hasta.insert(0, vals[5])
 
             def guardar():
                 try:
-                    regs[idx_reg] = (e_c.get(), float(e_i.get()), float(e_d.get()))
+                    regs[idx_reg] = (e_c.get(), float(e_i.get()), float(e_d.get()),
+                                     fecha_vigencia(e_desde.get()), fecha_vigencia(e_hasta.get()))
                     overwrite_records(full_path, regs)
                     aplicar_filtros_tax_cobros()
                     win.destroy()
                 except ValueError:
                     messagebox.showerror('Error', 'Valores inválidos')
 
-            ttk.Button(win, text='Guardar', command=guardar, style='Big.TButton').grid(row=3, column=0, columnspan=2, pady=10)
+            ttk.Button(win, text='Guardar', command=guardar, style='Big.TButton').grid(row=5, column=0, columnspan=2, pady=10)
 
         boton_edit.config(command=editar_tax_cobros)
 
@@ -1740,16 +1888,23 @@ class App(tk.Tk):
         e_i = ttk.Entry(f2, style='Field.TEntry'); e_i.grid(row=0, column=3)
         ttk.Label(f2, text='%DByCR:').grid(row=0, column=4, padx=10)
         e_d = ttk.Entry(f2, style='Field.TEntry'); e_d.grid(row=0, column=5)
-        ttk.Button(
-            f2,
-            text='Agregar',
-            style='Big.TButton',
-            command=lambda: (
-                save_tax_cobros(((e_c.get(), float(e_i.get()), float(e_d.get())),)),
-                messagebox.showinfo('Éxito', 'Registro Cobros agregado.'),
-                self._show_frame('tax_cobros')
-            )
-        ).grid(row=1, column=0, columnspan=6, pady=10)
+        # Una tasa nueva para una cuenta que ya tiene reemplaza a la anterior desde esa fecha
+        ttk.Label(f2, text='Vigente desde:').grid(row=0, column=6, padx=10)
+        e_desde = ttk.Entry(f2, style='Field.TEntry', width=12); e_desde.grid(row=0, column=7)
+
+        def agregar_tax_cobros():
+            try:
+                fila = (e_c.get().strip(), float(e_i.get()), float(e_d.get()),
+                        fecha_vigencia(e_desde.get()), '')
+            except ValueError:
+                messagebox.showerror('Error', 'Valores inválidos')
+                return
+            save_tax_cobros((fila,))
+            messagebox.showinfo('Éxito', 'Registro Cobros agregado.')
+            self._show_frame('tax_cobros')
+
+        ttk.Button(f2, text='Agregar', style='Big.TButton',
+                   command=agregar_tax_cobros).grid(row=1, column=0, columnspan=8, pady=10)
 
     def _build_tax_pagos(self, parent):
         # 0) Limpiar todo
@@ -1760,16 +1915,15 @@ class App(tk.Tk):
         lbl_title.pack(pady=10)
 
         full_path = os.path.join(ensure_data_directory(), 'tax_pagos.txt')
-        tbl = load_tax_pagos()  # dict { 'cuenta': pct_dbcr }
-        regs = [(num, tbl[num]) for num in tbl]
-        # regs = [(cuenta, pct_dbcr), ...]
+        regs = [(num, *pcts, desde, hasta) for num, pcts, desde, hasta in load_tax_historial(TAX_PAGOS_FILE)]
+        # regs = [(cuenta, pct_dbcr, desde, hasta), ...] (la historia completa)
 
         cont = ttk.Frame(parent, padding=10)
         cont.pack(expand=True, fill='both')
 
-        cols = ['Cuenta', 'Nombre', '%DByCR Banc.']
+        cols = ['Cuenta', 'Nombre', '%DByCR Banc.', 'Desde', 'Hasta']
 
-        # PREPARAMOS GRID COLUMNS = 3
+        # PREPARAMOS GRID COLUMNS = 5
         cont.grid_columnconfigure(0, weight=1)
 
         table = ttk.Frame(cont)
@@ -1795,8 +1949,9 @@ class App(tk.Tk):
         filtro_frame.grid_columnconfigure(1, weight=1)
         filtro_entrys[1] = ent_nombre
 
-        # Reservamos columna 2 (%DByCR Banc.) solo como espacio en blanco
-        ttk.Label(filtro_frame, text='').grid(row=0, column=2, padx=1, pady=(0,5))
+        # Reservamos las columnas 2.. (%DByCR Banc., Desde, Hasta) solo como espacio en blanco
+        for col in range(2, len(cols)):
+            ttk.Label(filtro_frame, text='').grid(row=0, column=col, padx=1, pady=(0,5))
 
         filtro_canvas.update_idletasks()
         filtro_canvas.configure(scrollregion=filtro_canvas.bbox('all'))
@@ -1823,7 +1978,7 @@ class App(tk.Tk):
 
         hsb.config(command=_scroll_x)
 
-        # Ubicar el Treeview en row=1, columna 0..2
+        # Ubicar el Treeview en row=1, columna 0..4
         tree.grid(row=1, column=0, columnspan=len(cols), sticky='nsew')
         vsb.grid(row=1, column=len(cols), sticky='ns')
         hsb.grid(row=2, column=0, columnspan=len(cols), sticky='ew')
@@ -1834,24 +1989,24 @@ class App(tk.Tk):
             tree.heading(c, text=c, anchor='center')
             tree.column(c, width=140, anchor='center')
 
-        # 3) Poblamos inicialmente
-        def poblar_tax_pagos(lista):
+        # 3) Poblamos inicialmente (el iid de cada fila es su posición en regs)
+        def poblar_tax_pagos(posiciones):
             for item in tree.get_children():
                 tree.delete(item)
-            for row in lista:
-                cuenta, pct_dbcr = row
+            for i in posiciones:
+                cuenta, pct_dbcr, desde, hasta = regs[i]
                 nombre = self.plan.get(cuenta, '')
-                tree.insert('', 'end', values=(cuenta, nombre, pct_dbcr))
+                tree.insert('', 'end', iid=str(i), values=(cuenta, nombre, pct_dbcr, desde, hasta))
 
-        poblar_tax_pagos(regs)
+        poblar_tax_pagos(range(len(regs)))
 
         # 4) Función de filtrado (solo “Cuenta” y “Nombre”)
         def aplicar_filtros_tax_pagos(event=None):
             filtros = {idx: ent.get().strip() for idx, ent in filtro_entrys.items()}
             filtrados = []
 
-            for row in regs:
-                cuenta, pct_dbcr = row
+            for i, row in enumerate(regs):
+                cuenta = row[0]
                 match = True
 
                 # Filtro "Cuenta" (col_idx = 0)
@@ -1868,7 +2023,7 @@ class App(tk.Tk):
                         match = False
 
                 if match:
-                    filtrados.append(row)
+                    filtrados.append(i)
 
             poblar_tax_pagos(filtrados)
 
@@ -1888,24 +2043,14 @@ class App(tk.Tk):
             if not sel:
                 messagebox.showwarning('Atención', 'Seleccione un registro.')
                 return
-            vals = tree.item(sel[0], 'values')
-            num_cuenta = vals[0]
-            if not messagebox.askyesno('Confirmar', f'¿Eliminar impuestos para cuenta {num_cuenta}?'):
+            idx_reg = int(sel[0])
+            num_cuenta, desde = regs[idx_reg][0], regs[idx_reg][2]
+            if not messagebox.askyesno('Confirmar', f'¿Eliminar la tasa de la cuenta {num_cuenta} '
+                                                    f'vigente desde {desde or "siempre"}?'):
                 return
 
-            originales = []
-            with open(full_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    tup = ast.literal_eval(line)
-                    if str(tup[0]) == str(num_cuenta):
-                        continue
-                    originales.append(tup)
-            overwrite_records(full_path, originales)
-
-            nonlocal regs
-            regs = [(str(r[0]), float(r[1])) for r in originales]
+            del regs[idx_reg]
+            overwrite_records(full_path, regs)
             aplicar_filtros_tax_pagos()
 
         boton_elim.config(command=eliminar_tax_pagos)
@@ -1915,15 +2060,8 @@ class App(tk.Tk):
             if not sel:
                 messagebox.showwarning('Atención', 'Seleccione un registro.')
                 return
+            idx_reg = int(sel[0])
             vals = tree.item(sel[0], 'values')
-            num_cuenta = vals[0]
-            idx_reg = None
-            for i, r in enumerate(regs):
-                if str(r[0]) == str(num_cuenta):
-                    idx_reg = i
-                    break
-            if idx_reg is None:
-                return
 
             win = tk.Toplevel(self)
             win.title('Editar impuesto')
@@ -1935,17 +2073,26 @@ class App(tk.Tk):
             e_d = ttk.Entry(win, style='Field.TEntry')
             e_d.grid(row=1, column=1, padx=5, pady=2)
             e_d.insert(0, vals[2])
+            ttk.Label(win, text='Desde:', style='Field.TLabel').grid(row=2, column=0, sticky='e', padx=5, pady=2)
+            e_desde = ttk.Entry(win, style='Field.TEntry')
+            e_desde.grid(row=2, column=1, padx=5, pady=2)
+            e_desde.insert(0, vals[3])
+            ttk.Label(win, text='Hasta:', style='Field.TLabel').grid(row=3, column=0, sticky='e', padx=5, pady=2)
+            e_hasta = ttk.Entry(win, style='Field.TEntry')
+            e_hasta.grid(row=3, column=1, padx=5, pady=2)
+            e_hasta.insert(0, vals[4])
 
             def guardar():
                 try:
-                    regs[idx_reg] = (e_c.get(), float(e_d.get()))
+                    regs[idx_reg] = (e_c.get(), float(e_d.get()),
+                                     fecha_vigencia(e_desde.get()), fecha_vigencia(e_hasta.get()))
                     overwrite_records(full_path, regs)
                     aplicar_filtros_tax_pagos()
                     win.destroy()
                 except ValueError:
                     messagebox.showerror('Error', 'Valores inválidos')
 
-            ttk.Button(win, text='Guardar', command=guardar, style='Big.TButton').grid(row=2, column=0, columnspan=2, pady=10)
+            ttk.Button(win, text='Guardar', command=guardar, style='Big.TButton').grid(row=4, column=0, columnspan=2, pady=10)
 
         boton_edit.config(command=editar_tax_pagos)
 
@@ -1955,17 +2102,935 @@ class App(tk.Tk):
         ttk.Label(f2, text='Cuenta:', style='Field.TLabel').grid(row=0, column=0)
         e_c = ttk.Entry(f2, style='Field.TEntry'); e_c.grid(row=0, column=1, padx=(5,20))
         ttk.Label(f2, text='%DByCR Banc.:').grid(row=0, column=2)
-        e_d = ttk.Entry(f2, style='Field.TEntry'); e_d.grid(row=0, column=3, padx=(5,0))
-        ttk.Button(
-            f2,
-            text='Agregar',
-            style='Big.TButton',
-            command=lambda: (
-                save_tax_pagos(((e_c.get(), float(e_d.get())),)),
-                messagebox.showinfo('Éxito', 'Registro Pagos agregado.'),
-                self._show_frame('tax_pagos')
+        e_d = ttk.Entry(f2, style='Field.TEntry'); e_d.grid(row=0, column=3, padx=(5,20))
+        ttk.Label(f2, text='Vigente desde:').grid(row=0, column=4)
+        e_desde = ttk.Entry(f2, style='Field.TEntry', width=12); e_desde.grid(row=0, column=5, padx=(5,0))
+
+        def agregar_tax_pagos():
+            try:
+                fila = (e_c.get().strip(), float(e_d.get()), fecha_vigencia(e_desde.get()), '')
+            except ValueError:
+                messagebox.showerror('Error', 'Valores inválidos')
+                return
+            save_tax_pagos((fila,))
+            messagebox.showinfo('Éxito', 'Registro Pagos agregado.')
+            self._show_frame('tax_pagos')
+
+        ttk.Button(f2, text='Agregar', style='Big.TButton',
+                   command=agregar_tax_pagos).grid(row=1, column=0, columnspan=6, pady=(10,0))
+
+    def _build_importar(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        cont = ttk.Frame(parent, padding=20, relief='groove')
+        cont.place(relx=0.5, rely=0.5, anchor='center')
+
+        ttk.Label(cont, text='Importar Extracto Bancario', style='Title.TLabel').pack(pady=(0,20))
+
+        fields = ttk.Frame(cont)
+        fields.pack()
+        entradas = {}
+        for fila, (texto, clave, inicial) in enumerate((
+            ('Cuenta del banco:', 'banco', ''),
+            ('Imputar créditos a:', 'cobros', CUENTA_COBROS_DEFECTO),
+            ('Imputar débitos a:', 'pagos', CUENTA_PAGOS_DEFECTO),
+        )):
+            ttk.Label(fields, text=texto, style='Field.TLabel')\
+                .grid(row=fila, column=0, sticky='e', padx=5, pady=5)
+            ent = ttk.Entry(fields, style='Field.TEntry', width=15)
+            ent.grid(row=fila, column=1, sticky='w', pady=5)
+            ent.insert(0, inicial)
+            det = ttk.Label(fields, text=self.plan.get(inicial, ''), style='Field.TLabel')
+            det.grid(row=fila, column=2, sticky='w', padx=10)
+            ent.bind('<KeyRelease>', lambda e, d=det: d.config(text=self.plan.get(e.widget.get().strip(), '')))
+            entradas[clave] = ent
+
+        ttk.Label(
+            cont,
+            text='Columnas del CSV: Fecha, Descripción, Débito, Crédito (primera línea = encabezados)',
+            style='Field.TLabel'
+        ).pack(pady=(10,0))
+
+        def importar():
+            ruta = filedialog.askopenfilename(
+                title='Extracto bancario',
+                filetypes=[('CSV', '*.csv'), ('Todos', '*.*')]
             )
-        ).grid(row=1, column=0, columnspan=4, pady=(10,0))
+            if not ruta:
+                return
+            try:
+                n_cobros, n_pagos, n_omitidos, n_repetidos = importar_movimientos_desde_csv(
+                    ruta,
+                    entradas['banco'].get().strip(),
+                    cuenta_cobros=entradas['cobros'].get().strip(),
+                    cuenta_pagos=entradas['pagos'].get().strip(),
+                )
+            except (OSError, ValueError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            mensaje = f'Se importaron {n_cobros} cobros y {n_pagos} pagos.'
+            if n_omitidos:
+                mensaje += f'\nSe omitieron {n_omitidos} movimientos ya registrados.'
+            if n_repetidos:
+                mensaje += (f'\nAtención: {n_repetidos} movimientos se repiten dentro del '
+                            'extracto y se importaron igual; revíselos.')
+            messagebox.showinfo('Éxito', mensaje)
+
+        ttk.Button(cont, text='Elegir CSV e importar', style='Big.TButton', command=importar)\
+            .pack(pady=(20,0))
+
+    def _build_conciliar(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Conciliación Bancaria', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Cuenta del banco:', style='Field.TLabel').pack(side='left', padx=5)
+        e_cuenta = ttk.Entry(top, style='Field.TEntry', width=15)
+        e_cuenta.pack(side='left')
+        l_cuenta = ttk.Label(top, text='', style='Field.TLabel')
+        l_cuenta.pack(side='left', padx=10)
+        e_cuenta.bind('<KeyRelease>', lambda e: l_cuenta.config(text=self.plan.get(e_cuenta.get().strip(), '')))
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Estado', 'Fecha Banco', 'Importe', 'Descripción Banco',
+                   'Registro', 'Fecha Registro', 'Nombre Registro']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=110 if h not in ('Descripción Banco', 'Nombre Registro') else 220)
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def fila(estado, banco=None, libro=None):
+            valores = [estado]
+            valores += ([banco.fecha.strftime('%d/%m/%Y'), a_pesos(banco.importe), banco.nombre]
+                        if banco else ['', '', ''])
+            if libro:
+                valores[2] = valores[2] or a_pesos(libro.importe)
+                valores += [f'{libro.origen[0]} {libro.origen[1]}',
+                            libro.fecha.strftime('%d/%m/%Y'), libro.nombre]
+            else:
+                valores += ['', '', '']
+            tree.insert('', 'end', values=valores)
+
+        def conciliar():
+            cuenta = e_cuenta.get().strip()
+            if cuenta not in self.plan:
+                messagebox.showerror('Error', f'La cuenta {cuenta!r} no está en el plan de cuentas.')
+                return
+            ruta = filedialog.askopenfilename(
+                title='Extracto bancario',
+                filetypes=[('CSV', '*.csv'), ('Todos', '*.*')]
+            )
+            if not ruta:
+                return
+            try:
+                res = conciliar_extracto(ruta, cuenta)
+            except (OSError, ValueError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            tree.delete(*tree.get_children())
+            for banco, libro in res['conciliados']:
+                fila('Conciliado', banco, libro)
+            for banco, candidatos in res['ambiguos']:
+                fila(f'Ambiguo ({len(candidatos)})', banco)
+                for libro in candidatos:
+                    fila('  candidato', None, libro)
+            for banco in res['sin_conciliar_banco']:
+                fila('Sólo en banco', banco)
+            for libro in res['sin_conciliar_libros']:
+                fila('Sólo en libros', None, libro)
+            l_resumen.config(text=(
+                f"Conciliados: {len(res['conciliados'])}   Ambiguos: {len(res['ambiguos'])}   "
+                f"Sólo en banco: {len(res['sin_conciliar_banco'])}   "
+                f"Sólo en libros: {len(res['sin_conciliar_libros'])}"
+            ))
+
+        ttk.Button(top, text='Elegir extracto y conciliar', style='Big.TButton', command=conciliar)\
+            .pack(side='left', padx=10)
+
+    def _build_mayor(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Libro Mayor', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Cuenta:', style='Field.TLabel').pack(side='left', padx=5)
+        e_cuenta = ttk.Entry(top, style='Field.TEntry', width=15)
+        e_cuenta.pack(side='left')
+        ttk.Label(top, text='Desde:', style='Field.TLabel').pack(side='left', padx=5)
+        e_desde = ttk.Entry(top, style='Field.TEntry', width=12)
+        e_desde.pack(side='left')
+        ttk.Label(top, text='Hasta:', style='Field.TLabel').pack(side='left', padx=5)
+        e_hasta = ttk.Entry(top, style='Field.TEntry', width=12)
+        e_hasta.pack(side='left')
+        l_cuenta = ttk.Label(parent, text='', style='Field.TLabel')
+        l_cuenta.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Fecha', 'Origen', 'Detalle', 'Debe', 'Haber', 'Saldo']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=260 if h == 'Detalle' else 110, anchor='w' if h == 'Detalle' else 'center')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def mostrar(event=None):
+            cuenta = e_cuenta.get().strip()
+            desde = parse_fecha(e_desde.get().strip())
+            hasta = parse_fecha(e_hasta.get().strip())
+            libro = mayor.obtener().libro(cuenta, desde, hasta)
+            tree.delete(*tree.get_children())
+            for fecha, origen, detalle, debe, haber, saldo in libro:
+                tree.insert('', 'end', values=(
+                    fecha.strftime('%d/%m/%Y'), f'{origen[0]} {origen[1]}', detalle,
+                    a_pesos(debe) if debe else '', a_pesos(haber) if haber else '', a_pesos(saldo)
+                ))
+            saldo_final = libro[-1][5] if libro else 0
+            l_cuenta.config(text=f"{self.plan.get(cuenta, '')}   Movimientos: {len(libro)}   "
+                                 f"Saldo: {a_pesos(saldo_final)}")
+
+        for e in (e_cuenta, e_desde, e_hasta):
+            e.bind('<Return>', mostrar)
+        ttk.Button(top, text='Ver', style='Big.TButton', command=mostrar).pack(side='left', padx=10)
+
+    def _build_rep_impuestos(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Impuestos por Mes', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Desde (AAAA-MM):', style='Field.TLabel').pack(side='left', padx=5)
+        e_desde = ttk.Entry(top, style='Field.TEntry', width=10)
+        e_desde.pack(side='left')
+        ttk.Label(top, text='Hasta (AAAA-MM):', style='Field.TLabel').pack(side='left', padx=5)
+        e_hasta = ttk.Entry(top, style='Field.TEntry', width=10)
+        e_hasta.pack(side='left')
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Mes', 'Cuenta', 'Nombre Cuenta', 'Impuesto', 'Importe']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=240 if h == 'Nombre Cuenta' else 110, anchor='center')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def mostrar(event=None):
+            filas = reporte_impuestos.obtener().filas(e_desde.get().strip(), e_hasta.get().strip())
+            tree.delete(*tree.get_children())
+            for mes, cuenta, impuesto, importe in filas:
+                tree.insert('', 'end', values=(mes, cuenta, self.plan.get(cuenta, ''),
+                                               impuesto, a_pesos(importe)))
+
+        def exportar():
+            ruta = filedialog.asksaveasfilename(
+                title='Exportar reporte', defaultextension='.csv',
+                filetypes=[('CSV', '*.csv')]
+            )
+            if not ruta:
+                return
+            try:
+                n = reporte_impuestos.obtener().exportar_csv(
+                    ruta, e_desde.get().strip(), e_hasta.get().strip())
+            except OSError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            messagebox.showinfo('Éxito', f'Se exportaron {n} filas.')
+
+        for e in (e_desde, e_hasta):
+            e.bind('<Return>', mostrar)
+        ttk.Button(top, text='Ver', style='Big.TButton', command=mostrar).pack(side='left', padx=10)
+        ttk.Button(top, text='Exportar CSV', style='Big.TButton', command=exportar).pack(side='left')
+
+    def _build_estado_cuenta(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Estado de Cuenta y Morosidad', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        entradas = {}
+        for fila, campos in enumerate((
+            (('Parcela:', 'parcela', 10), ('Nombre:', 'nombre', 30)),
+            (('Meses sin pago:', 'meses', 5), ('Corte (DD/MM/AAAA):', 'corte', 12)),
+        )):
+            for col, (texto, clave, ancho) in enumerate(campos):
+                ttk.Label(top, text=texto, style='Field.TLabel')\
+                    .grid(row=fila, column=2*col, sticky='e', padx=5, pady=3)
+                ent = ttk.Entry(top, style='Field.TEntry', width=ancho)
+                ent.grid(row=fila, column=2*col+1, sticky='w', pady=3)
+                entradas[clave] = ent
+        entradas['meses'].insert(0, str(estado_cuenta.MESES_MOROSIDAD))
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        tree = ttk.Treeview(cont, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def columnas(headers):
+            tree.delete(*tree.get_children())
+            tree['columns'] = headers
+            for h in headers:
+                tree.heading(h, text=h)
+                tree.column(h, width=220 if h == 'Nombre' else 120, anchor='center')
+
+        def ver_estado():
+            try:
+                movimientos, por_periodo = estado_cuenta.estado_de_cuenta(
+                    entradas['parcela'].get().strip(), entradas['nombre'].get().strip())
+            except RuntimeError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            columnas(['Período', 'Fecha', 'Cobro ID', 'Importe'])
+            items = {mes: tree.insert('', 'end', values=(mes, '', '', a_pesos(total)))
+                     for mes, total in por_periodo.items()}
+            for fecha, id_cobro, importe in movimientos:
+                if fecha:
+                    tree.insert(items[f'{fecha.year:04d}-{fecha.month:02d}'], 'end', values=(
+                        '', fecha.strftime('%d/%m/%Y'), id_cobro, a_pesos(importe)))
+            tree.configure(show='tree headings')
+            l_resumen.config(text=f'Cobros: {len(movimientos)}   '
+                                  f'Total: {a_pesos(sum(m[2] for m in movimientos))}')
+
+        def ver_morosos():
+            try:
+                meses = int(entradas['meses'].get())
+                lista = estado_cuenta.morosos(
+                    meses, estado_cuenta.fecha_corte(entradas['corte'].get()))
+            except ValueError:
+                messagebox.showerror('Error', 'Cantidad de meses inválida.')
+                return
+            except RuntimeError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            columnas(['Cliente ID', 'Nombre', 'Parcela', 'Último cobro', 'Meses sin pago'])
+            tree.configure(show='headings')
+            for id_cli, nombre, parcela, ultimo, atraso in lista:
+                tree.insert('', 'end', values=(
+                    id_cli, nombre, parcela,
+                    ultimo.strftime('%d/%m/%Y') if ultimo else 'nunca',
+                    '' if atraso is None else atraso
+                ))
+            l_resumen.config(text=f'Parcelas en mora: {len(lista)}')
+
+        botones = ttk.Frame(top)
+        botones.grid(row=0, column=4, rowspan=2, padx=10)
+        ttk.Button(botones, text='Ver estado', style='Big.TButton', command=ver_estado).pack(pady=2)
+        ttk.Button(botones, text='Ver morosos', style='Big.TButton', command=ver_morosos).pack(pady=2)
+
+    def _build_expensas(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Expensas del Mes', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Fecha:', style='Field.TLabel').grid(row=0, column=0, sticky='e', padx=5, pady=3)
+        e_fecha = ttk.Entry(top, style='Field.TEntry', width=12)
+        e_fecha.grid(row=0, column=1, sticky='w')
+        e_fecha.insert(0, datetime.date.today().strftime('%d/%m/%Y'))
+        ttk.Label(top, text='Cuenta cobro:', style='Field.TLabel').grid(row=0, column=2, sticky='e', padx=5)
+        e_cuenta = ttk.Entry(top, style='Field.TEntry', width=12)
+        e_cuenta.grid(row=0, column=3, sticky='w')
+        ttk.Label(top, text='Observaciones:', style='Field.TLabel').grid(row=0, column=4, sticky='e', padx=5)
+        e_obs = ttk.Entry(top, style='Field.TEntry', width=25)
+        e_obs.grid(row=0, column=5, sticky='w')
+
+        imps = []
+        for i in range(3):
+            ttk.Label(top, text=f'Imputación {i+1}:', style='Field.TLabel')\
+                .grid(row=i+1, column=0, sticky='e', padx=5, pady=3)
+            e_cod = ttk.Entry(top, style='Field.TEntry', width=12)
+            e_cod.grid(row=i+1, column=1, sticky='w')
+            ttk.Label(top, text='Importe:', style='Field.TLabel').grid(row=i+1, column=2, sticky='e', padx=5)
+            e_imp = ttk.Entry(top, style='Field.TEntry', width=12)
+            e_imp.grid(row=i+1, column=3, sticky='w')
+            l_nom = ttk.Label(top, text='', style='Field.TLabel')
+            l_nom.grid(row=i+1, column=4, columnspan=2, sticky='w', padx=5)
+            e_cod.bind('<KeyRelease>', lambda e, l=l_nom: l.config(text=self.plan.get(e.widget.get().strip(), '')))
+            imps.append((e_cod, e_imp))
+        por_m2 = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top, text='Importes por m² (según superficie)', variable=por_m2)\
+            .grid(row=4, column=1, columnspan=3, sticky='w', pady=3)
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Nombre', 'Parcela', 'Imp. 1', 'Imp. 2', 'Imp. 3', 'Total', 'IVA', 'IIBB', 'DByCR']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=240 if h == 'Nombre' else 90, anchor='center')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        borradores = {}   # iid del Treeview → cobro sin grabar
+
+        def resumen(omitidos=()):
+            total = sum(c.montoA for c in borradores.values())
+            texto = f'Borradores: {len(borradores)}   Total: {a_pesos(total)}'
+            if omitidos:
+                motivos = {}
+                for _, _, motivo in omitidos:
+                    motivos[motivo] = motivos.get(motivo, 0) + 1
+                texto += '   Omitidos: ' + ', '.join(f'{n} {m}' for m, n in motivos.items())
+            l_resumen.config(text=texto)
+
+        def generar():
+            if parse_fecha(e_fecha.get()) is None:
+                messagebox.showerror('Error', 'Fecha inválida (DD/MM/AAAA).')
+                return
+            try:
+                plantilla = [(c.get().strip(), a_centavos(i.get())) for c, i in imps if c.get().strip()]
+                nuevos, omitidos, repetidos = expensas.generar_borradores(
+                    e_fecha.get().strip(), plantilla, e_cuenta.get().strip(),
+                    por_superficie=por_m2.get(), observaciones=e_obs.get().strip())
+            except ValueError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            tree.delete(*tree.get_children())
+            borradores.clear()
+            for c in nuevos:
+                iid = tree.insert('', 'end', values=(
+                    c.nombreCompleto, c.numParcela,
+                    a_pesos(c.importeBruto1), a_pesos(c.importeBruto2), a_pesos(c.importeBruto3),
+                    a_pesos(c.montoA), a_pesos(c.iva), a_pesos(c.anticipoIIBB), a_pesos(c.impuestoDBCRb)
+                ))
+                borradores[iid] = c
+            resumen(omitidos)
+            if repetidos:
+                nombres = '\n'.join(f'{c.nombreCompleto} ({c.numParcela})' for c in repetidos[:20])
+                extra = f'\n(y {len(repetidos) - 20} más)' if len(repetidos) > 20 else ''
+                messagebox.showwarning(
+                    'Borradores repetidos',
+                    'Estos borradores son iguales a otro de la misma tanda (misma fecha, '
+                    'pagador e importes). Quítelos si no corresponden:\n' + nombres + extra)
+
+        def quitar():
+            for iid in tree.selection():
+                borradores.pop(iid, None)
+                tree.delete(iid)
+            resumen()
+
+        def grabar():
+            if not borradores:
+                messagebox.showwarning('Atención', 'No hay borradores para grabar.')
+                return
+            if not messagebox.askyesno('Confirmar', f'¿Grabar {len(borradores)} cobros?'):
+                return
+            lista = [borradores[iid] for iid in tree.get_children()]
+            n = expensas.grabar_borradores(lista)
+            tree.delete(*tree.get_children())
+            borradores.clear()
+            resumen()
+            messagebox.showinfo('Éxito', f'Se grabaron {n} cobros.')
+
+        botones = ttk.Frame(top)
+        botones.grid(row=0, column=6, rowspan=5, padx=10)
+        ttk.Button(botones, text='Generar borradores', style='Big.TButton', command=generar).pack(pady=2)
+        ttk.Button(botones, text='Quitar seleccionados', style='Big.TButton', command=quitar).pack(pady=2)
+        ttk.Button(botones, text='Grabar todos', style='Big.TButton', command=grabar).pack(pady=2)
+
+    def _build_diario(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Libro Diario', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        entradas = {}
+        for col, (texto, clave, ancho) in enumerate((
+            ('Año:', 'anio', 6), ('Desde:', 'desde', 12), ('Hasta:', 'hasta', 12),
+        )):
+            ttk.Label(top, text=texto, style='Field.TLabel').grid(row=0, column=2*col, sticky='e', padx=5)
+            ent = ttk.Entry(top, style='Field.TEntry', width=ancho)
+            ent.grid(row=0, column=2*col+1, sticky='w')
+            entradas[clave] = ent
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Origen', 'ID', 'Motivo']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=400 if h == 'Motivo' else 100, anchor='center')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def mostrar(resultado):
+            n_lineas, descuadrados = resultado
+            tree.delete(*tree.get_children())
+            for tipo, id_reg, motivo in descuadrados:
+                tree.insert('', 'end', values=(tipo, id_reg, motivo))
+            l_resumen.config(text=f'Partidas grabadas: {n_lineas}   '
+                                  f'Registros sin asiento (ver abajo): {len(descuadrados)}')
+
+        def regenerar():
+            texto = entradas['anio'].get().strip()
+            try:
+                anio = int(texto) if texto else None
+            except ValueError:
+                messagebox.showerror('Error', 'Año inválido.')
+                return
+            mostrar(asientos.regenerar(anio))
+
+        def exportar():
+            ruta = filedialog.asksaveasfilename(
+                title='Exportar libro diario', defaultextension='.csv',
+                filetypes=[('CSV', '*.csv')]
+            )
+            if not ruta:
+                return
+            asientos.actualizar()
+            try:
+                n = asientos.exportar_csv(ruta, parse_fecha(entradas['desde'].get()),
+                                          parse_fecha(entradas['hasta'].get()))
+            except OSError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            messagebox.showinfo('Éxito', f'Se exportaron {n} asientos.')
+
+        botones = ttk.Frame(top)
+        botones.grid(row=0, column=6, padx=10)
+        ttk.Button(botones, text='Actualizar', style='Big.TButton',
+                   command=lambda: mostrar(asientos.actualizar())).pack(side='left', padx=2)
+        ttk.Button(botones, text='Regenerar', style='Big.TButton', command=regenerar).pack(side='left', padx=2)
+        ttk.Button(botones, text='Exportar CSV', style='Big.TButton', command=exportar).pack(side='left', padx=2)
+
+    def _build_flujo(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Flujo de Caja', style='Title.TLabel').pack(pady=10)
+
+        hoy = datetime.date.today()
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        entradas = {}
+        for col, (texto, clave, ancho, inicial) in enumerate((
+            ('Cuenta (vacío = todas):', 'cuenta', 12, ''),
+            ('Desde:', 'desde', 12, hoy.replace(month=1, day=1).strftime('%d/%m/%Y')),
+            ('Hasta:', 'hasta', 12, hoy.strftime('%d/%m/%Y')),
+            ('Días a proyectar:', 'proyectar', 5, '30'),
+        )):
+            ttk.Label(top, text=texto, style='Field.TLabel').grid(row=0, column=2*col, sticky='e', padx=5)
+            ent = ttk.Entry(top, style='Field.TEntry', width=ancho)
+            ent.grid(row=0, column=2*col+1, sticky='w')
+            ent.insert(0, inicial)
+            entradas[clave] = ent
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Fecha', 'Entradas', 'Salidas', 'Neto', 'Saldo']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=130, anchor='center')
+        tree.tag_configure('proyectado', foreground='gray')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def mostrar(event=None):
+            cuenta = entradas['cuenta'].get().strip()
+            cuentas = [cuenta] if cuenta else flujo_caja.cuentas_caja(self.plan)
+            desde = parse_fecha(entradas['desde'].get())
+            hasta = parse_fecha(entradas['hasta'].get())
+            if desde is None or hasta is None or hasta < desde:
+                messagebox.showerror('Error', 'Rango de fechas inválido (DD/MM/AAAA).')
+                return
+            try:
+                n_proy = int(entradas['proyectar'].get() or 0)
+                serie = flujo_caja.serie_diaria(cuentas, desde, hasta)
+                proy = flujo_caja.proyeccion(cuentas, hasta + datetime.timedelta(days=1), n_proy)
+            except ValueError:
+                messagebox.showerror('Error', 'Cantidad de días inválida.')
+                return
+            except RuntimeError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            tree.delete(*tree.get_children())
+            for dia, ent, sal, saldo in zip(serie['dias'].astype(datetime.date), serie['entradas'].tolist(),
+                                            serie['salidas'].tolist(), serie['saldo'].tolist()):
+                tree.insert('', 'end', values=(dia.strftime('%d/%m/%Y'), a_pesos(ent), a_pesos(sal),
+                                               a_pesos(ent - sal), a_pesos(saldo)))
+            for dia, neto, saldo in zip(proy['dias'].astype(datetime.date), proy['neto'].tolist(),
+                                        proy['saldo'].tolist()):
+                tree.insert('', 'end', tags=('proyectado',), values=(
+                    dia.strftime('%d/%m/%Y') + ' (proy.)', '', '', a_pesos(neto), a_pesos(saldo)))
+            l_resumen.config(text=(
+                f"Entradas: {a_pesos(int(serie['entradas'].sum()))}   "
+                f"Salidas: {a_pesos(int(serie['salidas'].sum()))}   "
+                f"Saldo al {hasta.strftime('%d/%m/%Y')}: "
+                f"{a_pesos(int(serie['saldo'][-1]) if len(serie['saldo']) else 0)}"
+            ))
+
+        for e in entradas.values():
+            e.bind('<Return>', mostrar)
+        ttk.Button(top, text='Ver', style='Big.TButton', command=mostrar).grid(row=0, column=8, padx=10)
+
+    def _build_pivot(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Tablas Dinámicas', style='Title.TLabel').pack(pady=10)
+
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        archivos = {'Cobros': 'cobros.txt', 'Pagos': 'pagos.txt'}
+        combos = {}
+        for col, (texto, clave, ancho) in enumerate((
+            ('Archivo:', 'archivo', 8),
+            ('Filas:', 'fila1', 16),
+            ('y:', 'fila2', 16),
+            ('Columnas:', 'columna', 16),
+            ('Importe:', 'valor', 14),
+            ('Agregación:', 'agregacion', 10),
+        )):
+            ttk.Label(top, text=texto, style='Field.TLabel').grid(row=0, column=2*col, sticky='e', padx=5)
+            cb = ttk.Combobox(top, state='readonly', width=ancho)
+            cb.grid(row=0, column=2*col+1, sticky='w')
+            combos[clave] = cb
+        combos['archivo']['values'] = list(archivos)
+        combos['archivo'].set('Cobros')
+        combos['agregacion']['values'] = list(pivot.AGREGACIONES)
+        combos['agregacion'].set('suma')
+
+        entradas = {}
+        for col, (texto, clave) in enumerate((('Desde:', 'desde'), ('Hasta:', 'hasta'))):
+            ttk.Label(top, text=texto, style='Field.TLabel').grid(row=1, column=2*col, sticky='e', padx=5, pady=5)
+            ent = ttk.Entry(top, style='Field.TEntry', width=12)
+            ent.grid(row=1, column=2*col+1, sticky='w')
+            entradas[clave] = ent
+
+        def cambiar_archivo(event=None):
+            filename = archivos[combos['archivo'].get()]
+            dims = pivot.dimensiones(filename)
+            for clave in ('fila1', 'fila2', 'columna'):
+                combos[clave]['values'] = ([''] if clave != 'fila1' else []) + dims
+                combos[clave].set('')
+            combos['fila1'].set(dims[0])
+            combos['valor']['values'] = pivot.valores(filename)
+            combos['valor'].set(pivot.valores(filename)[0])
+        combos['archivo'].bind('<<ComboboxSelected>>', cambiar_archivo)
+        cambiar_archivo()
+
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        tree = ttk.Treeview(cont, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        hsb = ttk.Scrollbar(cont, orient='horizontal', command=tree.xview)
+        tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        hsb.grid(row=1, column=0, sticky='ew')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        ultimo = {}
+
+        def calcular():
+            filas = [c for c in (combos['fila1'].get(), combos['fila2'].get()) if c]
+            desde = hasta = None
+            for clave in ('desde', 'hasta'):
+                texto = entradas[clave].get().strip()
+                if texto:
+                    fecha = parse_fecha(texto)
+                    if fecha is None:
+                        messagebox.showerror('Error', f'Fecha inválida: {texto!r} (DD/MM/AAAA).')
+                        return None
+                    if clave == 'desde':
+                        desde = fecha
+                    else:
+                        hasta = fecha
+            try:
+                return pivot.pivot(archivos[combos['archivo'].get()], filas,
+                                   combos['columna'].get() or None, combos['valor'].get(),
+                                   combos['agregacion'].get(), desde, hasta)
+            except (ValueError, RuntimeError) as e:
+                messagebox.showerror('Error', str(e))
+                return None
+
+        def mostrar(event=None):
+            resultado = calcular()
+            if resultado is None:
+                return
+            agregacion = combos['agregacion'].get()
+            headers = resultado['filas'] + resultado['columnas']
+            tree.delete(*tree.get_children())
+            tree.configure(columns=[str(i) for i in range(len(headers))])
+            for i, h in enumerate(headers):
+                tree.heading(str(i), text=h)
+                tree.column(str(i), width=160 if i < len(resultado['filas']) else 110,
+                            anchor='w' if i < len(resultado['filas']) else 'e', stretch=False)
+            for etiquetas, vals in resultado['datos']:
+                tree.insert('', 'end', values=list(etiquetas) + [pivot.formatear(v, agregacion) for v in vals])
+            ultimo['resultado'], ultimo['agregacion'] = resultado, agregacion
+            l_resumen.config(text=f"{len(resultado['datos'])} filas × {len(resultado['columnas'])} columnas")
+
+        def exportar():
+            if 'resultado' not in ultimo:
+                mostrar()
+                if 'resultado' not in ultimo:
+                    return
+            ruta = filedialog.asksaveasfilename(
+                title='Exportar tabla dinámica', defaultextension='.csv',
+                filetypes=[('CSV', '*.csv')]
+            )
+            if not ruta:
+                return
+            try:
+                n = pivot.exportar_csv(ultimo['resultado'], ruta, ultimo['agregacion'])
+            except OSError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            messagebox.showinfo('Éxito', f'Se exportaron {n} filas.')
+
+        for e in entradas.values():
+            e.bind('<Return>', mostrar)
+        botones = ttk.Frame(top)
+        botones.grid(row=1, column=4, columnspan=8, sticky='w', padx=10)
+        ttk.Button(botones, text='Ver', style='Big.TButton', command=mostrar).pack(side='left')
+        ttk.Button(botones, text='Exportar CSV', style='Big.TButton', command=exportar).pack(side='left', padx=10)
+
+    def _build_cierre(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Cierre de Período', style='Title.TLabel').pack(pady=10)
+
+        hoy = datetime.date.today()
+        anterior = hoy.replace(day=1) - datetime.timedelta(days=1)
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Período (AAAA-MM):', style='Field.TLabel').grid(row=0, column=0, sticky='e', padx=5)
+        e_mes = ttk.Entry(top, style='Field.TEntry', width=10)
+        e_mes.grid(row=0, column=1, sticky='w')
+        e_mes.insert(0, anterior.strftime('%Y-%m'))
+        ttk.Label(top, text='Año:', style='Field.TLabel').grid(row=1, column=0, sticky='e', padx=5, pady=5)
+        e_anio = ttk.Entry(top, style='Field.TEntry', width=10)
+        e_anio.grid(row=1, column=1, sticky='w')
+        e_anio.insert(0, str(hoy.year))
+        ttk.Label(top, text='Hasta mes:', style='Field.TLabel').grid(row=1, column=2, sticky='e', padx=5)
+        e_hasta = ttk.Entry(top, style='Field.TEntry', width=5)
+        e_hasta.grid(row=1, column=3, sticky='w')
+        e_hasta.insert(0, str(hoy.month))
+
+        l_cerrados = ttk.Label(parent, text='', style='Field.TLabel')
+        l_cerrados.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        headers = ['Cuenta', 'Nombre', 'Debe', 'Haber', 'Saldo']
+        tree = ttk.Treeview(cont, columns=headers, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        for h in headers:
+            tree.heading(h, text=h)
+            tree.column(h, width=250 if h == 'Nombre' else 120, anchor='w' if h == 'Nombre' else 'center')
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        def mostrar_cerrados():
+            meses = [mes for mes, _ in cierre.cierres()]
+            l_cerrados.config(text='Meses cerrados: ' + (', '.join(meses) if meses else 'ninguno'))
+
+        def cerrar():
+            mes = e_mes.get().strip()
+            if not messagebox.askyesno('Confirmar', f'¿Cerrar el período {mes}? '
+                                       'Sus cobros y pagos no se podrán modificar hasta reabrirlo.'):
+                return
+            try:
+                cierre.cerrar(mes)
+            except (ValueError, RuntimeError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            mostrar_cerrados()
+            messagebox.showinfo('Éxito', f'Período {mes} cerrado.')
+
+        def reabrir():
+            mes = e_mes.get().strip()
+            if not messagebox.askyesno('Confirmar', f'¿Reabrir el período {mes}?'):
+                return
+            try:
+                cierre.reabrir(mes)
+            except ValueError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            mostrar_cerrados()
+            messagebox.showinfo('Éxito', f'Período {mes} reabierto.')
+
+        def acumulado(event=None):
+            try:
+                total = cierre.acumulado_anual(int(e_anio.get()), int(e_hasta.get()))
+            except (ValueError, RuntimeError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            tree.delete(*tree.get_children())
+            for cuenta, (debe, haber) in sorted(total['cuentas'].items()):
+                tree.insert('', 'end', values=(cuenta, self.plan.get(cuenta, ''), a_pesos(debe),
+                                               a_pesos(haber), a_pesos(debe - haber)))
+
+        for e in (e_anio, e_hasta):
+            e.bind('<Return>', acumulado)
+        ttk.Button(top, text='Cerrar período', style='Big.TButton', command=cerrar).grid(row=0, column=2, columnspan=2, padx=10)
+        ttk.Button(top, text='Reabrir', style='Big.TButton', command=reabrir).grid(row=0, column=4, padx=10)
+        ttk.Button(top, text='Acumulado', style='Big.TButton', command=acumulado).grid(row=1, column=4, padx=10)
+        mostrar_cerrados()
+
+    def _build_recalculo(self, parent):
+        for w in parent.winfo_children():
+            w.destroy()
+
+        ttk.Label(parent, text='Recalcular Impuestos', style='Title.TLabel').pack(pady=10)
+
+        archivos = {'Cobros': 'cobros.txt', 'Pagos': 'pagos.txt'}
+        top = ttk.Frame(parent, padding=(10,0))
+        top.pack(fill='x')
+        ttk.Label(top, text='Archivo:', style='Field.TLabel').grid(row=0, column=0, sticky='e', padx=5)
+        cb_archivo = ttk.Combobox(top, values=list(archivos), state='readonly', width=10)
+        cb_archivo.grid(row=0, column=1, sticky='w')
+        cb_archivo.set('Cobros')
+        entradas = {}
+        for col, (clave, texto, ancho) in enumerate((('desde', 'Desde:', 12), ('hasta', 'Hasta:', 12),
+                                                    ('cuenta', 'Cuenta:', 14))):
+            ttk.Label(top, text=texto, style='Field.TLabel').grid(row=0, column=2 + 2 * col, sticky='e', padx=5)
+            e = ttk.Entry(top, style='Field.TEntry', width=ancho)
+            e.grid(row=0, column=3 + 2 * col, sticky='w')
+            entradas[clave] = e
+
+        l_resumen = ttk.Label(parent, text='', style='Field.TLabel')
+        l_resumen.pack(pady=5)
+
+        cont = ttk.Frame(parent, padding=10)
+        cont.pack(expand=True, fill='both')
+        tree = ttk.Treeview(cont, show='headings')
+        vsb = ttk.Scrollbar(cont, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        cont.grid_rowconfigure(0, weight=1)
+        cont.grid_columnconfigure(0, weight=1)
+
+        nombres = {'impuestoDBCRb': 'DByCR', 'anticipoIIBB': 'IIBB', 'iva': 'IVA'}
+        limite_vista = 2000
+        resultado = None
+
+        def vista_previa():
+            nonlocal resultado
+            filename = archivos[cb_archivo.get()]
+            fechas = {}
+            for clave in ('desde', 'hasta'):
+                texto = entradas[clave].get().strip()
+                fechas[clave] = parse_fecha(texto) if texto else None
+                if texto and fechas[clave] is None:
+                    messagebox.showerror('Error', f'Fecha inválida: {texto!r} (DD/MM/AAAA).')
+                    return
+            try:
+                resultado = recalculo.calcular(filename, fechas['desde'], fechas['hasta'],
+                                               entradas['cuenta'].get().strip() or None)
+            except (ValueError, RuntimeError) as e:
+                messagebox.showerror('Error', str(e))
+                return
+            campos = recalculo.CAMPOS[filename]
+            headers = ['ID', 'Fecha', 'Nombre']
+            for campo in campos:
+                headers += [f'{nombres[campo]} grabado', f'{nombres[campo]} nuevo']
+            tree.delete(*tree.get_children())
+            tree.configure(columns=headers)
+            for h in headers:
+                tree.heading(h, text=h)
+                tree.column(h, width=220 if h == 'Nombre' else 110, anchor='w' if h == 'Nombre' else 'center')
+            for fila in resultado.filas_vista(limite_vista):
+                tree.insert('', 'end', values=fila[:3] + tuple(a_pesos(v) for v in fila[3:]))
+            difs = resultado.diferencias()
+            texto = (f'{len(resultado)} de {resultado.revisados} registros cambian. Diferencia: '
+                     + ', '.join(f'{nombres[c]} {a_pesos(difs[c])}' for c in campos))
+            if len(resultado) > limite_vista:
+                texto += f' (se muestran los primeros {limite_vista})'
+            l_resumen.config(text=texto)
+
+        def aplicar():
+            nonlocal resultado
+            if resultado is None or not len(resultado):
+                messagebox.showwarning('Atención', 'No hay cambios para aplicar (calcule la vista previa).')
+                return
+            if not messagebox.askyesno('Confirmar', f'¿Grabar los impuestos recalculados de '
+                                       f'{len(resultado)} registros?'):
+                return
+            try:
+                n = recalculo.aplicar(resultado)
+            except ValueError as e:
+                messagebox.showerror('Error', str(e))
+                return
+            resultado = None
+            tree.delete(*tree.get_children())
+            l_resumen.config(text='')
+            messagebox.showinfo('Éxito', f'Se actualizaron {n} registros.')
+
+        ttk.Button(top, text='Vista previa', style='Big.TButton', command=vista_previa).grid(row=0, column=8, padx=10)
+        ttk.Button(top, text='Aplicar', style='Big.TButton', command=aplicar).grid(row=0, column=9, padx=5)
 
 if __name__ == '__main__':
+    # Necesario para que el pool de procesos de storage funcione en el
+    # ejecutable armado con PyInstaller (Windows).
+    multiprocessing.freeze_support()
     App().mainloop()
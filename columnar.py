@@ -0,0 +1,222 @@
+# columnar.py
+#
+# Snapshot en columnas (arrays de NumPy) de cobros.txt o pagos.txt, para
+# sacar totales (por cuenta, por mes, ...) con reducciones vectorizadas en
+# lugar de recorrer los registros uno por uno.
+#
+# NumPy es opcional: si no está instalado HAY_NUMPY es False y quien
+# necesite totales tiene que recorrer los registros de storage.
+
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from storage import ENTIDADES, version_archivo, leer_desde
+from fechas import parse_fecha
+from indices import normalizar
+
+HAY_NUMPY = np is not None
+
+# Columnas con códigos de cuenta (se guardan codificadas en un diccionario)
+CUENTAS = {
+    'cobros.txt': ('imputacion1', 'imputacion2', 'imputacion3', 'numCuentaA', 'numCuentaB'),
+    'pagos.txt':  ('numCuenta', 'cuentaAcreditar'),
+}
+
+# Columnas de texto que se codifican normalizadas (ver indices.normalizar)
+# y tienen índice secundario: código → filas con ese valor
+TEXTOS = {
+    'cobros.txt': ('nombreCompleto', 'numParcela'),
+    'pagos.txt':  ('razonSocial', 'concepto', 'tipoComprobante'),
+}
+
+_EPOCA = datetime.date(1970, 1, 1)
+_NAT = -2**63  # valor entero de NaT en datetime64
+
+
+def _dia(texto):
+    """'DD/MM/AAAA' → días desde 1970-01-01 (NaT si la fecha no es válida)."""
+    f = parse_fecha(texto)
+    return (f - _EPOCA).days if f else _NAT
+
+
+class Diccionario:
+    """Codifica textos repetidos como enteros 0..n-1 (y los decodifica)."""
+
+    def __init__(self):
+        self.valores = []
+        self.codigos = {}
+
+    def codificar(self, valor):
+        cod = self.codigos.get(valor)
+        if cod is None:
+            cod = self.codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return cod
+
+    def __len__(self):
+        return len(self.valores)
+
+
+class Snapshot:
+    """
+    Columnas de un archivo de cobros o pagos:
+      - 'id'     int64
+      - 'fecha'  datetime64[D] (NaT si la fecha no es válida)
+      - cuentas  int32, códigos de self.cuentas (ver CUENTAS)
+      - textos   int32, códigos de self.textos[campo] (ver TEXTOS)
+      - importes int64 en centavos (los IMPORTES del registro)
+
+    refrescar() lee sólo lo agregado al final del archivo desde la última
+    vez; si el archivo se reescribió (edición/borrado) se reconstruye.
+    """
+
+    def __init__(self, filename):
+        if np is None:
+            raise RuntimeError('El snapshot en columnas necesita NumPy.')
+        self.filename = filename
+        self.campos_cuenta = CUENTAS[filename]
+        self.campos_texto = TEXTOS[filename]
+        self.campos_importe = ENTIDADES[filename].IMPORTES
+        self._reiniciar()
+        self.refrescar()
+
+    def _reiniciar(self):
+        self.cuentas = Diccionario()
+        self.textos = {c: Diccionario() for c in self.campos_texto}
+        self._filas = {c: [] for c in self.campos_texto}
+        self._crudos = {c: {} for c in self.campos_texto}   # texto tal cual → código
+        self.n = 0
+        self._generacion = None
+        self._offset = 0
+        self._cols = {
+            'id': np.zeros(0, np.int64),
+            'fecha': np.zeros(0, 'datetime64[D]'),
+        }
+        for c in self.campos_cuenta + self.campos_texto:
+            self._cols[c] = np.zeros(0, np.int32)
+        for c in self.campos_importe:
+            self._cols[c] = np.zeros(0, np.int64)
+
+    def refrescar(self):
+        """Incorpora lo nuevo del archivo. Devuelve cuántos registros se agregaron."""
+        generacion, tam = version_archivo(self.filename)
+        if generacion != self._generacion or tam < self._offset:
+            self._reiniciar()
+            self._generacion = generacion
+        if tam == self._offset:
+            return 0
+        registros, self._offset = leer_desde(self.filename, self._offset)
+        self.agregar(registros)
+        return len(registros)
+
+    def _reservar(self, total):
+        capacidad = len(self._cols['id'])
+        if total <= capacidad:
+            return
+        nueva = max(total, 2 * capacidad, 1024)
+        for nombre, col in self._cols.items():
+            ampliada = np.zeros(nueva, col.dtype)
+            ampliada[:self.n] = col[:self.n]
+            self._cols[nombre] = ampliada
+
+    def agregar(self, registros):
+        """Agrega registros (ya leídos) al final de las columnas."""
+        k = len(registros)
+        if not k:
+            return
+        self._reservar(self.n + k)
+        tramo = slice(self.n, self.n + k)
+        cols = self._cols
+        cols['id'][tramo] = [int(r.id) for r in registros]
+        cols['fecha'][tramo] = np.array([_dia(r.fecha) for r in registros], np.int64).view('datetime64[D]')
+        codificar = self.cuentas.codificar
+        for c in self.campos_cuenta:
+            cols[c][tramo] = [codificar(str(getattr(r, c)).strip()) for r in registros]
+        for c in self.campos_importe:
+            cols[c][tramo] = [getattr(r, c) for r in registros]
+        for c in self.campos_texto:
+            codificar = self.textos[c].codificar
+            crudos = self._crudos[c]
+            filas = self._filas[c]
+            cods = []
+            for fila, r in enumerate(registros, start=self.n):
+                texto = getattr(r, c)
+                cod = crudos.get(texto)
+                if cod is None:
+                    cod = crudos[texto] = codificar(normalizar(texto))
+                cods.append(cod)
+                if cod == len(filas):
+                    filas.append([])
+                filas[cod].append(fila)
+            cols[c][tramo] = cods
+        self.n += k
+
+    def __getitem__(self, columna):
+        return self._cols[columna][:self.n]
+
+    def __len__(self):
+        return self.n
+
+    def codigo_cuenta(self, cuenta):
+        """Código de `cuenta` en el diccionario (-1 si no aparece en el archivo)."""
+        return self.cuentas.codigos.get(cuenta, -1)
+
+    def codigo_texto(self, campo, valor):
+        """Código de `valor` (se normaliza) en la columna `campo` (-1 si no aparece)."""
+        return self.textos[campo].codigos.get(normalizar(valor), -1)
+
+    def filas_con(self, campo, valor):
+        """Posiciones (array) de los registros cuyo `campo` es `valor`, sin recorrer el archivo."""
+        cod = self.codigo_texto(campo, valor)
+        return np.array(self._filas[campo][cod] if cod >= 0 else [], np.int64)
+
+    def meses(self):
+        """Columna de fechas truncada a mes (datetime64[M])."""
+        return self['fecha'].astype('datetime64[M]')
+
+    def totales_por_cuenta(self, campo_cuenta, campo_importe, mascara=None):
+        """{cuenta: centavos} sumando `campo_importe` agrupado por `campo_cuenta`."""
+        cods = self[campo_cuenta]
+        valores = self[campo_importe]
+        if mascara is not None:
+            cods, valores = cods[mascara], valores[mascara]
+        sumas = sumar_por_grupo(cods, valores, len(self.cuentas))
+        return {
+            self.cuentas.valores[i]: int(sumas[i])
+            for i in np.flatnonzero(sumas)
+            if self.cuentas.valores[i]
+        }
+
+    def totales_por_mes(self, campo_importe, mascara=None):
+        """{'AAAA-MM': centavos} sumando `campo_importe` por mes de la fecha."""
+        meses = self.meses()
+        valores = self[campo_importe]
+        validos = ~np.isnat(meses)
+        if mascara is not None:
+            validos &= mascara
+        unicos, grupos = np.unique(meses[validos], return_inverse=True)
+        sumas = sumar_por_grupo(grupos, valores[validos], len(unicos))
+        return {str(m): int(t) for m, t in zip(unicos, sumas)}
+
+
+def sumar_por_grupo(grupos, valores, n_grupos):
+    """Suma entera (exacta, int64) de `valores` por código de grupo 0..n_grupos-1."""
+    sumas = np.zeros(n_grupos, np.int64)
+    np.add.at(sumas, grupos, valores)
+    return sumas
+
+
+_snapshots = {}
+
+def obtener(filename):
+    """Snapshot compartido de `filename`, ya refrescado con lo último del archivo."""
+    snap = _snapshots.get(filename)
+    if snap is None:
+        snap = _snapshots[filename] = Snapshot(filename)
+    else:
+        snap.refrescar()
+    return snap
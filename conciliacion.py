@@ -0,0 +1,173 @@
+# conciliacion.py
+#
+# Conciliación bancaria: cruza los movimientos de un extracto (CSV) con
+# lo registrado en una cuenta de caja/banco (cobros por numCuentaA /
+# numCuentaB y pagos por cuentaAcreditar).
+#
+# Primera pasada: hash-join por (cuenta, importe en centavos) y ventana de
+# fechas; si hay un solo candidato, se concilia. Segunda pasada: cuando
+# hay varios candidatos, decide la similitud de los nombres (pagador /
+# razón social contra la descripción del banco). Lo que no se puede
+# decidir queda como ambiguo.
+
+import io
+import csv
+import bisect
+import difflib
+import datetime
+import collections
+
+from fechas import parse_fecha
+from indices import normalizar
+from storage import load_cobros, load_pagos, load_periodo
+from import_movimientos import MAPEO_DEFECTO, parse_importe, parse_fecha_banco, celda
+
+# fecha: datetime.date, importe: centavos con signo (+ ingreso, - egreso),
+# origen: ('banco', nro de fila) o ('cobro'/'pago', id)
+Movimiento = collections.namedtuple('Movimiento', 'fecha importe nombre origen')
+
+VENTANA_DIAS = 3
+SIMILITUD_MINIMA = 0.6
+MARGEN_SIMILITUD = 0.1
+
+
+def leer_extracto(ruta_csv, mapeo=None, saltear=1, encoding='latin-1', delimitador=',',
+                  decimal=None):
+    """Movimientos del extracto bancario (mismas columnas que import_movimientos)."""
+    mapeo = mapeo or MAPEO_DEFECTO
+    with open(ruta_csv, 'r', encoding=encoding, newline='') as f:
+        texto = f.read()
+    movimientos = []
+    lector = csv.reader(io.StringIO(texto, newline=''), delimiter=delimitador)
+    for nro_fila, fila in enumerate(lector, start=1):
+        if nro_fila <= saltear or not any(c.strip() for c in fila):
+            continue
+        if 'importe' in mapeo:
+            importe = parse_importe(celda(fila, mapeo, 'importe'), decimal)
+        else:
+            importe = (parse_importe(celda(fila, mapeo, 'credito'), decimal)
+                       - parse_importe(celda(fila, mapeo, 'debito'), decimal))
+        if importe == 0:
+            continue
+        fecha = parse_fecha(parse_fecha_banco(celda(fila, mapeo, 'fecha')))
+        nombre = celda(fila, mapeo, 'nombre') or celda(fila, mapeo, 'descripcion')
+        movimientos.append(Movimiento(fecha, importe, nombre, ('banco', nro_fila)))
+    return movimientos
+
+
+def movimientos_en_libros(cuenta, cobros=None, pagos=None):
+    """Movimientos registrados en `cuenta` (cobros A/B como ingreso, pagos como egreso)."""
+    cobros = load_cobros() if cobros is None else cobros
+    pagos = load_pagos() if pagos is None else pagos
+    movimientos = []
+    for c in cobros:
+        fecha = parse_fecha(c.fecha)
+        if fecha is None:
+            continue
+        if str(c.numCuentaA).strip() == cuenta and c.montoA:
+            movimientos.append(Movimiento(fecha, c.montoA, c.nombreCompleto, ('cobro', c.id)))
+        if str(c.numCuentaB).strip() == cuenta and c.montoB:
+            movimientos.append(Movimiento(fecha, c.montoB, c.nombreCompleto, ('cobro', c.id)))
+    for p in pagos:
+        fecha = parse_fecha(p.fecha)
+        if fecha is not None and str(p.cuentaAcreditar).strip() == cuenta and p.montoNeto:
+            movimientos.append(Movimiento(fecha, -p.montoNeto, p.razonSocial, ('pago', p.id)))
+    return movimientos
+
+
+def _similitud(a, b):
+    return difflib.SequenceMatcher(None, normalizar(a), normalizar(b)).ratio()
+
+
+def conciliar(banco, libros, ventana_dias=VENTANA_DIAS):
+    """
+    Cruza los movimientos del banco con los de libros (ambos de la misma
+    cuenta). Devuelve un dict con:
+      'conciliados':          [(mov_banco, mov_libros), ...]
+      'ambiguos':             [(mov_banco, [candidatos]), ...]
+      'sin_conciliar_banco':  [mov_banco, ...]
+      'sin_conciliar_libros': [mov_libros, ...]
+    """
+    # Índice hash: importe → (fechas ordinales ordenadas, posiciones en `libros`)
+    por_importe = collections.defaultdict(list)
+    for i, m in enumerate(libros):
+        por_importe[m.importe].append((m.fecha.toordinal(), i))
+    indice = {}
+    for importe, lista in por_importe.items():
+        lista.sort()
+        indice[importe] = ([o for o, _ in lista], [i for _, i in lista])
+
+    usados = set()
+
+    def candidatos(m):
+        entrada = indice.get(m.importe)
+        if entrada is None:
+            return []
+        ordinales, posiciones = entrada
+        dia = m.fecha.toordinal()
+        ini = bisect.bisect_left(ordinales, dia - ventana_dias)
+        fin = bisect.bisect_right(ordinales, dia + ventana_dias)
+        return [posiciones[k] for k in range(ini, fin) if posiciones[k] not in usados]
+
+    conciliados, ambiguos, sin_banco = [], [], []
+
+    # 1) Coincidencias únicas por importe y fecha
+    pendientes = []
+    for m in banco:
+        cands = candidatos(m)
+        if len(cands) == 1:
+            usados.add(cands[0])
+            conciliados.append((m, libros[cands[0]]))
+        elif cands:
+            pendientes.append(m)
+        else:
+            sin_banco.append(m)
+
+    # 2) Varios candidatos: desempata el nombre (y la cercanía de la fecha)
+    for m in pendientes:
+        cands = candidatos(m)
+        if not cands:
+            sin_banco.append(m)
+            continue
+        if len(cands) == 1:
+            usados.add(cands[0])
+            conciliados.append((m, libros[cands[0]]))
+            continue
+        puntajes = sorted(
+            ((_similitud(m.nombre, libros[i].nombre),
+              -abs(libros[i].fecha.toordinal() - m.fecha.toordinal()), i) for i in cands),
+            reverse=True
+        )
+        mejor, segundo = puntajes[0], puntajes[1]
+        if mejor[0] >= SIMILITUD_MINIMA and mejor[0] - segundo[0] >= MARGEN_SIMILITUD:
+            usados.add(mejor[2])
+            conciliados.append((m, libros[mejor[2]]))
+        else:
+            ambiguos.append((m, cands))
+
+    # Los candidatos de un ambiguo quedan para revisar con él, no como sin conciliar
+    en_ambiguos = {i for _, cands in ambiguos for i in cands}
+    ambiguos = [(m, [libros[i] for i in cands]) for m, cands in ambiguos]
+    sin_libros = [m for i, m in enumerate(libros) if i not in usados and i not in en_ambiguos]
+    return {
+        'conciliados': conciliados,
+        'ambiguos': ambiguos,
+        'sin_conciliar_banco': sin_banco,
+        'sin_conciliar_libros': sin_libros,
+    }
+
+
+def conciliar_extracto(ruta_csv, cuenta, **opciones_csv):
+    """
+    Lee el extracto y lo concilia contra lo registrado en `cuenta` en el
+    rango de fechas del extracto (más la ventana de tolerancia).
+    """
+    banco = leer_extracto(ruta_csv, **opciones_csv)
+    fechas = [m.fecha for m in banco if m.fecha is not None]
+    if not fechas:
+        return conciliar(banco, [])
+    margen = datetime.timedelta(days=VENTANA_DIAS)
+    desde, hasta = min(fechas) - margen, max(fechas) + margen
+    libros = movimientos_en_libros(cuenta, load_periodo('cobros.txt', desde, hasta),
+                                   load_periodo('pagos.txt', desde, hasta))
+    return conciliar(banco, libros)
@@ -0,0 +1,155 @@
+# estado_cuenta.py
+#
+# Estado de cuenta por cliente / parcela y morosidad.
+#
+# Los cobros se vinculan con los clientes sólo por texto (nombreCompleto y
+# numParcela). El snapshot en columnas de cobros (columnar.py) guarda esos
+# textos normalizados y codificados, con un índice secundario código →
+# filas, así que el historial de una parcela sale sin recorrer el archivo
+# y los cálculos para todo el barrio son reducciones de NumPy.
+
+import datetime
+
+import columnar
+import cache_reportes
+from columnar import np
+from fechas import parse_fecha
+from storage import load_clients
+
+MESES_MOROSIDAD = 3
+
+_NAT = -2**63  # valor entero de NaT en datetime64
+
+
+def _snapshot():
+    if not columnar.HAY_NUMPY:
+        raise RuntimeError('El estado de cuenta necesita NumPy.')
+    return columnar.obtener('cobros.txt')
+
+
+def _totales(snap):
+    """Total imputado (importeBruto1 + 2 + 3) de cada cobro, en centavos."""
+    return snap['importeBruto1'] + snap['importeBruto2'] + snap['importeBruto3']
+
+
+def _a_fecha(dia):
+    """datetime64[D] → datetime.date (None si es NaT)."""
+    return None if np.isnat(dia) else dia.astype(datetime.date)
+
+
+def estado_de_cuenta(parcela='', nombre=''):
+    """
+    Cobros de una parcela y/o de un pagador. Devuelve (movimientos,
+    por_periodo): movimientos es una lista de (fecha, id, importe) ordenada
+    por fecha y por_periodo un dict {'AAAA-MM': centavos}.
+    """
+    snap = _snapshot()
+    filas = None
+    if parcela:
+        filas = snap.filas_con('numParcela', parcela)
+    if nombre:
+        por_nombre = snap.filas_con('nombreCompleto', nombre)
+        filas = por_nombre if filas is None else np.intersect1d(filas, por_nombre)
+    if filas is None or not len(filas):
+        return [], {}
+
+    fechas = snap['fecha'][filas]
+    ids = snap['id'][filas]
+    importes = _totales(snap)[filas]
+    orden = np.argsort(fechas, kind='stable')
+    movimientos = [(_a_fecha(fechas[i]), int(ids[i]), int(importes[i])) for i in orden]
+
+    mascara = np.zeros(len(snap), bool)
+    mascara[filas] = True
+    return movimientos, _por_mes(snap, _totales(snap), mascara)
+
+
+def _por_mes(snap, valores, mascara):
+    meses = snap.meses()
+    validos = mascara & ~np.isnat(meses)
+    unicos, grupos = np.unique(meses[validos], return_inverse=True)
+    sumas = columnar.sumar_por_grupo(grupos, valores[validos], len(unicos))
+    return {str(m): int(t) for m, t in zip(unicos, sumas)}
+
+
+def cobrado_por_parcela_y_mes(desde='', hasta=''):
+    """
+    Matriz de lo cobrado para todas las parcelas a la vez. Devuelve
+    (parcelas, meses, matriz) con matriz[i, j] en centavos para la parcela
+    parcelas[i] en el mes meses[j] ('AAAA-MM'). Sin límites si desde/hasta
+    están vacíos.
+    """
+    snap = _snapshot()
+    meses = snap.meses()
+    validos = ~np.isnat(meses)
+    if desde:
+        validos &= meses >= np.datetime64(desde, 'M')
+    if hasta:
+        validos &= meses <= np.datetime64(hasta, 'M')
+    cod_parcela = snap['numParcela'][validos]
+    unicos, col = np.unique(meses[validos], return_inverse=True)
+    n_parcelas = len(snap.textos['numParcela'])
+    matriz = np.zeros((n_parcelas, len(unicos)), np.int64)
+    np.add.at(matriz, (cod_parcela, col), _totales(snap)[validos])
+    return list(snap.textos['numParcela'].valores), [str(m) for m in unicos], matriz
+
+
+def morosos(meses_sin_pago=MESES_MOROSIDAD, corte=None, clientes=None):
+    """
+    Parcelas de clientes sin cobros en los últimos `meses_sin_pago` meses
+    al `corte` (datetime.date, hoy si es None). Cuenta el último cobro de
+    la parcela y, si el cobro no tiene parcela, el del mismo pagador.
+    Devuelve una lista de (id cliente, nombre, parcela, fecha del último
+    cobro o None, meses sin pago o None si nunca pagó), de mayor a menor
+    atraso. Con la lista de clientes del archivo el resultado queda en
+    cache_reportes hasta que cambien cobros o clientes.
+    """
+    corte = corte or datetime.date.today()
+    if clientes is None:
+        return cache_reportes.cacheado(
+            'morosos', (meses_sin_pago, corte), ('cobros.txt', 'clientes.txt'),
+            lambda: _morosos(meses_sin_pago, corte, load_clients()))
+    return _morosos(meses_sin_pago, corte, clientes)
+
+
+def _morosos(meses_sin_pago, corte, clientes):
+    snap = _snapshot()
+    corte = np.datetime64(corte, 'D')
+
+    # Último cobro por código de parcela y por código de pagador. Cada
+    # vector tiene un lugar extra al final (NaT) para los códigos -1.
+    dias = snap['fecha'].view(np.int64)
+    validos = snap['fecha'] <= corte
+    ult_parcela = np.full(len(snap.textos['numParcela']) + 1, _NAT, np.int64)
+    np.maximum.at(ult_parcela, snap['numParcela'][validos], dias[validos])
+    sin_parcela = validos & (snap['numParcela'] == snap.codigo_texto('numParcela', ''))
+    ult_nombre = np.full(len(snap.textos['nombreCompleto']) + 1, _NAT, np.int64)
+    np.maximum.at(ult_nombre, snap['nombreCompleto'][sin_parcela], dias[sin_parcela])
+
+    # Un lote por (cliente, parcela cargada)
+    lotes = [(c, str(p).strip())
+             for c in clientes
+             for p in (c.parcela1, c.parcela2, c.parcela3)
+             if str(p).strip()]
+    if not lotes:
+        return []
+    cod_p = np.array([snap.codigo_texto('numParcela', p) for _, p in lotes], np.int64)
+    cod_n = np.array([snap.codigo_texto('nombreCompleto', c.nombreCompleto) for c, _ in lotes], np.int64)
+    ultimo = np.maximum(ult_parcela[cod_p], ult_nombre[cod_n]).view('datetime64[D]')
+    atraso = (corte.astype('datetime64[M]') - ultimo.astype('datetime64[M]')).astype(np.int64)
+    nunca = np.isnat(ultimo)
+    en_mora = nunca | (atraso >= meses_sin_pago)
+
+    resultado = [
+        (lotes[i][0].id, lotes[i][0].nombreCompleto, lotes[i][1],
+         None if nunca[i] else _a_fecha(ultimo[i]),
+         None if nunca[i] else int(atraso[i]))
+        for i in np.flatnonzero(en_mora)
+    ]
+    resultado.sort(key=lambda r: (r[4] is not None, -(r[4] or 0)))
+    return resultado
+
+
+def fecha_corte(texto):
+    """'DD/MM/AAAA' → datetime.date; vacío o inválido → hoy."""
+    return parse_fecha(texto) or datetime.date.today()
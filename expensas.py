@@ -0,0 +1,90 @@
+# expensas.py
+#
+# Generación por lote de los cobros mensuales (expensas) de todos los
+# clientes a partir de una plantilla: hasta tres imputaciones con su
+# importe fijo o por m² (multiplicado por la superficie del cliente) y la
+# cuenta donde se cobra. Primero se arman borradores para revisar; después
+# se graban todos juntos con un rango de IDs reservado de una vez.
+
+import cierre
+import tasas
+from model import cobro
+from money import por_cantidad
+from impuestos import impuestos_cobro
+from indices import filtrar_duplicados
+from storage import (
+    load_clients, load_plan_cuentas, TAX_COBROS_FILE,
+    get_next_cobro_id, save_records_bulk,
+)
+
+
+def superficie(cliente):
+    """Superficie del cliente en m² (texto numérico) o None si no está cargada."""
+    texto = str(cliente.superficie).strip().replace(' ', '')
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    try:
+        valor = float(texto)
+    except ValueError:
+        return None
+    return texto if valor > 0 else None
+
+
+def generar_borradores(fecha, imputaciones, cuenta_cobro, por_superficie=False,
+                       observaciones='', clientes=None):
+    """
+    Arma un cobro (con id None) por cliente con parcela. `imputaciones` es
+    una lista de hasta 3 (cuenta, importe en centavos); si `por_superficie`
+    es True el importe es por m². Se omiten los clientes sin superficie
+    (cuando hace falta) y los cobros que ya estaban grabados (misma fecha,
+    pagador e importes), así que repetir el mes no duplica nada.
+    Devuelve (borradores, omitidos, repetidos): omitidos es una lista de
+    (nombre, parcela, motivo) y repetidos los borradores iguales a otro de
+    la misma tanda (se generan igual, para que el usuario decida). Lanza
+    ValueError si alguna cuenta no está en el plan o si la fecha cae en un
+    período cerrado.
+    """
+    plan = {str(c): n for c, n in load_plan_cuentas()}
+    imputaciones = [(str(c).strip(), imp) for c, imp in imputaciones if str(c).strip()]
+    if not imputaciones or len(imputaciones) > 3:
+        raise ValueError('La plantilla debe tener entre 1 y 3 imputaciones.')
+    for cuenta, _ in imputaciones + [(cuenta_cobro, 0)]:
+        if cuenta not in plan:
+            raise ValueError(f'La cuenta {cuenta!r} no está en el plan de cuentas.')
+
+    tbl = tasas.obtener(TAX_COBROS_FILE)
+    clientes = load_clients() if clientes is None else clientes
+    borradores, omitidos = [], []
+    for cli in clientes:
+        parcela = str(cli.parcela1).strip()
+        if not parcela:
+            omitidos.append((cli.nombreCompleto, '', 'sin parcela'))
+            continue
+        m2 = 1
+        if por_superficie:
+            m2 = superficie(cli)
+            if m2 is None:
+                omitidos.append((cli.nombreCompleto, parcela, 'sin superficie'))
+                continue
+        campos = []
+        for cuenta, importe in imputaciones:
+            campos += [cuenta, plan[cuenta], por_cantidad(importe, m2)]
+        campos += ['', '', 0] * (3 - len(imputaciones))
+        total = sum(campos[2::3])
+        dbcr, iibb, iva = impuestos_cobro(cuenta_cobro, total, '', 0, total, fecha, tbl)
+        borradores.append(cobro(
+            None, fecha, cli.nombreCompleto, parcela, *campos,
+            cuenta_cobro, total, '', 0, dbcr, iibb, iva, observaciones
+        ))
+
+    nuevos, ya_registrados, repetidos = filtrar_duplicados('cobros.txt', borradores)
+    cierre.verificar(nuevos)
+    omitidos += [(c.nombreCompleto, c.numParcela, 'ya registrado') for c in ya_registrados]
+    return nuevos, omitidos, repetidos
+
+
+def grabar_borradores(borradores):
+    """Asigna IDs consecutivos (reservados de una vez) y graba todo en una escritura."""
+    for i, c in enumerate(borradores, start=get_next_cobro_id()):
+        c.id = i
+    return save_records_bulk('cobros.txt', [borradores])
@@ -0,0 +1,149 @@
+# exportar.py
+#
+# Exportación de cobros, pagos y clientes (o de cualquier lista filtrada de
+# ellos) a CSV, XLSX o Parquet. Los registros llegan en lotes (ver
+# storage.iterar_registros) y cada lote se escribe y se descarta, así que
+# la memoria no depende de la cantidad de filas.
+#
+# Columnas con tipo:
+#   - id: entero
+#   - fecha: fecha (en CSV queda el texto 'DD/MM/AAAA' tal como se grabó)
+#   - importes: decimales exactos con dos dígitos, salidos de los centavos
+#   - el resto: texto
+#
+# openpyxl (XLSX) y pyarrow (Parquet) son opcionales: sin ellos sólo se
+# puede exportar a CSV.
+
+import os
+import csv
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from fechas import parse_fecha
+from money import a_pesos, a_decimal
+from storage import ENTIDADES, iterar_registros
+
+FORMATOS = ('.csv', '.xlsx', '.parquet')
+
+
+def columnas(filename):
+    """[(campo, tipo), ...] con tipo 'entero', 'fecha', 'importe' o 'texto'."""
+    tipo = ENTIDADES[filename]
+    resultado = []
+    for campo in tipo.__slots__:
+        if campo == 'id':
+            resultado.append((campo, 'entero'))
+        elif campo == 'fecha':
+            resultado.append((campo, 'fecha'))
+        elif campo in tipo.IMPORTES:
+            resultado.append((campo, 'importe'))
+        else:
+            resultado.append((campo, 'texto'))
+    return resultado
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor)
+
+
+def _csv(cols, lotes, ruta):
+    n = 0
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow([c for c, _ in cols])
+        for lote in lotes:
+            for r in lote:
+                w.writerow([a_pesos(v) if t == 'importe' else _texto(v)
+                            for (_, t), v in zip(cols, r.to_tuple())])
+            n += len(lote)
+    return n
+
+
+def _xlsx(cols, lotes, ruta):
+    if openpyxl is None:
+        raise RuntimeError('Exportar a XLSX necesita openpyxl.')
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([c for c, _ in cols])
+
+    def celda(tipo, valor):
+        if tipo == 'entero':
+            return _entero(valor)
+        if tipo == 'texto':
+            return _texto(valor)
+        if tipo == 'importe':
+            c = WriteOnlyCell(ws, value=a_decimal(valor))
+            c.number_format = '#,##0.00'
+        else:
+            c = WriteOnlyCell(ws, value=parse_fecha(valor) or _texto(valor))
+            c.number_format = 'DD/MM/YYYY'
+        return c
+
+    n = 0
+    for lote in lotes:
+        for r in lote:
+            ws.append([celda(t, v) for (_, t), v in zip(cols, r.to_tuple())])
+        n += len(lote)
+    wb.save(ruta)
+    return n
+
+
+def _parquet(cols, lotes, ruta):
+    if pa is None:
+        raise RuntimeError('Exportar a Parquet necesita pyarrow.')
+    tipos = {'entero': pa.int64(), 'fecha': pa.date32(),
+             'importe': pa.decimal128(18, 2), 'texto': pa.string()}
+    convertir = {'entero': _entero, 'fecha': parse_fecha, 'importe': a_decimal, 'texto': _texto}
+    schema = pa.schema([(c, tipos[t]) for c, t in cols])
+    n = 0
+    with pq.ParquetWriter(ruta, schema) as w:
+        for lote in lotes:
+            tuplas = [r.to_tuple() for r in lote]
+            arrays = [pa.array([convertir[t](fila[i]) for fila in tuplas], type=tipos[t])
+                      for i, (_, t) in enumerate(cols)]
+            w.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            n += len(lote)
+    return n
+
+
+_ESCRITORES = {'.csv': _csv, '.xlsx': _xlsx, '.parquet': _parquet}
+
+
+def exportar(filename, ruta, lotes=None):
+    """
+    Exporta los registros de `filename` a `ruta`; el formato sale de la
+    extensión (.csv, .xlsx o .parquet). `lotes` es un iterable de listas
+    de registros (por ejemplo [filtrados]); por defecto, toda la historia
+    leída en lotes. Devuelve la cantidad de filas exportadas. Si falla,
+    no deja un archivo a medias.
+    """
+    formato = os.path.splitext(ruta)[1].lower()
+    if formato not in _ESCRITORES:
+        raise ValueError(f'Formato no soportado: {formato!r} (use {", ".join(FORMATOS)}).')
+    if lotes is None:
+        lotes = iterar_registros(filename)
+    tmp = ruta + '.tmp'
+    try:
+        n = _ESCRITORES[formato](columnas(filename), lotes, tmp)
+        os.replace(tmp, ruta)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return n
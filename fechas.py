@@ -0,0 +1,26 @@
+# fechas.py
+#
+# Las fechas se guardan como texto 'DD/MM/AAAA' (tal como las arma el
+# formulario). Estas funciones las interpretan para agrupar por día o mes.
+
+import datetime
+
+
+def parse_fecha(texto):
+    """Convierte 'DD/MM/AAAA' en datetime.date; devuelve None si no es válida."""
+    try:
+        dia, mes, anio = str(texto).strip().split('/')
+        return datetime.date(int(anio), int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def periodo(texto):
+    """Devuelve el período 'AAAA-MM' de una fecha 'DD/MM/AAAA' (o '' si no es válida)."""
+    f = parse_fecha(texto)
+    return f"{f.year:04d}-{f.month:02d}" if f else ''
+
+
+def formatear_fecha(fecha):
+    """datetime.date → 'DD/MM/AAAA'."""
+    return fecha.strftime('%d/%m/%Y')
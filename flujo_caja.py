@@ -0,0 +1,156 @@
+# flujo_caja.py
+#
+# Flujo de fondos diario de las cuentas de caja y bancos (11-10-xxx):
+#   entradas: montoA / montoB de los cobros en esas cuentas
+#   salidas:  montoNeto y DByCR de los pagos (cuentaAcreditar), y el
+#             anticipo de IIBB y el DByCR de los cobros, repartidos entre
+#             la cuenta A y la B según sus tasas (impuestos.repartir_cobro)
+# igual que las partidas del mayor, así que el saldo acumulado coincide
+# con el de la cuenta. Todo sale de los snapshots en columnas (columnar.py)
+# con sumas por día y np.cumsum, sin recorrer registros. Las series quedan
+# en cache_reportes hasta que cambien cobros, pagos o las tasas de cobros.
+#
+# La proyección repite el patrón mensual: para cada día futuro se toma el
+# neto promedio de ese mismo día del mes en los últimos meses.
+
+import datetime
+
+import tasas
+import columnar
+import cache_reportes
+from columnar import np
+from impuestos import repartir_cobro
+from storage import TAX_COBROS_FILE
+
+PREFIJO_CAJA = '11-10-'
+MESES_PATRON = 3
+FUENTES = ('cobros.txt', 'pagos.txt', TAX_COBROS_FILE)
+
+_EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+
+def cuentas_caja(plan):
+    """Códigos de caja/bancos del plan (imputables, sin las de título xx-xx-000)."""
+    return sorted(c for c in plan if c.startswith(PREFIJO_CAJA) and not c.endswith('-000'))
+
+
+def _movimientos(cuentas):
+    """
+    (días datetime64[D], importes int64 con signo) de todos los movimientos
+    de `cuentas`, sin ordenar.
+    """
+    if not columnar.HAY_NUMPY:
+        raise RuntimeError('El flujo de caja necesita NumPy.')
+    dias, importes = [], []
+
+    cob = columnar.obtener('cobros.txt')
+    if len(cob):
+        def en(campo):
+            cods = [cob.codigo_cuenta(c) for c in cuentas]
+            return np.isin(cob[campo], [c for c in cods if c >= 0])
+        en_a, en_b = en('numCuentaA'), en('numCuentaB')
+        # Los impuestos del cobro se descuentan de cada cuenta por su parte
+        # (todo de una si el cobro usa una sola)
+        imp_a, imp_b = _impuestos_por_cuenta(cob)
+        for mascara, valores in ((en_a, cob['montoA'] - imp_a), (en_b, cob['montoB'] - imp_b)):
+            dias.append(cob['fecha'][mascara])
+            importes.append(valores[mascara])
+
+    pag = columnar.obtener('pagos.txt')
+    if len(pag):
+        cods = [pag.codigo_cuenta(c) for c in cuentas]
+        mascara = np.isin(pag['cuentaAcreditar'], [c for c in cods if c >= 0])
+        dias.append(pag['fecha'][mascara])
+        importes.append(-(pag['montoNeto'] + pag['impuestoDBCRb'])[mascara])
+
+    if not dias:
+        return np.zeros(0, 'datetime64[D]'), np.zeros(0, np.int64)
+    dias, importes = np.concatenate(dias), np.concatenate(importes)
+    validos = ~np.isnat(dias) & (importes != 0)
+    return dias[validos], importes[validos]
+
+
+def _impuestos_por_cuenta(cob):
+    """(IIBB + DByCR de la cuenta A, ídem de la B) de cada cobro del snapshot."""
+    tabla = tasas.obtener(TAX_COBROS_FILE)
+    dias = cob['fecha'].astype(np.int64) + _EPOCA
+    tasa_a = tabla.vector(cob.cuentas, cob['numCuentaA'], dias)
+    tasa_b = tabla.vector(cob.cuentas, cob['numCuentaB'], dias)
+    iibb_a, dbcr_a, iibb_b, dbcr_b = repartir_cobro(
+        cob['montoA'], cob['montoB'], cob['anticipoIIBB'], cob['impuestoDBCRb'], tasa_a.T, tasa_b.T)
+    total = cob['anticipoIIBB'] + cob['impuestoDBCRb']
+    vacia = cob.codigo_cuenta('')
+    sin_a, sin_b = cob['numCuentaA'] == vacia, cob['numCuentaB'] == vacia
+    imp_a = np.where(sin_b, total, np.where(sin_a, 0, iibb_a + dbcr_a))
+    return imp_a, total - imp_a
+
+
+def serie_diaria(cuentas, desde, hasta):
+    """
+    Serie diaria de `cuentas` entre `desde` y `hasta` (datetime.date,
+    inclusive). Devuelve un dict de arrays, uno por día:
+      'dias', 'entradas', 'salidas' (positivas), 'saldo' (acumulado,
+      arrastrando lo anterior a `desde`), en centavos.
+    """
+    return cache_reportes.cacheado(
+        'serie_diaria', (tuple(cuentas), desde, hasta), FUENTES,
+        lambda: _serie_diaria(cuentas, desde, hasta))
+
+
+def _serie_diaria(cuentas, desde, hasta):
+    d0, d1 = np.datetime64(desde, 'D'), np.datetime64(hasta, 'D')
+    n = max(int((d1 - d0).astype(np.int64)) + 1, 0)
+    dias, importes = _movimientos(cuentas)
+
+    saldo_inicial = int(importes[dias < d0].sum())
+    en_rango = (dias >= d0) & (dias <= d1)
+    idx = (dias[en_rango] - d0).astype(np.int64)
+    valores = importes[en_rango]
+    entradas = columnar.sumar_por_grupo(idx[valores > 0], valores[valores > 0], n)
+    salidas = -columnar.sumar_por_grupo(idx[valores < 0], valores[valores < 0], n)
+    return {
+        'dias': d0 + np.arange(n),
+        'entradas': entradas,
+        'salidas': salidas,
+        'saldo': saldo_inicial + np.cumsum(entradas - salidas),
+    }
+
+
+def _dia_del_mes(dias):
+    return (dias - dias.astype('datetime64[M]')).astype(np.int64) + 1
+
+
+def proyeccion(cuentas, desde, n_dias, meses=MESES_PATRON):
+    """
+    Proyección de `n_dias` a partir de `desde` (datetime.date, primer día
+    proyectado): neto esperado de cada día = promedio del neto de ese día
+    del mes en los `meses` meses completos anteriores. Devuelve un dict con
+    'dias', 'neto' y 'saldo' (acumulado desde el saldo real al día
+    anterior a `desde`).
+    """
+    return cache_reportes.cacheado(
+        'proyeccion', (tuple(cuentas), desde, n_dias, meses), FUENTES,
+        lambda: _proyeccion(cuentas, desde, n_dias, meses))
+
+
+def _proyeccion(cuentas, desde, n_dias, meses):
+    d0 = np.datetime64(desde, 'D')
+    mes_actual = d0.astype('datetime64[M]')
+    historia = serie_diaria(
+        cuentas,
+        (mes_actual - meses).astype('datetime64[D]').astype(datetime.date),
+        (mes_actual.astype('datetime64[D]') - 1).astype(datetime.date),
+    )
+    neto = historia['entradas'] - historia['salidas']
+    por_dia = columnar.sumar_por_grupo(_dia_del_mes(historia['dias']), neto, 32)
+    promedio = np.rint(por_dia / max(meses, 1)).astype(np.int64)
+
+    dias, importes = _movimientos(cuentas)
+    saldo_actual = int(importes[dias < d0].sum())
+    futuros = d0 + np.arange(n_dias)
+    esperado = promedio[_dia_del_mes(futuros)]
+    return {
+        'dias': futuros,
+        'neto': esperado,
+        'saldo': saldo_actual + np.cumsum(esperado),
+    }
@@ -4,96 +4,125 @@
 import os
 import csv
 
-def ensure_data_directory():
-    """Se asegura de que exista la carpeta data/ y la devuelve."""
-    data_dir = os.path.join(os.path.dirname(__file__), 'data')
-    os.makedirs(data_dir, exist_ok=True)
-    return data_dir
+from model import cliente
+from storage import ensure_data_directory, get_next_clients_id, save_records_bulk
+import indices
+from indices import filtrar_duplicados
 
-def get_next_clients_id(path_clientes_txt):
+TAM_LOTE = 1000
+
+# Índices según orden de columnas en el CSV:
+# 0: Num Cliente
+# 1: Apellido y Nombre
+# 2: DNI
+# 3: DIRECCIÓN (aparece como 'DIRECCIï¿½N' en Latin-1)
+# 4: Teléfono 1  (aparece como 'Telï¿fono 1 ')
+# 5: Teléfono 2  (aparece como 'Telïfono 2 ')
+# 6: email
+# 7: Parcela1
+# 8:  parcela2  (con espacio inicial)
+# 9: parcela3
+# 10: Superficie (m�)
+# 11: Observaciones
+COLUMNAS = 12
+
+
+def validar_fila(fila, nro_linea):
+    """
+    Devuelve la fila como tupla de 11 campos limpios (sin el ID), o lanza
+    ValueError indicando la línea del CSV con el problema.
     """
-    Devuelve el próximo ID para clientes.txt.
-    Si no existe el archivo, retorna 1; 
-    si existe, cuenta cuántas líneas no vacías hay y suma 1.
+    if len(fila) < COLUMNAS:
+        raise ValueError(
+            f"Línea {nro_linea}: se esperaban {COLUMNAS} columnas y hay {len(fila)}."
+        )
+    campos = tuple(c.strip() for c in fila[1:COLUMNAS])
+    if not campos[0]:
+        raise ValueError(f"Línea {nro_linea}: falta el nombre del cliente.")
+    return campos
+
+
+def _lotes_de_clientes(lector, primer_id, tam_lote, progreso, omitidos, repetidos):
     """
-    if not os.path.exists(path_clientes_txt):
-        return 1
-    with open(path_clientes_txt, 'r', encoding='utf-8') as f:
-        líneas = [línea for línea in f if línea.strip()]
-    return len(líneas) + 1
+    Recorre el CSV y va entregando listas de hasta `tam_lote` clientes ya
+    validados, con IDs consecutivos a partir de `primer_id`. Los clientes
+    que ya existen (mismo DNI, o mismo nombre y parcela) se descartan y se
+    agregan a `omitidos`; los que se repiten dentro del CSV se importan
+    igual y se agregan a `repetidos` para avisar.
+    """
+    nuevo_id = primer_id
+    procesados = 0
+    # Las claves de clientes.txt se toman una vez, antes de grabar el primer
+    # lote: las de esta importación van aparte en `vistas`
+    existentes = set(indices.obtener('clientes.txt').ids)
+    vistas = set()
+    lote = []
+
+    def cerrar_lote():
+        nonlocal nuevo_id
+        nuevos, ya_cargados, en_csv = filtrar_duplicados(
+            'clientes.txt', [cliente(None, *campos) for campos in lote], vistas, existentes
+        )
+        omitidos.extend(ya_cargados)
+        repetidos.extend(en_csv)
+        for c in nuevos:
+            c.id = nuevo_id
+            nuevo_id += 1
+        return nuevos
 
-def importar_clientes_desde_csv(ruta_csv):
-    data_dir = ensure_data_directory()
-    path_clientes_txt = os.path.join(data_dir, 'clientes.txt')
+    # Las dos primeras líneas (solo comas y encabezados) ya se saltearon.
+    # Un campo entre comillas puede ocupar varias líneas: la fila empieza
+    # en la línea siguiente a la última que se leyó
+    ultima = lector.line_num
+    for fila in lector:
+        nro_linea, ultima = ultima + 1, lector.line_num
+        if not fila or not fila[0].strip():
+            continue
+        lote.append(validar_fila(fila, nro_linea))
+        if len(lote) >= tam_lote:
+            yield cerrar_lote()
+            procesados += len(lote)
+            progreso(procesados)
+            lote = []
+    if lote:
+        yield cerrar_lote()
+        progreso(procesados + len(lote))
+
+
+def importar_clientes_desde_csv(ruta_csv, tam_lote=TAM_LOTE, progreso=None):
+    """
+    Importa todos los clientes del CSV a clientes.txt en una sola pasada:
+    el rango de IDs se calcula una vez, las filas se validan y graban por
+    lotes, y si alguna fila es inválida no se graba ninguna (se lanza
+    ValueError). Los clientes ya cargados se omiten, así que volver a
+    correr la importación no duplica la base. `progreso(n)` recibe la
+    cantidad de filas procesadas. Devuelve la cantidad importada.
+    """
+    if progreso is None:
+        progreso = lambda n: print(f"  {n} clientes procesados...")
 
-    importados = 0
     with open(ruta_csv, 'r', encoding='latin-1', newline='') as f:
         lector = csv.reader(f, delimiter=',')
-        # Saltar la primera línea (solo comas)
+        # Saltar la primera línea (solo comas) y los encabezados (segunda línea)
         try:
             next(lector)
+            next(lector)
         except StopIteration:
-            return
+            return 0
 
-        # Leer encabezados (segunda línea)
-        try:
-            headers = next(lector)
-        except StopIteration:
-            return
-
-        # Definimos índices según orden de columnas en el CSV:
-        # 0: Num Cliente
-        # 1: Apellido y Nombre
-        # 2: DNI
-        # 3: DIRECCIÓN (aparece como 'DIRECCIï¿½N' en Latin-1)
-        # 4: Teléfono 1  (aparece como 'Telï¿fono 1 ')
-        # 5: Teléfono 2  (aparece como 'Telïfono 2 ')
-        # 6: email
-        # 7: Parcela1
-        # 8:  parcela2  (con espacio inicial)
-        # 9: parcela3
-        # 10: Superficie (m�)
-        # 11: Observaciones
-
-        for fila in lector:
-            if not fila or not fila[0].strip():
-                continue
-
-            full_name  = fila[1].strip()
-            dni        = fila[2].strip()
-            direccion  = fila[3].strip()
-            tel1       = fila[4].strip()
-            tel2       = fila[5].strip()
-            email      = fila[6].strip()
-            p1         = fila[7].strip()
-            p2         = fila[8].strip()
-            p3         = fila[9].strip()
-            superficie = fila[10].strip()
-            obs        = fila[11].strip()
-
-            nuevo_id = get_next_clients_id(path_clientes_txt)
-
-            tupla_cliente = (
-                nuevo_id,
-                full_name,
-                dni,
-                direccion,
-                tel1,
-                tel2,
-                email,
-                p1,
-                p2,
-                p3,
-                superficie,
-                obs
-            )
-
-            with open(path_clientes_txt, 'a', encoding='utf-8') as f_txt:
-                f_txt.write(repr(tupla_cliente) + "\n")
-
-            importados += 1
+        omitidos, repetidos = [], []
+        lotes = _lotes_de_clientes(lector, get_next_clients_id(), tam_lote, progreso,
+                                   omitidos, repetidos)
+        importados = save_records_bulk('clientes.txt', lotes)
 
+    path_clientes_txt = os.path.join(ensure_data_directory(), 'clientes.txt')
     print(f"Se importaron {importados} clientes en:\n  {path_clientes_txt}")
+    if omitidos:
+        print(f"Se omitieron {len(omitidos)} clientes ya cargados.")
+    for c in repetidos:
+        print(f"Atención: {c.nombreCompleto} (ID {c.id}) repite el DNI o el nombre y "
+              "parcela de otra fila del CSV; se importó igual.")
+    return importados
 
 if __name__ == "__main__":
     ruta_csv = os.path.join(os.path.dirname(__file__), "base_para_archivo_de_clientes[1].csv")
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Importación de un extracto bancario (CSV): cada crédito se graba como
+# cobro y cada débito como pago, con los impuestos calculados igual que
+# al guardar desde los formularios. El archivo se procesa por bloques (en
+# paralelo si es grande; en uno solo si algún campo entre comillas tiene
+# saltos de línea, porque los bloques se cortan en saltos de línea) y
+# todo se graba en una sola transacción: si hay
+# filas con errores no se graba nada. Los movimientos que ya estaban
+# registrados (ver indices.py) se omiten, así que reimportar el mismo
+# extracto no duplica nada.
+
+import io
+import os
+import csv
+import sys
+import datetime
+
+import cierre
+import tasas
+from model import cobro, pago
+from money import a_centavos
+from fechas import formatear_fecha
+from impuestos import impuestos_cobro, impuestos_pago
+from indices import filtrar_duplicados
+from storage import (
+    load_plan_cuentas, TAX_COBROS_FILE, TAX_PAGOS_FILE,
+    get_next_cobro_id, get_next_pago_id,
+    mapear_bloques, save_records_transaccion,
+)
+
+# Columnas del CSV (índice, empezando en 0). El importe puede venir en una
+# sola columna 'importe' con signo (positivo = crédito) o en dos columnas
+# 'debito' y 'credito'. Son opcionales 'nombre' (pagador / razón social),
+# 'cuenta' (código o nombre de la cuenta a imputar), 'parcela' y
+# 'comprobante'.
+MAPEO_DEFECTO = {
+    'fecha': 0,
+    'descripcion': 1,
+    'debito': 2,
+    'credito': 3,
+}
+
+# Cuentas a imputar cuando la fila no trae 'cuenta'
+CUENTA_COBROS_DEFECTO = '21-60-003'   # Anticipo de Clientes
+CUENTA_PAGOS_DEFECTO = '21-10-060'    # Acreedores Varios
+
+MAX_ERRORES = 20
+
+
+def parse_importe(texto, decimal=None):
+    """
+    '1.234,56', '1,234.56', '1234.56', '-$ 500' → centavos. `decimal` es el
+    separador decimal del banco (',' o '.'); si no se indica, es el último
+    de los dos que aparece, salvo que se repita (entonces separa miles).
+    Lanza ValueError si el texto no es un importe.
+    """
+    t = texto.strip().replace('$', '').replace(' ', '')
+    if not t:
+        return 0
+    if decimal is None:
+        ultimo = max(t.rfind(','), t.rfind('.'))
+        decimal = t[ultimo] if ultimo >= 0 else '.'
+        if t.count(decimal) > 1:
+            decimal = ',' if decimal == '.' else '.'
+    miles = ',' if decimal == '.' else '.'
+    return a_centavos(t.replace(miles, '').replace(decimal, '.'))
+
+
+def parse_fecha_banco(texto):
+    """'DD/MM/AAAA' o 'AAAA-MM-DD' → 'DD/MM/AAAA'."""
+    t = texto.strip()
+    try:
+        if '-' in t:
+            anio, mes, dia = t.split('-')
+        else:
+            dia, mes, anio = t.split('/')
+        return formatear_fecha(datetime.date(int(anio), int(mes), int(dia)))
+    except ValueError:
+        raise ValueError(f"fecha inválida {texto!r}")
+
+
+def celda(fila, mapeo, clave):
+    """Texto de la columna `clave` de `fila` según `mapeo` ('' si no está)."""
+    idx = mapeo.get(clave)
+    if idx is None or idx >= len(fila):
+        return ''
+    return fila[idx].strip()
+
+
+def _resolver_cuenta(texto, defecto, plan, por_nombre):
+    """Código de cuenta a partir de un código o de un nombre del plan."""
+    if not texto:
+        return defecto
+    if texto in plan:
+        return texto
+    codigo = por_nombre.get(texto.lower())
+    if codigo is None:
+        raise ValueError(f"la cuenta {texto!r} no está en el plan de cuentas")
+    return codigo
+
+
+def _saltos_entre_comillas(path, desde):
+    """
+    ¿Algún campo entre comillas de `path` (a partir de `desde`) contiene un
+    salto de línea? Una línea con una cantidad impar de comillas deja un
+    campo abierto (las comillas escapadas "" van de a pares).
+    """
+    abierto = False
+    with open(path, 'rb') as f:
+        f.seek(desde)
+        for linea in f:
+            if linea.count(b'"') % 2:
+                abierto = not abierto
+            if abierto:
+                return True
+    return False
+
+
+def procesar_bloque(args):
+    """
+    Convierte las filas de un tramo del CSV en cobros y pagos (con id None).
+    Devuelve (cobros, pagos, errores). Corre en un proceso aparte.
+    """
+    path, ini, fin, cfg = args
+    with open(path, 'rb') as f:
+        f.seek(ini)
+        texto = f.read(fin - ini).decode(cfg['encoding'])
+
+    mapeo = cfg['mapeo']
+    plan = cfg['plan']
+    por_nombre = {n.lower(): c for c, n in plan.items()}
+    banco = cfg['cuenta_banco']
+    cobros, pagos, errores = [], [], []
+
+    for fila in csv.reader(io.StringIO(texto, newline=''), delimiter=cfg['delimitador']):
+        if not any(c.strip() for c in fila):
+            continue
+        try:
+            fecha = parse_fecha_banco(celda(fila, mapeo, 'fecha'))
+            if 'importe' in mapeo:
+                importe = parse_importe(celda(fila, mapeo, 'importe'), cfg['decimal'])
+            else:
+                importe = (parse_importe(celda(fila, mapeo, 'credito'), cfg['decimal'])
+                           - parse_importe(celda(fila, mapeo, 'debito'), cfg['decimal']))
+            if importe == 0:
+                continue
+            descripcion = celda(fila, mapeo, 'descripcion')
+            nombre = celda(fila, mapeo, 'nombre') or descripcion
+
+            if importe > 0:
+                cuenta = _resolver_cuenta(celda(fila, mapeo, 'cuenta'),
+                                          cfg['cuenta_cobros'], plan, por_nombre)
+                dbcr, iibb, iva = impuestos_cobro(banco, importe, '', 0, importe,
+                                                  fecha, cfg['tax_cobros'])
+                cobros.append(cobro(
+                    None, fecha, nombre, celda(fila, mapeo, 'parcela'),
+                    cuenta, plan[cuenta], importe,
+                    '', '', 0,
+                    '', '', 0,
+                    banco, importe, '', 0,
+                    dbcr, iibb, iva, descripcion
+                ))
+            else:
+                cuenta = _resolver_cuenta(celda(fila, mapeo, 'cuenta'),
+                                          cfg['cuenta_pagos'], plan, por_nombre)
+                neto = -importe
+                iva, dbcr = impuestos_pago(banco, neto, fecha, cfg['tax_pagos'])
+                pagos.append(pago(
+                    None, fecha, nombre, descripcion,
+                    celda(fila, mapeo, 'comprobante'),
+                    cuenta, neto, iva, banco, dbcr
+                ))
+        except (ValueError, IndexError) as e:
+            errores.append(f"Fila {fila!r}: {e}")
+
+    return cobros, pagos, errores
+
+
+def importar_movimientos_desde_csv(ruta_csv, cuenta_banco, mapeo=None,
+                                   cuenta_cobros=CUENTA_COBROS_DEFECTO,
+                                   cuenta_pagos=CUENTA_PAGOS_DEFECTO,
+                                   saltear=1, encoding='latin-1', delimitador=',',
+                                   decimal=None):
+    """
+    Importa el extracto `ruta_csv` de la cuenta bancaria `cuenta_banco`.
+    `saltear` es la cantidad de líneas de encabezado y `decimal` el
+    separador decimal de los importes (ver parse_importe). Lanza ValueError (y
+    no graba nada) si alguna cuenta no existe, alguna fila es inválida o
+    cae en un período cerrado.
+    Devuelve (cobros importados, pagos importados, movimientos omitidos
+    por estar ya registrados, movimientos repetidos dentro del extracto).
+    Los repetidos se importan igual (dos movimientos iguales el mismo día
+    pueden ser legítimos); el número es para avisarle al usuario.
+    """
+    plan = {str(c): n for c, n in load_plan_cuentas()}
+    for cuenta in (cuenta_banco, cuenta_cobros, cuenta_pagos):
+        if cuenta not in plan:
+            raise ValueError(f"La cuenta {cuenta!r} no está en el plan de cuentas.")
+
+    cfg = {
+        'mapeo': mapeo or MAPEO_DEFECTO,
+        'plan': plan,
+        'cuenta_banco': cuenta_banco,
+        'cuenta_cobros': cuenta_cobros,
+        'cuenta_pagos': cuenta_pagos,
+        'tax_cobros': tasas.obtener(TAX_COBROS_FILE),
+        'tax_pagos': tasas.obtener(TAX_PAGOS_FILE),
+        'encoding': encoding,
+        'delimitador': delimitador,
+        'decimal': decimal,
+    }
+
+    with open(ruta_csv, 'rb') as f:
+        for _ in range(saltear):
+            f.readline()
+        desde = f.tell()
+    hasta = os.path.getsize(ruta_csv)
+    if _saltos_entre_comillas(ruta_csv, desde):
+        partes = [procesar_bloque((ruta_csv, desde, hasta, cfg))]
+    else:
+        partes, _ = mapear_bloques(procesar_bloque, ruta_csv, desde, (cfg,), hasta=hasta)
+
+    cobros, pagos, errores = [], [], []
+    for c, p, e in partes:
+        cobros.extend(c)
+        pagos.extend(p)
+        errores.extend(e)
+    if errores:
+        extra = f"\n(y {len(errores) - MAX_ERRORES} más)" if len(errores) > MAX_ERRORES else ''
+        raise ValueError("No se importó nada. Errores:\n" + "\n".join(errores[:MAX_ERRORES]) + extra)
+
+    cobros, cobros_omitidos, cobros_repetidos = filtrar_duplicados('cobros.txt', cobros)
+    pagos, pagos_omitidos, pagos_repetidos = filtrar_duplicados('pagos.txt', pagos)
+    cierre.verificar(cobros + pagos)
+
+    for i, c in enumerate(cobros, start=get_next_cobro_id()):
+        c.id = i
+    for i, p in enumerate(pagos, start=get_next_pago_id()):
+        p.id = i
+    save_records_transaccion({'cobros.txt': [cobros], 'pagos.txt': [pagos]})
+    return (len(cobros), len(pagos), len(cobros_omitidos) + len(pagos_omitidos),
+            len(cobros_repetidos) + len(pagos_repetidos))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Uso: import_movimientos.py <extracto.csv> <cuenta banco>")
+        sys.exit(1)
+    n_cobros, n_pagos, n_omitidos, n_repetidos = importar_movimientos_desde_csv(sys.argv[1], sys.argv[2])
+    print(f"Se importaron {n_cobros} cobros y {n_pagos} pagos "
+          f"({n_omitidos} omitidos por estar ya registrados).")
+    if n_repetidos:
+        print(f"Atención: {n_repetidos} movimientos se repiten dentro del extracto.")
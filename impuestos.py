@@ -0,0 +1,198 @@
+# impuestos.py
+#
+# Cálculo de IIBB, DByCR e IVA de cobros y pagos (todo en centavos). Es el
+# único lugar con esta cuenta: lo usan los formularios (la vista previa en
+# cada tecla y el guardado), las importaciones, las expensas y el
+# recálculo por lote (recalculo.py). Las tasas son las vigentes en la
+# fecha del registro (ver tasas.py).
+#
+# El núcleo (calcular_cobro / calcular_pago) recibe montos y porcentajes
+# escalares o arrays de NumPy, fila a fila, con el mismo redondeo en los
+# dos casos: el de money.porcentaje / money.iva_incluido (al centavo, la
+# mitad hacia afuera). Con arrays se hace en enteros: los porcentajes se
+# escalan a diezmilésimos exactos y los pocos que no entran en esa escala
+# se calculan uno por uno con money.
+#
+# Las tasas de un cobro se buscan una vez por (cuenta A, cuenta B, día) y
+# quedan memorizadas mientras no cambie la tabla impositiva.
+#
+# El IIBB y el DByCR grabados en un cobro son la suma de lo que corresponde
+# a la cuenta A y a la cuenta B. repartir_cobro / impuestos_por_cuenta los
+# separan recalculando la parte de cada cuenta con sus tasas, para que el
+# mayor, el flujo de caja y el reporte de impuestos los descuenten de la
+# cuenta que corresponde.
+
+import functools
+from decimal import Decimal
+
+import tasas
+from columnar import np
+from money import porcentaje, iva_incluido, PCT_IVA
+from storage import TAX_COBROS_FILE, TAX_PAGOS_FILE
+
+_ESCALA = 10000                # porcentajes en diezmilésimos
+
+
+# — Redondeo con arrays ——————————————————————
+
+def _redondear(numerador, divisor):
+    """numerador / divisor redondeado al entero, la mitad hacia afuera (como ROUND_HALF_UP)."""
+    signo = np.where(numerador < 0, -1, 1)
+    return signo * ((np.abs(numerador) * 2 + divisor) // (2 * divisor))
+
+
+def _escalado(pct):
+    """Porcentaje → entero en diezmilésimos, o None si no es exacto en esa escala."""
+    d = Decimal(str(float(pct))) * _ESCALA
+    return int(d) if d == d.to_integral_value() else None
+
+
+def _dividir(numerador, divisor):
+    """numerador / divisor (enteros) redondeado al entero, la mitad hacia afuera."""
+    cociente = (abs(numerador) * 2 + abs(divisor)) // (2 * abs(divisor))
+    return cociente if (numerador < 0) == (divisor < 0) else -cociente
+
+
+def _es_array(*valores):
+    return np is not None and any(isinstance(v, np.ndarray) for v in valores)
+
+
+def _porcentaje(centavos, pct):
+    """money.porcentaje() para escalares o arrays (`centavos` y/o `pct`)."""
+    if not _es_array(centavos, pct):
+        return porcentaje(centavos, pct)
+    centavos, pcts = np.broadcast_arrays(np.asarray(centavos, np.int64), np.asarray(pct, float))
+    unicos, cual = np.unique(pcts, return_inverse=True)
+    cual = cual.reshape(pcts.shape)
+    escalados = [_escalado(p) for p in unicos]
+    esc = np.array([e or 0 for e in escalados], np.int64)[cual]
+    resultado = _redondear(centavos * esc, 100 * _ESCALA)
+    for k, e in enumerate(escalados):
+        if e is None:
+            filas = np.flatnonzero(cual == k)
+            resultado[filas] = [porcentaje(c, unicos[k]) for c in centavos[filas]]
+    return resultado
+
+
+def _iva_incluido(centavos, pct=PCT_IVA):
+    """money.iva_incluido() para un escalar o un array de centavos."""
+    if not _es_array(centavos):
+        return iva_incluido(centavos, pct)
+    esc = _escalado(pct)
+    if esc is None:
+        return np.array([iva_incluido(c, pct) for c in centavos], np.int64)
+    return centavos - _redondear(centavos * (100 * _ESCALA), 100 * _ESCALA + esc)
+
+
+# — Núcleo ————————————————————————————
+
+def calcular_cobro(montoA, montoB, total_imputaciones, tasa_a, tasa_b):
+    """
+    Impuestos de un cobro (o de muchos, con arrays): `tasa_a` y `tasa_b`
+    son (%IIBB, %DByCR) de la cuenta A y la cuenta B. Devuelve
+    (dbcr, iibb, iva) en centavos.
+    """
+    monto_dbcr = _porcentaje(montoA, tasa_a[1]) + _porcentaje(montoB, tasa_b[1])
+    monto_iibb = _porcentaje(montoA, tasa_a[0]) + _porcentaje(montoB, tasa_b[0])
+    return monto_dbcr, monto_iibb, _iva_incluido(total_imputaciones)
+
+
+def calcular_pago(monto_neto, pct_dbcr):
+    """Impuestos de un pago (o de muchos, con arrays). Devuelve (iva, dbcr) en centavos."""
+    return _iva_incluido(monto_neto), _porcentaje(monto_neto, pct_dbcr)
+
+
+def _parte_a(total, parte_a, parte_b, montoA):
+    """
+    Parte de `total` (un impuesto grabado) que corresponde a la cuenta A:
+    `parte_a` si las partes recalculadas suman el total, si no en
+    proporción a ellas. Si las dos dan cero, todo va a la cuenta A (o a la
+    B si no hay monto A).
+    """
+    suma = parte_a + parte_b
+    if not _es_array(total, parte_a, parte_b, montoA):
+        if suma == total:
+            return parte_a
+        if not suma:
+            return total if montoA else 0
+        return _dividir(total * parte_a, suma)
+    total, parte_a, suma, montoA = np.broadcast_arrays(total, parte_a, suma, montoA)
+    base = np.where(suma == 0, 1, suma)
+    signo = np.where(base < 0, -1, 1)
+    proporcional = _redondear(total * parte_a * signo, base * signo)
+    sin_partes = np.where(montoA != 0, total, 0)
+    return np.where(suma == total, parte_a, np.where(suma == 0, sin_partes, proporcional))
+
+
+def repartir_cobro(montoA, montoB, iibb, dbcr, tasa_a, tasa_b):
+    """
+    Reparte el IIBB y el DByCR grabados de un cobro (o de muchos, con
+    arrays) entre la cuenta A y la cuenta B según sus tasas. Devuelve
+    (iibb A, dbcr A, iibb B, dbcr B) en centavos; cada par suma lo grabado.
+    """
+    iibb_a = _parte_a(iibb, _porcentaje(montoA, tasa_a[0]), _porcentaje(montoB, tasa_b[0]), montoA)
+    dbcr_a = _parte_a(dbcr, _porcentaje(montoA, tasa_a[1]), _porcentaje(montoB, tasa_b[1]), montoA)
+    return iibb_a, dbcr_a, iibb - iibb_a, dbcr - dbcr_a
+
+
+# — Tasas ————————————————————————————
+
+@functools.lru_cache(maxsize=1024)
+def _tasas_par(tbl, cuentaA, cuentaB, dia):
+    return tbl.tasa(cuentaA, dia), tbl.tasa(cuentaB, dia)
+
+
+def tasas_cobro(cuentaA, cuentaB, fecha=None, tbl=None):
+    """
+    ((%IIBB, %DByCR) de la cuenta A, (%IIBB, %DByCR) de la cuenta B)
+    vigentes en `fecha` (por defecto, hoy). `tbl` es un tasas.IndiceTasas
+    (por defecto, el de tax_cobros.txt); al cambiar la tabla cambia el
+    índice, así que lo memorizado nunca queda viejo.
+    """
+    if tbl is None:
+        tbl = tasas.obtener(TAX_COBROS_FILE)
+    return _tasas_par(tbl, str(cuentaA).strip(), str(cuentaB).strip(), tasas.dia(fecha))
+
+
+def tasa_pago(cuenta_paga, fecha=None, tbl=None):
+    """%DByCR bancario de la cuenta que paga vigente en `fecha`."""
+    if tbl is None:
+        tbl = tasas.obtener(TAX_PAGOS_FILE)
+    return tbl.tasa(cuenta_paga, fecha)
+
+
+# — Registros ——————————————————————————
+
+def impuestos_cobro(cuentaA, montoA, cuentaB, montoB, total_imputaciones, fecha=None, tbl=None):
+    """
+    Impuestos de un cobro: IIBB y DByCR según la tasa de la cuenta A y de
+    la cuenta B vigente en `fecha` (por defecto, hoy) aplicados a cada
+    monto, e IVA incluido en el total de imputaciones. Los montos pueden
+    ser arrays (muchos cobros con las mismas cuentas y fecha). Devuelve
+    (dbcr, iibb, iva) en centavos.
+    """
+    tasa_a, tasa_b = tasas_cobro(cuentaA, cuentaB, fecha, tbl)
+    return calcular_cobro(montoA, montoB, total_imputaciones, tasa_a, tasa_b)
+
+
+def impuestos_por_cuenta(c, tbl=None):
+    """
+    [(cuenta, iibb, dbcr)] de un cobro grabado: lo que corresponde a la
+    cuenta A y a la cuenta B con las tasas vigentes en su fecha. Si el
+    cobro usa una sola cuenta, todo va a esa.
+    """
+    cuenta_a, cuenta_b = str(c.numCuentaA).strip(), str(c.numCuentaB).strip()
+    if not cuenta_a or not cuenta_b:
+        return [(cuenta_a or cuenta_b, c.anticipoIIBB, c.impuestoDBCRb)]
+    tasa_a, tasa_b = tasas_cobro(cuenta_a, cuenta_b, c.fecha, tbl)
+    iibb_a, dbcr_a, iibb_b, dbcr_b = repartir_cobro(
+        c.montoA, c.montoB, c.anticipoIIBB, c.impuestoDBCRb, tasa_a, tasa_b)
+    return [(cuenta_a, iibb_a, dbcr_a), (cuenta_b, iibb_b, dbcr_b)]
+
+
+def impuestos_pago(cuenta_paga, monto_neto, fecha=None, tbl=None):
+    """
+    Impuestos de un pago: IVA incluido en el neto y DByCR bancario de la
+    cuenta que paga vigente en `fecha`. Devuelve (iva, dbcr) en centavos.
+    """
+    return calcular_pago(monto_neto, tasa_pago(cuenta_paga, fecha, tbl))
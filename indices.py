@@ -0,0 +1,152 @@
+# indices.py
+#
+# Índices hash persistentes sobre claves naturales, para detectar
+# duplicados sin recorrer los archivos:
+#   - clientes: DNI y nombre normalizado + parcela
+#   - cobros:   huella (fecha, pagador, importes)
+#   - pagos:    huella (fecha, razón social, cuenta, neto)
+#
+# Cada índice se guarda en data/_indice_<archivo>.pkl junto con la versión
+# del archivo que refleja. Si desde entonces sólo hubo altas, se leen
+# únicamente las líneas nuevas; si el archivo se reescribió (edición o
+# borrado) el índice se reconstruye una vez.
+
+import os
+import pickle
+import hashlib
+import unicodedata
+
+from storage import ensure_data_directory, version_archivo, leer_desde
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con los espacios colapsados."""
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return ' '.join(texto.lower().split())
+
+
+def _huella(*valores):
+    return hashlib.blake2b(repr(valores).encode('utf-8'), digest_size=8).digest()
+
+
+def claves_cliente(c):
+    claves = []
+    dni = ''.join(ch for ch in str(c.DNI) if ch.isdigit())
+    if dni:
+        claves.append(('DNI', dni))
+    nombre = normalizar(c.nombreCompleto)
+    if nombre:
+        claves.append(('nombre y parcela', (nombre, normalizar(c.parcela1))))
+    return claves
+
+
+def claves_cobro(c):
+    return [('cobro', _huella(
+        str(c.fecha).strip(), normalizar(c.nombreCompleto),
+        c.importeBruto1, c.importeBruto2, c.importeBruto3, c.montoA, c.montoB,
+    ))]
+
+
+def claves_pago(p):
+    return [('pago', _huella(
+        str(p.fecha).strip(), normalizar(p.razonSocial),
+        str(p.numCuenta).strip(), p.montoNeto,
+    ))]
+
+
+CLAVES = {
+    'clientes.txt': claves_cliente,
+    'cobros.txt':   claves_cobro,
+    'pagos.txt':    claves_pago,
+}
+
+
+class Indice:
+    """Claves naturales de un archivo → ID del primer registro que la tiene."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.claves_de = CLAVES[filename]
+        self.path = os.path.join(ensure_data_directory(), f"_indice_{filename.replace('.txt', '')}.pkl")
+        self.generacion = None
+        self.offset = 0
+        self.ids = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    self.generacion, self.offset, self.ids = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                self.generacion, self.offset, self.ids = None, 0, {}
+        self.refrescar()
+
+    def refrescar(self):
+        """Incorpora las altas nuevas del archivo (o lo reconstruye si se reescribió)."""
+        generacion, tam = version_archivo(self.filename)
+        if generacion != self.generacion or tam < self.offset:
+            self.generacion, self.offset, self.ids = generacion, 0, {}
+        if tam == self.offset:
+            return
+        registros, self.offset = leer_desde(self.filename, self.offset)
+        for r in registros:
+            for clave in self.claves_de(r):
+                self.ids.setdefault(clave, r.id)
+        self._guardar()
+
+    def _guardar(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((self.generacion, self.offset, self.ids), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def duplicados(self, registro):
+        """Lista de (motivo, ID existente) para las claves de `registro` ya presentes."""
+        encontrados = []
+        for clave in self.claves_de(registro):
+            existente = self.ids.get(clave)
+            if existente is not None and existente != registro.id:
+                encontrados.append((clave[0], existente))
+        return encontrados
+
+
+_indices = {}
+
+def obtener(filename):
+    """Índice compartido de `filename`, al día con el archivo."""
+    idx = _indices.get(filename)
+    if idx is None:
+        idx = _indices[filename] = Indice(filename)
+    else:
+        idx.refrescar()
+    return idx
+
+
+def filtrar_duplicados(filename, registros, vistas=None, existentes=None):
+    """
+    Separa `registros` (todavía no grabados) en (nuevos, omitidos,
+    repetidos): omite sólo los que ya están en el archivo. Los que repiten
+    una clave de otro registro de la misma importación se conservan en
+    `nuevos` (pueden ser movimientos legítimos, por ejemplo dos cobros
+    iguales el mismo día) y además se devuelven en `repetidos` para
+    avisarle al usuario. `vistas` acumula las claves ya aceptadas entre
+    lotes. `existentes` son las claves del archivo (por defecto, las del
+    índice al día); una importación que graba por lotes mientras filtra
+    pasa las de antes de empezar, para no confundir sus propias líneas ya
+    grabadas con registros anteriores.
+    """
+    claves_de = CLAVES[filename]
+    if existentes is None:
+        existentes = obtener(filename).ids
+    if vistas is None:
+        vistas = set()
+    nuevos, omitidos, repetidos = [], [], []
+    for r in registros:
+        claves = claves_de(r)
+        if any(c in existentes for c in claves):
+            omitidos.append(r)
+            continue
+        if any(c in vistas for c in claves):
+            repetidos.append(r)
+        vistas.update(claves)
+        nuevos.append(r)
+    return nuevos, omitidos, repetidos
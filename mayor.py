@@ -0,0 +1,335 @@
+# mayor.py
+#
+# Libro mayor: partidas (debe / haber) por cuenta derivadas de cada cobro
+# y cada pago, y saldos por cuenta y día materializados.
+#
+#   Cobro: debe en las cuentas A y B, haber en las imputaciones; el IVA
+#          incluido pasa de la imputación 1 a IVA DF; el anticipo de IIBB y
+#          el DByCR se debitan a gastos y se acreditan a la cuenta A y a la
+#          B, cada una por su parte (ver impuestos.impuestos_por_cuenta).
+#   Pago:  debe en la cuenta imputada y haber en la cuenta que paga; el IVA
+#          incluido pasa de la cuenta imputada a IVA Cr. Fiscal; el DByCR se
+#          debita a gastos bancarios y se acredita a la cuenta que paga.
+#
+# Todo se guarda en data/_mayor.pkl junto con la versión de cobros.txt y
+# pagos.txt que refleja y la tabla de tasas de cobros con la que se armó
+# (decide el reparto de impuestos entre las cuentas A y B). Las altas se
+# incorporan leyendo sólo las líneas nuevas; las ediciones y bajas hechas
+# con reescribir() descuentan las partidas viejas y suman las nuevas sin
+# releer nada. Si cambió la tabla de tasas se rehacen sólo los cobros del
+# archivo vivo fechados desde el primer día en que cambia alguna tasa: los
+# meses cerrados (archivados) quedan como estaban. Si un archivo se
+# reescribió por otro lado, el mayor se reconstruye una vez.
+
+import os
+import pickle
+import datetime
+
+import tasas
+from fechas import parse_fecha
+from impuestos import impuestos_por_cuenta
+from storage import (
+    ensure_data_directory, version_archivo, leer_desde, leer_vivos, rewrite_records,
+    reemplazar_por_id, TAX_COBROS_FILE,
+)
+
+CUENTA_IVA_DF = '21-40-001'
+CUENTA_IVA_CF = '11-40-001'
+CUENTA_GASTOS_BANCARIOS = '45-00-015'
+CUENTA_IIBB = '45-00-016'
+
+
+def _cuenta(valor):
+    return str(valor).strip()
+
+
+def partidas_cobro(c, tbl=None):
+    """
+    Lista de (cuenta, debe, haber) de un cobro, en centavos. `tbl` es el
+    tasas.IndiceTasas de cobros (por defecto, el actual).
+    """
+    partidas = []
+    for cuenta, monto in ((c.numCuentaA, c.montoA), (c.numCuentaB, c.montoB)):
+        if _cuenta(cuenta) and monto:
+            partidas.append((_cuenta(cuenta), monto, 0))
+    for cuenta, importe in ((c.imputacion1, c.importeBruto1),
+                            (c.imputacion2, c.importeBruto2),
+                            (c.imputacion3, c.importeBruto3)):
+        if _cuenta(cuenta) and importe:
+            partidas.append((_cuenta(cuenta), 0, importe))
+
+    if c.iva and _cuenta(c.imputacion1):
+        partidas.append((_cuenta(c.imputacion1), c.iva, 0))
+        partidas.append((CUENTA_IVA_DF, 0, c.iva))
+    for banco, iibb, dbcr in impuestos_por_cuenta(c, tbl):
+        if not banco:
+            continue
+        if iibb:
+            partidas.append((CUENTA_IIBB, iibb, 0))
+            partidas.append((banco, 0, iibb))
+        if dbcr:
+            partidas.append((CUENTA_GASTOS_BANCARIOS, dbcr, 0))
+            partidas.append((banco, 0, dbcr))
+    return partidas
+
+
+def partidas_pago(p):
+    """Lista de (cuenta, debe, haber) de un pago, en centavos."""
+    imputada, paga = _cuenta(p.numCuenta), _cuenta(p.cuentaAcreditar)
+    partidas = []
+    if p.montoNeto:
+        if imputada:
+            partidas.append((imputada, p.montoNeto, 0))
+        if paga:
+            partidas.append((paga, 0, p.montoNeto))
+    if p.iva and imputada:
+        partidas.append((CUENTA_IVA_CF, p.iva, 0))
+        partidas.append((imputada, 0, p.iva))
+    if p.impuestoDBCRb and paga:
+        partidas.append((CUENTA_GASTOS_BANCARIOS, p.impuestoDBCRb, 0))
+        partidas.append((paga, 0, p.impuestoDBCRb))
+    return partidas
+
+
+# archivo → (tipo de origen, función de partidas, campo de detalle)
+FUENTES = {
+    'cobros.txt': ('cobro', partidas_cobro, 'nombreCompleto'),
+    'pagos.txt':  ('pago',  partidas_pago,  'razonSocial'),
+}
+
+
+class Mayor:
+    """
+    movimientos: cuenta → {(tipo, id): [(día ordinal, debe, haber, detalle), ...]}
+    saldos:      cuenta → {día ordinal: [debe, haber]}
+    totales:     cuenta → [debe, haber]
+
+    Los oyentes (ver suscribir) reciben cada partida sumada o descontada
+    con mover(cuenta, debe, haber), y reiniciar(totales) si se reconstruye.
+    """
+
+    def __init__(self):
+        self.path = os.path.join(ensure_data_directory(), '_mayor.pkl')
+        self.oyentes = []
+        self._vaciar()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    (self.versiones, self.filas_tasas, self.movimientos, self.saldos,
+                     self.totales) = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                self._vaciar()
+        self.refrescar()
+
+    def _vaciar(self):
+        self.versiones, self.movimientos, self.saldos, self.totales = {}, {}, {}, {}
+        self.filas_tasas = None
+
+    def suscribir(self, oyente):
+        self.oyentes.append(oyente)
+
+    def desuscribir(self, oyente):
+        if oyente in self.oyentes:
+            self.oyentes.remove(oyente)
+
+    def refrescar(self):
+        """
+        Incorpora las altas nuevas (o reconstruye si un archivo se
+        reescribió) y pasa a la tabla de tasas de cobros actual.
+        """
+        cambios = False
+        actual = tasas.obtener(TAX_COBROS_FILE)
+        if self.filas_tasas is None or self.filas_tasas == actual.filas:
+            self.tasas = actual
+        else:
+            # Las altas se suman con la tabla de los demás cobros y después
+            # se cambia de tabla para todos juntos
+            self.tasas = tasas.IndiceTasas(self.filas_tasas, tasas.DEFECTO[TAX_COBROS_FILE])
+        for filename in FUENTES:
+            generacion, tam = version_archivo(filename)
+            gen_previa, offset = self.versiones.get(filename, (None, 0))
+            if generacion != gen_previa or tam < offset:
+                if gen_previa is not None or offset:
+                    return self._reconstruir()
+                offset = 0
+            if tam == offset and generacion == gen_previa:
+                continue
+            registros, offset = leer_desde(filename, offset)
+            for r in registros:
+                self._aplicar(filename, r, 1)
+            self.versiones[filename] = (generacion, offset)
+            cambios = True
+        if self.tasas is not actual and not self._cambiar_tasas(actual):
+            return self._reconstruir()
+        if self.filas_tasas != actual.filas:
+            self.filas_tasas = actual.filas
+            cambios = True
+        if cambios:
+            self._guardar()
+
+    def _cambiar_tasas(self, nuevo):
+        """
+        Pasa a la tabla de tasas `nuevo` los cobros del archivo vivo con
+        fecha desde el primer día en que cambia alguna tasa: descuenta sus
+        partidas con la tabla anterior y suma las nuevas. Devuelve False si
+        cobros.txt creció mientras tanto (hay que reconstruir).
+        """
+        desde = tasas.primer_cambio(self.tasas, nuevo)
+        if desde is not None:
+            registros, offset = leer_vivos('cobros.txt')
+            if offset != self.versiones['cobros.txt'][1]:
+                return False
+            afectados = [c for c in registros
+                         if parse_fecha(c.fecha) and parse_fecha(c.fecha).toordinal() >= desde]
+            for c in afectados:
+                self._aplicar('cobros.txt', c, -1)
+            self.tasas = nuevo
+            for c in afectados:
+                self._aplicar('cobros.txt', c, 1)
+        self.tasas = nuevo
+        return True
+
+    def _reconstruir(self):
+        oyentes, self.oyentes = self.oyentes, []
+        self._vaciar()
+        self.refrescar()
+        self.oyentes = oyentes
+        for o in oyentes:
+            o.reiniciar(self.totales)
+
+    def _aplicar(self, filename, registro, signo):
+        """Suma (signo=1) o descuenta (signo=-1) las partidas de `registro`."""
+        tipo, partidas_de, campo_detalle = FUENTES[filename]
+        fecha = parse_fecha(registro.fecha)
+        if fecha is None:
+            return
+        dia = fecha.toordinal()
+        origen = (tipo, registro.id)
+        detalle = getattr(registro, campo_detalle)
+        partidas = partidas_de(registro, self.tasas) if tipo == 'cobro' else partidas_de(registro)
+        for cuenta, debe, haber in partidas:
+            por_origen = self.movimientos.setdefault(cuenta, {})
+            if signo > 0:
+                por_origen.setdefault(origen, []).append((dia, debe, haber, detalle))
+            else:
+                lista = por_origen.get(origen, [])
+                for i, mov in enumerate(lista):
+                    if mov[:3] == (dia, debe, haber):
+                        del lista[i]
+                        break
+                if not lista:
+                    por_origen.pop(origen, None)
+            del_dia = self.saldos.setdefault(cuenta, {}).setdefault(dia, [0, 0])
+            del_dia[0] += signo * debe
+            del_dia[1] += signo * haber
+            if del_dia == [0, 0] and signo < 0:
+                del self.saldos[cuenta][dia]
+            total = self.totales.setdefault(cuenta, [0, 0])
+            total[0] += signo * debe
+            total[1] += signo * haber
+            for o in self.oyentes:
+                o.mover(cuenta, signo * debe, signo * haber)
+
+    def reemplazar(self, filename, quitados, agregados):
+        """
+        Descuenta las partidas de `quitados` y suma las de `agregados` (tras
+        una edición o baja ya grabada) y toma la versión actual del archivo.
+        """
+        for r in quitados:
+            self._aplicar(filename, r, -1)
+        for r in agregados:
+            self._aplicar(filename, r, 1)
+        self.versiones[filename] = version_archivo(filename)
+        self._guardar()
+
+    def _guardar(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((self.versiones, self.filas_tasas, self.movimientos, self.saldos,
+                         self.totales), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    # — Consultas (O(movimientos de la cuenta)) ————————————
+
+    def libro(self, cuenta, desde=None, hasta=None):
+        """
+        Movimientos de `cuenta` ordenados por fecha, como tuplas
+        (fecha, (tipo, id), detalle, debe, haber, saldo). `desde` y `hasta`
+        son fechas (datetime.date) opcionales; el saldo arrastra lo anterior
+        a `desde`.
+        """
+        ini = desde.toordinal() if desde else None
+        fin = hasta.toordinal() if hasta else None
+        saldo = self.saldo(cuenta, desde - datetime.timedelta(days=1)) if desde else 0
+        filas = []
+        for origen, movs in self.movimientos.get(cuenta, {}).items():
+            for dia, debe, haber, detalle in movs:
+                if (ini is None or dia >= ini) and (fin is None or dia <= fin):
+                    filas.append((dia, origen, detalle, debe, haber))
+        filas.sort(key=lambda f: (f[0], f[1]))
+        resultado = []
+        for dia, origen, detalle, debe, haber in filas:
+            saldo += debe - haber
+            resultado.append((datetime.date.fromordinal(dia), origen, detalle, debe, haber, saldo))
+        return resultado
+
+    def saldos_diarios(self, cuenta):
+        """Lista de (fecha, debe, haber, saldo acumulado) por día con movimientos."""
+        saldo = 0
+        resultado = []
+        for dia, (debe, haber) in sorted(self.saldos.get(cuenta, {}).items()):
+            saldo += debe - haber
+            resultado.append((datetime.date.fromordinal(dia), debe, haber, saldo))
+        return resultado
+
+    def saldo(self, cuenta, hasta=None):
+        """Saldo deudor (debe - haber) de `cuenta` al día `hasta` inclusive."""
+        if hasta is None:
+            debe, haber = self.totales.get(cuenta, (0, 0))
+            return debe - haber
+        fin = hasta.toordinal()
+        return sum(debe - haber for dia, (debe, haber) in self.saldos.get(cuenta, {}).items()
+                   if dia <= fin)
+
+    def cuentas(self):
+        return sorted(c for c, dias in self.saldos.items() if dias)
+
+
+_mayor = None
+
+def obtener():
+    """Mayor compartido, al día con cobros.txt y pagos.txt."""
+    global _mayor
+    if _mayor is None:
+        _mayor = Mayor()
+    else:
+        _mayor.refrescar()
+    return _mayor
+
+
+def reescribir(filename, registros, quitados=(), agregados=()):
+    """
+    rewrite_records() manteniendo el mayor al día: `quitados` son los
+    registros borrados o en su versión anterior a la edición, `agregados`
+    los nuevos o editados.
+    """
+    if filename not in FUENTES:
+        rewrite_records(filename, registros)
+        return
+    m = obtener()
+    rewrite_records(filename, registros)
+    m.reemplazar(filename, quitados, agregados)
+
+
+def editar(filename, anteriores, nuevos):
+    """
+    storage.reemplazar_por_id() manteniendo el mayor al día: `anteriores`
+    son los registros tal como estaban grabados y `nuevos` sus versiones
+    corregidas (mismos IDs).
+    """
+    if filename not in FUENTES:
+        reemplazar_por_id(filename, nuevos)
+        return
+    m = obtener()
+    reemplazar_por_id(filename, nuevos)
+    m.reemplazar(filename, anteriores, nuevos)
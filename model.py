@@ -1,6 +1,52 @@
 # model.py
 
-class cobro:
+class _registro:
+    """
+    Base común de los registros. Cada subclase declara sus campos en
+    __slots__ (en el mismo orden que la tupla grabada en disco), así que
+    no hay __dict__ por instancia y la tupla se arma/desarma por nombre.
+    IMPORTES lista los campos que son montos en centavos (int).
+    """
+    __slots__ = ()
+    IMPORTES = ()
+
+    @classmethod
+    def from_tuple(cls, tupla):
+        return cls(*tupla)
+
+    def to_tuple(self):
+        return tuple(getattr(self, campo) for campo in self.__slots__)
+
+    def __iter__(self):
+        return iter(self.to_tuple())
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, otro):
+        if type(otro) is not type(self):
+            return NotImplemented
+        return self.to_tuple() == otro.to_tuple()
+
+    def __repr__(self):
+        return f"{type(self).__name__}{self.to_tuple()!r}"
+
+
+class cobro(_registro):
+    # claves de la tupla: 0..20
+    __slots__ = (
+        'id', 'fecha', 'nombreCompleto', 'numParcela',
+        'imputacion1', 'concepto1', 'importeBruto1',
+        'imputacion2', 'concepto2', 'importeBruto2',
+        'imputacion3', 'concepto3', 'importeBruto3',
+        'numCuentaA', 'montoA', 'numCuentaB', 'montoB',
+        'impuestoDBCRb', 'anticipoIIBB', 'iva', 'observaciones',
+    )
+    IMPORTES = (
+        'importeBruto1', 'importeBruto2', 'importeBruto3',
+        'montoA', 'montoB', 'impuestoDBCRb', 'anticipoIIBB', 'iva',
+    )
+
     def __init__(self,
                  id, fecha, nombreCompleto, numParcela,
                  imputacion1, concepto1, importeBruto1,
@@ -8,7 +54,6 @@ class cobro:
                  imputacion3, concepto3, importeBruto3,
                  numCuentaA, montoA, numCuentaB, montoB,
                  impuestoDBCRb, anticipoIIBB, iva, observaciones):
-        # claves de la tupla: 0..19
         self.id = id
         self.fecha = fecha
         self.nombreCompleto = nombreCompleto
@@ -45,11 +90,17 @@ class cobro:
         )
 
 
-class pago:
+class pago(_registro):
+    # claves de la tupla: 0..9
+    __slots__ = (
+        'id', 'fecha', 'razonSocial', 'concepto', 'tipoComprobante',
+        'numCuenta', 'montoNeto', 'iva', 'cuentaAcreditar', 'impuestoDBCRb',
+    )
+    IMPORTES = ('montoNeto', 'iva', 'impuestoDBCRb')
+
     def __init__(self,
                  id, fecha, razonSocial, concepto, tipoComprobante,
                  numCuenta, montoNeto, iva, cuentaAcreditar, impuestoDBCRb):
-        # claves de la tupla: 0..8
         self.id = id
         self.fecha = fecha
         self.razonSocial = razonSocial
@@ -69,11 +120,17 @@ class pago:
         )
 
 
-class cliente:
+class cliente(_registro):
+    # claves de la tupla: 0..11
+    __slots__ = (
+        'id', 'nombreCompleto', 'DNI', 'direccion',
+        'telefono1', 'telefono2', 'email',
+        'parcela1', 'parcela2', 'parcela3', 'superficie', 'observaciones',
+    )
+
     def __init__(self, id, nombreCompleto, DNI, direccion,
                  telefono1, telefono2, email,
                  parcela1, parcela2, parcela3, superficie, observaciones):
-        # claves de la tupla: 0..11
         self.id = id
         self.nombreCompleto = nombreCompleto
         self.DNI = DNI
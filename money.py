@@ -0,0 +1,73 @@
+# money.py
+#
+# Los importes se manejan como enteros en centavos en todo el sistema
+# (formularios, archivos de datos, impuestos y totales). Estas funciones
+# son el único lugar donde se convierte desde/hacia pesos con decimales.
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+PCT_IVA = 21.0
+
+# Importe máximo aceptado (en pesos, en valor absoluto): cualquier monto
+# real entra de sobra y los centavos caben en un int64 (ver columnar.py)
+MAX_PESOS = Decimal(10) ** 12
+
+
+def a_centavos(valor):
+    """
+    Convierte un importe en pesos (texto del formulario, float heredado de
+    archivos viejos, int o Decimal) a centavos enteros, redondeando al
+    centavo más cercano. Un texto vacío o None vale 0. Acepta también la
+    forma con coma decimal ('150.000,00', '1234,5').
+    Lanza ValueError si el texto no es un número finito o pasa MAX_PESOS.
+    """
+    if valor is None:
+        return 0
+    if isinstance(valor, float):
+        valor = repr(valor)
+    if isinstance(valor, str):
+        valor = valor.strip()
+        if not valor:
+            return 0
+        if ',' in valor:
+            if '.' in valor and valor.rindex('.') > valor.rindex(','):
+                valor = valor.replace(',', '')                    # 1,234.50
+            else:
+                valor = valor.replace('.', '').replace(',', '.')  # 150.000,00
+    try:
+        pesos = Decimal(valor)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Importe inválido: {valor!r}")
+    if not pesos.is_finite() or abs(pesos) >= MAX_PESOS:
+        raise ValueError(f"Importe inválido: {valor!r}")
+    return int((pesos * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def a_pesos(centavos):
+    """Formatea centavos como texto en pesos con dos decimales ('1234.50')."""
+    signo = '-' if centavos < 0 else ''
+    entero, resto = divmod(abs(int(centavos)), 100)
+    return f"{signo}{entero}.{resto:02d}"
+
+
+def a_decimal(centavos):
+    """Devuelve el importe en pesos como Decimal exacto."""
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def porcentaje(centavos, pct):
+    """Aplica `pct` (por ejemplo 5.0 o 0.6) sobre `centavos`, redondeado al centavo."""
+    monto = Decimal(int(centavos)) * Decimal(str(pct)) / 100
+    return int(monto.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def iva_incluido(centavos, pct=PCT_IVA):
+    """IVA contenido en un importe que ya lo incluye (total - total / 1.21)."""
+    base = Decimal(int(centavos)) / (1 + Decimal(str(pct)) / 100)
+    return int(centavos) - int(base.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def por_cantidad(centavos, cantidad):
+    """Importe unitario por una cantidad (por ejemplo m²), redondeado al centavo."""
+    monto = Decimal(int(centavos)) * Decimal(str(cantidad))
+    return int(monto.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
@@ -0,0 +1,210 @@
+# pivot.py
+#
+# Tablas dinámicas sobre cobros y pagos: agrupar por una o más columnas
+# (filas) y opcionalmente abrir por otra (columnas), sumando, contando o
+# promediando un importe. Trabaja sobre los snapshots en columnas
+# (columnar.py): cada dimensión es un vector de códigos enteros, la clave
+# de grupo es la combinación de códigos en un int64 y la agregación es una
+# sola pasada de NumPy (np.unique + np.bincount).
+#
+# Dimensiones disponibles:
+#   - 'fecha:dia', 'fecha:mes', 'fecha:trimestre', 'fecha:anio'
+#   - las columnas de cuentas y de texto del snapshot (ver columnar.CUENTAS
+#     y columnar.TEXTOS)
+#   - en cobros, 'imputacion' (imputación 1 a 3 con su importe) y
+#     'cuenta_cobro' (cuenta A y B con su monto): cada cobro aporta una fila
+#     por imputación / cuenta y el valor es el importe correspondiente.
+
+import csv
+
+import columnar
+import cache_reportes
+from columnar import np
+from money import a_pesos
+from storage import ENTIDADES
+
+FECHAS = ('fecha:dia', 'fecha:mes', 'fecha:trimestre', 'fecha:anio')
+
+MULTIPLES = {
+    'cobros.txt': {
+        'imputacion': (('imputacion1', 'importeBruto1'),
+                       ('imputacion2', 'importeBruto2'),
+                       ('imputacion3', 'importeBruto3')),
+        'cuenta_cobro': (('numCuentaA', 'montoA'), ('numCuentaB', 'montoB')),
+    },
+    'pagos.txt': {},
+}
+
+AGREGACIONES = ('suma', 'cantidad', 'promedio')
+
+VACIO = '(vacío)'
+
+
+def dimensiones(filename):
+    """Nombres de las dimensiones por las que se puede agrupar `filename`."""
+    return (list(FECHAS) + list(columnar.CUENTAS[filename]) + list(columnar.TEXTOS[filename])
+            + list(MULTIPLES[filename]))
+
+
+def valores(filename):
+    """Importes que se pueden agregar (el de las dimensiones múltiples es 'importe')."""
+    return list(ENTIDADES[filename].IMPORTES)
+
+
+def _codigos_fecha(fechas, dim):
+    """(códigos 0..n-1, etiquetas) de una columna datetime64[D] agrupada según `dim`."""
+    if dim == 'fecha:dia':
+        claves = fechas.view(np.int64)
+        def etiqueta(v): return str(np.datetime64(v, 'D'))
+    elif dim == 'fecha:mes':
+        claves = fechas.astype('datetime64[M]').view(np.int64)
+        def etiqueta(v): return str(np.datetime64(v, 'M'))
+    elif dim == 'fecha:trimestre':
+        meses = fechas.astype('datetime64[M]').view(np.int64)
+        claves = meses // 3
+        def etiqueta(v): return f'{1970 + v // 4}-T{v % 4 + 1}'
+    else:
+        claves = fechas.astype('datetime64[Y]').view(np.int64)
+        def etiqueta(v): return str(1970 + v)
+    unicos, codigos = np.unique(claves, return_inverse=True)
+    return codigos, [etiqueta(int(v)) for v in unicos]
+
+
+def _columna(snap, dim, filas):
+    """(códigos, etiquetas) de la dimensión `dim` para las posiciones `filas`."""
+    if dim in FECHAS:
+        return _codigos_fecha(snap['fecha'][filas], dim)
+    if dim in snap.campos_cuenta:
+        etiquetas = snap.cuentas.valores
+    else:
+        etiquetas = snap.textos[dim].valores
+    return snap[dim][filas].astype(np.int64), [e or VACIO for e in etiquetas]
+
+
+def pivot(filename, filas, columna=None, valor='montoA', agregacion='suma', desde=None, hasta=None):
+    """
+    Agrupa `filename` por las dimensiones `filas` (lista) y, si se indica,
+    abre los resultados por la dimensión `columna`. `valor` es el importe
+    a agregar ('importe' si se usa una dimensión múltiple) y `agregacion`
+    'suma', 'cantidad' o 'promedio'. `desde`/`hasta` (datetime.date)
+    limitan por fecha.
+
+    Devuelve un dict:
+      'filas':    nombres de las dimensiones de fila
+      'columnas': etiquetas de las columnas (['Total'] sin `columna`)
+      'datos':    [(etiquetas de fila, [valor por columna]), ...] ordenado
+    Sumas y promedios en centavos (el promedio redondeado). El resultado
+    queda en cache_reportes hasta que cambie `filename`.
+    """
+    return cache_reportes.cacheado(
+        'pivot', (filename, tuple(filas), columna, valor, agregacion, desde, hasta), (filename,),
+        lambda: _calcular(filename, filas, columna, valor, agregacion, desde, hasta))
+
+
+def _calcular(filename, filas, columna, valor, agregacion, desde, hasta):
+    if not columnar.HAY_NUMPY:
+        raise RuntimeError('Las tablas dinámicas necesitan NumPy.')
+    if agregacion not in AGREGACIONES:
+        raise ValueError(f'Agregación desconocida: {agregacion!r}')
+    dims = list(filas) + ([columna] if columna else [])
+    if not filas:
+        raise ValueError('Hay que elegir al menos una dimensión de fila.')
+    for d in dims:
+        if d not in dimensiones(filename):
+            raise ValueError(f'Dimensión desconocida: {d!r}')
+    multiples = [d for d in dims if d in MULTIPLES[filename]]
+    if len(set(multiples)) > 1:
+        raise ValueError('Sólo se puede usar una dimensión múltiple por tabla.')
+
+    snap = columnar.obtener(filename)
+    base = np.ones(len(snap), bool)
+    if any(d in FECHAS for d in dims) or desde or hasta:
+        base &= ~np.isnat(snap['fecha'])
+    if desde:
+        base &= snap['fecha'] >= np.datetime64(desde, 'D')
+    if hasta:
+        base &= snap['fecha'] <= np.datetime64(hasta, 'D')
+
+    # Con una dimensión múltiple, cada par (cuenta, importe) aporta sus
+    # filas; todas esas columnas de cuenta comparten el diccionario
+    if multiples:
+        pares = MULTIPLES[filename][multiples[0]]
+    else:
+        if valor not in snap.campos_importe:
+            raise ValueError(f'Importe desconocido: {valor!r}')
+        pares = ((None, valor),)
+    posiciones, importes, cods_multiple = [], [], []
+    for campo_m, campo_importe in pares:
+        f = np.flatnonzero(base & (snap[campo_importe] != 0)) if campo_m else np.flatnonzero(base)
+        posiciones.append(f)
+        importes.append(snap[campo_importe][f])
+        if campo_m:
+            cods_multiple.append(snap[campo_m][f].astype(np.int64))
+    posiciones = np.concatenate(posiciones)
+    importes = np.concatenate(importes)
+
+    codigos, etiquetas = [], []
+    for d in dims:
+        if d in MULTIPLES[filename]:
+            cods = np.concatenate(cods_multiple)
+            etq = [e or VACIO for e in snap.cuentas.valores]
+        else:
+            cods, etq = _columna(snap, d, posiciones)
+        codigos.append(cods)
+        etiquetas.append(etq)
+
+    # Clave de grupo: combinación de los códigos en un solo int64
+    clave = np.zeros(len(importes), np.int64)
+    for cods, etq in zip(codigos, etiquetas):
+        clave = clave * max(len(etq), 1) + cods
+    unicas, grupo = np.unique(clave, return_inverse=True)
+    n = len(unicas)
+    cantidad = np.bincount(grupo, minlength=n).astype(np.int64)
+    if agregacion == 'cantidad':
+        resultado = cantidad
+    else:
+        resultado = columnar.sumar_por_grupo(grupo, importes, n)
+        if agregacion == 'promedio':
+            resultado = np.rint(resultado / np.maximum(cantidad, 1)).astype(np.int64)
+
+    # Decodificar cada clave única en sus códigos por dimensión
+    partes = []
+    resto = unicas.copy()
+    for etq in reversed(etiquetas):
+        base_dim = max(len(etq), 1)
+        partes.append(resto % base_dim)
+        resto //= base_dim
+    partes.reverse()
+
+    n_filas = len(filas)
+    if columna:
+        cols = sorted(set(partes[-1].tolist()), key=lambda c: etiquetas[-1][c])
+        pos_col = {c: j for j, c in enumerate(cols)}
+        nombres_cols = [etiquetas[-1][c] for c in cols]
+    else:
+        nombres_cols = ['Total']
+    tabla = {}
+    for k in range(n):
+        fila = tuple(etiquetas[i][partes[i][k]] for i in range(n_filas))
+        vals = tabla.setdefault(fila, [0] * len(nombres_cols))
+        vals[pos_col[partes[-1][k]] if columna else 0] = int(resultado[k])
+    return {
+        'filas': list(filas),
+        'columnas': nombres_cols,
+        'datos': sorted(tabla.items()),
+    }
+
+
+def formatear(valor, agregacion):
+    """Texto para mostrar un valor del pivot."""
+    return str(valor) if agregacion == 'cantidad' else a_pesos(valor)
+
+
+def exportar_csv(resultado, ruta_csv, agregacion='suma'):
+    """Graba el resultado de pivot() en `ruta_csv`. Devuelve la cantidad de filas."""
+    with open(ruta_csv, 'w', encoding='utf-8', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(resultado['filas'] + resultado['columnas'])
+        for etiquetas, vals in resultado['datos']:
+            w.writerow(list(etiquetas) + [formatear(v, agregacion) for v in vals])
+    return len(resultado['datos'])
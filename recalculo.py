@@ -0,0 +1,156 @@
+# recalculo.py
+#
+# Recálculo por lote de los impuestos ya grabados en cobros (DByCR, IIBB e
+# IVA) y pagos (IVA y DByCR), por ejemplo después de corregir una tasa en
+# las tablas impositivas. Dos pasos:
+#   calcular() recalcula con NumPy sobre el snapshot en columnas (ver
+#              columnar.py) y las tasas vigentes en la fecha de cada
+#              registro (ver tasas.py), y arma la vista previa con los
+#              registros que cambian;
+#   aplicar()  graba todos los cambios en una sola reescritura del archivo
+#              (que reemplaza al original de una vez), si nada cambió en el
+#              medio. Sólo se interpretan y se reescriben las líneas de los
+#              registros que cambian (ver storage.reemplazar_por_id).
+#
+# La cuenta es la misma que al guardar desde los formularios
+# (impuestos.calcular_cobro / calcular_pago), hecha sobre columnas enteras.
+#
+# Los meses cerrados (ver cierre.py) no se recalculan.
+
+import datetime
+
+import mayor
+import tasas
+import cierre
+import columnar
+from columnar import np
+from impuestos import calcular_cobro, calcular_pago
+from storage import TAX_COBROS_FILE, TAX_PAGOS_FILE, registros_por_id, version_archivo
+
+# Campos de impuestos de cada archivo, en el orden de la vista previa
+CAMPOS = {
+    'cobros.txt': ('impuestoDBCRb', 'anticipoIIBB', 'iva'),
+    'pagos.txt': ('iva', 'impuestoDBCRb'),
+}
+
+_EPOCA = datetime.date(1970, 1, 1).toordinal()
+
+
+def _nuevos_cobros(snap, filas, dias):
+    tabla = tasas.obtener(TAX_COBROS_FILE)
+    tasa_a = tabla.vector(snap.cuentas, snap['numCuentaA'][filas], dias)
+    tasa_b = tabla.vector(snap.cuentas, snap['numCuentaB'][filas], dias)
+    monto_a, monto_b = snap['montoA'][filas], snap['montoB'][filas]
+    total = snap['importeBruto1'][filas] + snap['importeBruto2'][filas] + snap['importeBruto3'][filas]
+    dbcr, iibb, iva = calcular_cobro(monto_a, monto_b, total, tasa_a.T, tasa_b.T)
+    return {'impuestoDBCRb': dbcr, 'anticipoIIBB': iibb, 'iva': iva}
+
+
+def _nuevos_pagos(snap, filas, dias):
+    tasa = tasas.obtener(TAX_PAGOS_FILE).vector(snap.cuentas, snap['cuentaAcreditar'][filas], dias)
+    iva, dbcr = calcular_pago(snap['montoNeto'][filas], tasa[:, 0])
+    return {'iva': iva, 'impuestoDBCRb': dbcr}
+
+
+_CALCULO = {'cobros.txt': _nuevos_cobros, 'pagos.txt': _nuevos_pagos}
+_CUENTAS = {'cobros.txt': ('numCuentaA', 'numCuentaB'), 'pagos.txt': ('cuentaAcreditar',)}
+
+
+class Recalculo:
+    """
+    Resultado de calcular(): `cambios` es una lista de (registro grabado,
+    registro recalculado) sólo con los que tienen alguna diferencia.
+    """
+
+    def __init__(self, filename, version, revisados, cambios):
+        self.filename = filename
+        self.version = version
+        self.revisados = revisados
+        self.cambios = cambios
+
+    def __len__(self):
+        return len(self.cambios)
+
+    def diferencias(self):
+        """{campo: nuevo - grabado} sumando todos los cambios (centavos)."""
+        return {
+            campo: sum(getattr(n, campo) - getattr(v, campo) for v, n in self.cambios)
+            for campo in CAMPOS[self.filename]
+        }
+
+    def filas_vista(self, limite=None):
+        """[(id, fecha, nombre, grabado, nuevo, grabado, nuevo, ...)] para la vista previa."""
+        nombre = 'nombreCompleto' if self.filename == 'cobros.txt' else 'razonSocial'
+        filas = []
+        for viejo, nuevo in self.cambios[:limite]:
+            fila = [viejo.id, viejo.fecha, getattr(viejo, nombre)]
+            for campo in CAMPOS[self.filename]:
+                fila += [getattr(viejo, campo), getattr(nuevo, campo)]
+            filas.append(tuple(fila))
+        return filas
+
+
+def calcular(filename, desde=None, hasta=None, cuenta=None):
+    """
+    Recalcula los impuestos de `filename` ('cobros.txt' o 'pagos.txt')
+    para los registros con fecha entre `desde` y `hasta` (datetime.date,
+    inclusive; None = sin límite) y, si se indica `cuenta`, sólo los
+    cobrados en ella (cuenta A o B) o pagados desde ella. Devuelve un
+    Recalculo con los registros cuyos impuestos grabados difieren.
+    """
+    if not columnar.HAY_NUMPY:
+        raise RuntimeError('El recálculo de impuestos necesita NumPy.')
+    snap = columnar.obtener(filename)
+    version = version_archivo(filename)
+    fechas = snap['fecha']
+    mascara = ~np.isnat(fechas)
+    if desde:
+        mascara &= fechas >= np.datetime64(desde, 'D')
+    if hasta:
+        mascara &= fechas <= np.datetime64(hasta, 'D')
+    if cuenta:
+        cod = snap.codigo_cuenta(str(cuenta).strip())
+        mascara &= np.logical_or.reduce([snap[c] == cod for c in _CUENTAS[filename]])
+    cerrados = [np.datetime64(m, 'M') for m in cierre.meses_cerrados()]
+    if cerrados:
+        mascara &= ~np.isin(snap.meses(), cerrados)
+
+    filas = np.flatnonzero(mascara)
+    dias = fechas[filas].astype(np.int64) + _EPOCA
+    nuevos = _CALCULO[filename](snap, filas, dias)
+    distinto = np.zeros(len(filas), bool)
+    for campo, valores in nuevos.items():
+        distinto |= valores != snap[campo][filas]
+
+    # Sólo se leen completos los registros que cambian
+    por_id = {int(i): {c: int(v[k]) for c, v in nuevos.items()}
+              for k, i in zip(np.flatnonzero(distinto), snap['id'][filas][distinto])}
+    grabados = registros_por_id(filename, por_id)
+    cambios = []
+    for id_reg, valores in por_id.items():
+        viejo = grabados.get(id_reg)
+        if viejo is None:
+            continue
+        nuevo = type(viejo).from_tuple(viejo.to_tuple())
+        for campo, valor in valores.items():
+            setattr(nuevo, campo, valor)
+        cambios.append((viejo, nuevo))
+    return Recalculo(filename, version, len(filas), cambios)
+
+
+def aplicar(recalculo):
+    """
+    Graba los cambios de `recalculo` en una sola reescritura del archivo y
+    pone al día el mayor. Lanza ValueError si el archivo cambió desde el
+    cálculo (hay que volver a calcular). Devuelve la cantidad de registros
+    modificados.
+    """
+    if not recalculo.cambios:
+        return 0
+    if version_archivo(recalculo.filename) != recalculo.version:
+        raise ValueError('Los registros cambiaron desde la vista previa; vuelva a calcular.')
+    cierre.verificar([v for v, _ in recalculo.cambios])
+    mayor.editar(recalculo.filename, [v for v, _ in recalculo.cambios],
+                 [n for _, n in recalculo.cambios])
+    return len(recalculo.cambios)
+
@@ -0,0 +1,242 @@
+# recibos.py
+#
+# Recibos en PDF de los cobros. El PDF se arma a mano (una página A4 con
+# las fuentes estándar Helvetica, sin dependencias): la plantilla se
+# compila una sola vez por proceso en
+#   - los objetos fijos del archivo (catálogo, página, fuentes) ya
+#     serializados, con sus posiciones para la tabla xref
+#   - la parte fija del contenido (recuadro, líneas y rótulos)
+#   - la lista de campos variables (posición, fuente y cómo sacar el texto
+#     del cobro)
+# así que cada recibo sólo agrega los textos del cobro y la tabla xref.
+#
+# Los lotes grandes se reparten entre procesos (ProcessPoolExecutor), cada
+# uno con su plantilla compilada, y cada recibo se graba en su archivo.
+
+import os
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from model import cobro
+from money import a_pesos
+from storage import ensure_data_directory, load_plan_cuentas
+
+RECIBOS_DIR = 'recibos'
+PARALELO_MIN_RECIBOS = 50
+
+# Ancho de los caracteres de Helvetica (en milésimas del cuerpo) que
+# aparecen en importes, para alinearlos a la derecha
+_ANCHOS = {c: 556 for c in '0123456789$'}
+_ANCHOS.update({'.': 278, ',': 278, '-': 333, ' ': 278})
+
+_FUENTES = {'normal': b'/F1', 'negrita': b'/F2'}
+
+
+def numero_recibo(id_cobro, sucursal):
+    """'SSSS-NNNNNNNN' (sucursal y ID del cobro)."""
+    return f'{sucursal}-{int(id_cobro):08d}'
+
+
+def _texto_pdf(texto):
+    """Texto → literal de PDF (WinAnsi), con ( ) y \\ escapados."""
+    datos = str(texto).encode('cp1252', errors='replace')
+    return b'(' + datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _ancho(texto, tam):
+    return sum(_ANCHOS.get(c, 556) for c in texto) * tam / 1000
+
+
+def _op_texto(x, y, fuente, tam, texto, derecha=False):
+    if derecha:
+        x -= _ancho(texto, tam)
+    return b'BT %s %d Tf %.2f %.2f Td %s Tj ET\n' % (_FUENTES[fuente], tam, x, y, _texto_pdf(texto))
+
+
+# — Plantilla ——————————————————————————
+
+# Rótulos fijos: (x, y, fuente, tamaño, texto)
+ROTULOS = (
+    (60, 780, 'negrita', 18, 'RECIBO'),
+    (330, 784, 'negrita', 12, 'N.°'),
+    (330, 766, 'normal', 10, 'Fecha:'),
+    (60, 735, 'negrita', 10, 'Recibí de:'),
+    (400, 735, 'negrita', 10, 'Parcela:'),
+    (60, 708, 'negrita', 9, 'Cuenta'),
+    (140, 708, 'negrita', 9, 'Concepto'),
+    (535, 708, 'negrita', 9, 'Importe'),
+    (60, 628, 'negrita', 11, 'Total'),
+    (60, 605, 'negrita', 9, 'Cobrado en:'),
+    (60, 560, 'negrita', 9, 'Impuestos:'),
+    (140, 560, 'normal', 9, 'DByCR'),
+    (280, 560, 'normal', 9, 'IIBB'),
+    (420, 560, 'normal', 9, 'IVA incluido'),
+    (60, 525, 'negrita', 9, 'Observaciones:'),
+    (420, 447, 'normal', 8, 'Firma y aclaración'),
+)
+
+# Líneas fijas: (x1, y1, x2, y2)
+LINEAS = (
+    (40, 755, 555, 755),
+    (40, 700, 555, 700),
+    (40, 645, 555, 645),
+    (40, 580, 555, 580),
+    (380, 460, 535, 460),
+)
+
+
+def _imputacion(n, parte):
+    campos = (f'imputacion{n}', f'concepto{n}', f'importeBruto{n}')
+
+    def valor(c, plan):
+        cuenta, concepto, importe = (getattr(c, x) for x in campos)
+        if not str(cuenta).strip() and not importe:
+            return ''
+        return (str(cuenta), str(concepto), a_pesos(importe))[parte]
+    return valor
+
+
+def _cuenta_cobro(letra, parte):
+    def valor(c, plan):
+        cuenta = str(getattr(c, f'numCuenta{letra}')).strip()
+        monto = getattr(c, f'monto{letra}')
+        if not cuenta and not monto:
+            return ''
+        return f'{cuenta} {plan.get(cuenta, "")}'.strip() if parte == 0 else a_pesos(monto)
+    return valor
+
+
+def _observaciones(linea, ancho=95):
+    def valor(c, plan):
+        texto = ' '.join(str(c.observaciones or '').split())
+        return texto[linea * ancho:(linea + 1) * ancho]
+    return valor
+
+
+# Campos variables: (x, y, fuente, tamaño, función (cobro, plan) → texto, alineado a la derecha)
+CAMPOS = (
+    (360, 784, 'negrita', 12, lambda c, plan: numero_recibo(c.id, plan['_sucursal']), False),
+    (370, 766, 'normal', 10, lambda c, plan: str(c.fecha).strip(), False),
+    (125, 735, 'normal', 10, lambda c, plan: str(c.nombreCompleto), False),
+    (450, 735, 'normal', 10, lambda c, plan: str(c.numParcela), False),
+) + tuple(
+    campo
+    for n, y in ((1, 688), (2, 673), (3, 658))
+    for campo in (
+        (60, y, 'normal', 9, _imputacion(n, 0), False),
+        (140, y, 'normal', 9, _imputacion(n, 1), False),
+        (535, y, 'normal', 9, _imputacion(n, 2), True),
+    )
+) + (
+    (535, 628, 'negrita', 11,
+     lambda c, plan: a_pesos(c.importeBruto1 + c.importeBruto2 + c.importeBruto3), True),
+    (140, 605, 'normal', 9, _cuenta_cobro('A', 0), False),
+    (535, 605, 'normal', 9, _cuenta_cobro('A', 1), True),
+    (140, 590, 'normal', 9, _cuenta_cobro('B', 0), False),
+    (535, 590, 'normal', 9, _cuenta_cobro('B', 1), True),
+    (250, 560, 'normal', 9, lambda c, plan: a_pesos(c.impuestoDBCRb), True),
+    (390, 560, 'normal', 9, lambda c, plan: a_pesos(c.anticipoIIBB), True),
+    (535, 560, 'normal', 9, lambda c, plan: a_pesos(c.iva), True),
+    (60, 510, 'normal', 9, _observaciones(0), False),
+    (60, 496, 'normal', 9, _observaciones(1), False),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _plantilla():
+    """(objetos fijos serializados, posiciones de cada objeto, contenido fijo)."""
+    objetos = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+        b'/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+    ]
+    cabecera = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    partes, posiciones = [cabecera], []
+    pos = len(cabecera)
+    for i, obj in enumerate(objetos, start=1):
+        posiciones.append(pos)
+        serializado = b'%d 0 obj\n%s\nendobj\n' % (i, obj)
+        partes.append(serializado)
+        pos += len(serializado)
+
+    fijo = [b'0.5 w 40 430 515 380 re S\n']
+    fijo += [b'%d %d m %d %d l S\n' % linea for linea in LINEAS]
+    fijo += [_op_texto(x, y, fuente, tam, texto, derecha=(texto == 'Importe'))
+             for x, y, fuente, tam, texto in ROTULOS]
+    return b''.join(partes), posiciones, b''.join(fijo)
+
+
+def renderizar(c, sucursal='0001', plan=None):
+    """PDF (bytes) del recibo del cobro `c`. `plan` es {código: nombre}."""
+    prefijo, posiciones, fijo = _plantilla()
+    datos = dict(plan or {}, _sucursal=sucursal)
+    variable = []
+    for x, y, fuente, tam, valor, derecha in CAMPOS:
+        texto = valor(c, datos)
+        if texto:
+            variable.append(_op_texto(x, y, fuente, tam, texto, derecha))
+    contenido = fijo + b''.join(variable)
+
+    flujo = b'6 0 obj\n<< /Length %d >>\nstream\n%s\nendstream\nendobj\n' % (len(contenido), contenido)
+    inicio_xref = len(prefijo) + len(flujo)
+    xref = [b'xref\n0 7\n0000000000 65535 f \n']
+    xref += [b'%010d 00000 n \n' % p for p in posiciones + [len(prefijo)]]
+    xref.append(b'trailer\n<< /Size 7 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % inicio_xref)
+    return prefijo + flujo + b''.join(xref)
+
+
+# — Lotes ——————————————————————————————
+
+_plan_proceso = {}
+
+
+def _iniciar_proceso(plan):
+    global _plan_proceso
+    _plan_proceso = plan
+    _plantilla()
+
+
+def _grabar_lote(args):
+    """(tuplas de cobros, directorio, sucursal) → rutas de los recibos grabados."""
+    tuplas, directorio, sucursal = args
+    rutas = []
+    for t in tuplas:
+        c = cobro.from_tuple(t)
+        ruta = os.path.join(directorio, f'recibo_{numero_recibo(c.id, sucursal)}.pdf')
+        with open(ruta, 'wb') as f:
+            f.write(renderizar(c, sucursal, _plan_proceso))
+        rutas.append(ruta)
+    return rutas
+
+
+def directorio_defecto():
+    path = os.path.join(ensure_data_directory(), RECIBOS_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def generar_recibos(cobros, directorio=None, sucursal='0001', procesos=None):
+    """
+    Graba un PDF por cobro en `directorio` (por defecto data/recibos) y
+    devuelve las rutas en el mismo orden. Desde PARALELO_MIN_RECIBOS
+    recibos se reparten entre `procesos` procesos (por defecto, uno por
+    núcleo).
+    """
+    directorio = directorio or directorio_defecto()
+    os.makedirs(directorio, exist_ok=True)
+    plan = {str(cod): nombre for cod, nombre in load_plan_cuentas()}
+    tuplas = [c.to_tuple() for c in cobros]
+    procesos = procesos or os.cpu_count() or 1
+    if len(tuplas) < PARALELO_MIN_RECIBOS or procesos < 2:
+        _iniciar_proceso(plan)
+        return _grabar_lote((tuplas, directorio, sucursal))
+
+    # Varios tramos por proceso para repartir bien la carga
+    paso = max(1, len(tuplas) // (procesos * 4))
+    tramos = [(tuplas[i:i + paso], directorio, sucursal) for i in range(0, len(tuplas), paso)]
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso,
+                             initargs=(plan,)) as ex:
+        return [ruta for rutas in ex.map(_grabar_lote, tramos) for ruta in rutas]
@@ -0,0 +1,191 @@
+# reporte_impuestos.py
+#
+# Reporte mensual de impuestos para las presentaciones: suma por mes, por
+# cuenta de caja/banco y por impuesto
+#   - cobros: IIBB (anticipoIIBB) y DByCR (impuestoDBCRb) repartidos entre
+#     la cuenta A y la B según sus tasas (impuestos.impuestos_por_cuenta),
+#     e IVA DF (iva) en la cuenta A (o B si no hay A)
+#   - pagos:  IVA CF (iva) y DByCR (impuestoDBCRb), en la cuenta que paga
+#
+# Las sumas parciales de cada mes se guardan en data/_reporte_impuestos.pkl
+# junto con la versión de cada archivo y la tabla de tasas de cobros con
+# la que se repartieron. Mientras sólo haya altas se leen únicamente las
+# líneas nuevas. Si un archivo se reescribió, se recalculan sus meses
+# abiertos releyendo sólo el archivo vivo; un cambio en la tabla de tasas
+# recalcula los meses abiertos de cobros desde el primer día en que cambia
+# alguna tasa. Los meses cerrados (archivados, ver cierre.py) no se tocan.
+
+import os
+import csv
+import pickle
+import datetime
+
+import tasas
+from fechas import periodo
+from money import a_pesos
+from impuestos import impuestos_por_cuenta
+from storage import (
+    ensure_data_directory, version_archivo, leer_desde, leer_vivos, segmentos, TAX_COBROS_FILE,
+)
+
+IMPUESTOS = {
+    'cobros.txt': (('IIBB', 'anticipoIIBB'), ('DByCR', 'impuestoDBCRb'), ('IVA DF', 'iva')),
+    'pagos.txt':  (('IVA CF', 'iva'), ('DByCR', 'impuestoDBCRb')),
+}
+
+
+# Impuestos de cobros que se reparten entre la cuenta A y la B
+_REPARTIDOS = {'IIBB': 1, 'DByCR': 2}
+
+
+def cuenta_caja(registro):
+    """Cuenta de caja/banco del movimiento (en cobros, la A o la B si no hay A)."""
+    if hasattr(registro, 'cuentaAcreditar'):
+        return str(registro.cuentaAcreditar).strip()
+    return str(registro.numCuentaA).strip() or str(registro.numCuentaB).strip()
+
+
+def importes_por_cuenta(registro, impuestos, tbl=None):
+    """
+    [(cuenta, impuesto, centavos)] de un movimiento. `tbl` es el
+    tasas.IndiceTasas de cobros (por defecto, el actual).
+    """
+    cuenta = cuenta_caja(registro)
+    importes = []
+    for impuesto, campo in impuestos:
+        if hasattr(registro, 'cuentaAcreditar') or impuesto not in _REPARTIDOS:
+            importes.append((cuenta, impuesto, getattr(registro, campo)))
+    if not hasattr(registro, 'cuentaAcreditar'):
+        for partes in impuestos_por_cuenta(registro, tbl):
+            for impuesto, k in _REPARTIDOS.items():
+                importes.append((partes[0], impuesto, partes[k]))
+    return importes
+
+
+class ReporteImpuestos:
+    """meses: archivo → {'AAAA-MM': {(cuenta, impuesto): centavos}}"""
+
+    def __init__(self):
+        self.path = os.path.join(ensure_data_directory(), '_reporte_impuestos.pkl')
+        self.versiones, self.filas_tasas, self.meses = {}, None, {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'rb') as f:
+                    self.versiones, self.filas_tasas, self.meses = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                self.versiones, self.filas_tasas, self.meses = {}, None, {}
+        self.refrescar()
+
+    def refrescar(self):
+        """
+        Suma las altas nuevas (o recalcula los meses abiertos del archivo
+        que se reescribió) y pasa a la tabla de tasas de cobros actual.
+        """
+        cambios = False
+        actual = tasas.obtener(TAX_COBROS_FILE)
+        if self.filas_tasas is None or self.filas_tasas == actual.filas:
+            tbl = actual
+        else:
+            tbl = tasas.IndiceTasas(self.filas_tasas, tasas.DEFECTO[TAX_COBROS_FILE])
+        for filename in IMPUESTOS:
+            generacion, tam = version_archivo(filename)
+            gen_previa, offset = self.versiones.get(filename, (None, 0))
+            if gen_previa is None:
+                self.meses[filename] = {}
+                registros, offset = leer_desde(filename, 0)
+            elif generacion != gen_previa or tam < offset:
+                registros, offset = self._releer_abiertos(filename)
+            elif tam > offset:
+                registros, offset = leer_desde(filename, offset)
+            else:
+                continue
+            self._sumar(filename, registros, tbl)
+            self.versiones[filename] = (generacion, offset)
+            cambios = True
+
+        desde = tasas.primer_cambio(tbl, actual) if tbl is not actual else None
+        if desde is not None:
+            f = datetime.date.fromordinal(desde) if desde else None
+            mes = f'{f.year:04d}-{f.month:02d}' if f else ''
+            registros, offset = self._releer_abiertos('cobros.txt', mes)
+            generacion, leido = self.versiones['cobros.txt']
+            if offset != leido:
+                # cobros.txt creció mientras tanto: se rehacen todos sus meses abiertos
+                registros, offset = self._releer_abiertos('cobros.txt')
+                self.versiones['cobros.txt'] = (generacion, offset)
+            self._sumar('cobros.txt', registros, actual)
+        if self.filas_tasas != actual.filas:
+            self.filas_tasas = actual.filas
+            cambios = True
+        if cambios:
+            self._guardar()
+
+    def _releer_abiertos(self, filename, desde_mes=''):
+        """
+        Vacía los meses de `filename` que no están archivados, desde
+        `desde_mes` ('AAAA-MM'; vacío = todos) más el de fechas inválidas, y
+        devuelve (registros vivos de esos meses, offset leído).
+        """
+        archivados = set(segmentos(filename))
+        meses = self.meses.setdefault(filename, {})
+
+        def abierto(mes):
+            return mes not in archivados and (mes == '' or mes >= desde_mes)
+
+        for mes in [m for m in meses if abierto(m)]:
+            del meses[mes]
+        registros, offset = leer_vivos(filename)
+        return [r for r in registros if abierto(periodo(r.fecha))], offset
+
+    def _sumar(self, filename, registros, tbl):
+        meses = self.meses.setdefault(filename, {})
+        for r in registros:
+            sumas = meses.setdefault(periodo(r.fecha), {})
+            for cuenta, impuesto, importe in importes_por_cuenta(r, IMPUESTOS[filename], tbl):
+                if importe:
+                    clave = (cuenta, impuesto)
+                    sumas[clave] = sumas.get(clave, 0) + importe
+
+    def _guardar(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((self.versiones, self.filas_tasas, self.meses), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+
+    def filas(self, desde='', hasta=''):
+        """
+        Lista ordenada de (mes, cuenta, impuesto, centavos) para los meses
+        'AAAA-MM' entre `desde` y `hasta` (inclusive; vacío = sin límite).
+        Los movimientos con fecha inválida van en el mes ''.
+        """
+        totales = {}
+        for meses in self.meses.values():
+            for mes, sumas in meses.items():
+                if (desde and mes < desde) or (hasta and mes > hasta):
+                    continue
+                for (cuenta, impuesto), importe in sumas.items():
+                    clave = (mes, cuenta, impuesto)
+                    totales[clave] = totales.get(clave, 0) + importe
+        return [(*clave, importe) for clave, importe in sorted(totales.items())]
+
+    def exportar_csv(self, ruta_csv, desde='', hasta=''):
+        """Graba el reporte en `ruta_csv`. Devuelve la cantidad de filas."""
+        filas = self.filas(desde, hasta)
+        with open(ruta_csv, 'w', encoding='utf-8', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(['Mes', 'Cuenta', 'Impuesto', 'Importe'])
+            for mes, cuenta, impuesto, importe in filas:
+                w.writerow([mes, cuenta, impuesto, a_pesos(importe)])
+        return len(filas)
+
+
+_reporte = None
+
+def obtener():
+    """Reporte compartido, al día con cobros.txt y pagos.txt."""
+    global _reporte
+    if _reporte is None:
+        _reporte = ReporteImpuestos()
+    else:
+        _reporte.refrescar()
+    return _reporte
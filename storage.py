@@ -1,7 +1,10 @@
 # storage.py
 
-import os, ast
+import os, ast, sys, re, gzip, heapq
+from concurrent.futures import ProcessPoolExecutor
 from model import cobro, pago, cliente
+from money import a_centavos
+from fechas import periodo, parse_fecha
 
 def ensure_data_directory():
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
@@ -10,89 +13,682 @@ def ensure_data_directory():
 
 # — IDs ——————————————————————————
 
-def get_next_cobro_id():
-    path = os.path.join(ensure_data_directory(), 'cobros.txt')
+def _siguiente_id(filename):
+    path = os.path.join(ensure_data_directory(), filename)
+    archivados = sum(cantidad for cantidad, _ in _load_segmentos().get(filename, {}).values())
     if not os.path.exists(path):
-        return 1
-    return len([l for l in open(path,'r',encoding='utf-8') if l.strip()]) + 1
+        return archivados + 1
+    return len([l for l in open(path,'r',encoding='utf-8') if l.strip()]) + archivados + 1
+
+def get_next_cobro_id():
+    return _siguiente_id('cobros.txt')
 
 def get_next_pago_id():
-    path = os.path.join(ensure_data_directory(), 'pagos.txt')
-    if not os.path.exists(path):
-        return 1
-    return len([l for l in open(path,'r',encoding='utf-8') if l.strip()]) + 1
+    return _siguiente_id('pagos.txt')
 
 def get_next_clients_id():
-    path = os.path.join(ensure_data_directory(), 'clientes.txt')
+    return _siguiente_id('clientes.txt')
+
+# — Entidades ——————————————————————
+
+# Cada archivo de datos guarda una tupla por línea; el tipo de registro
+# que la representa en memoria sale de esta tabla.
+ENTIDADES = {
+    'cobros.txt':   cobro,
+    'pagos.txt':    pago,
+    'clientes.txt': cliente,
+}
+
+# — Textos repetidos (diccionario en disco) ————————
+#
+# Las columnas con pocos valores distintos (cuentas, conceptos, nombres,
+# parcelas, tipo de comprobante) se graban como un entero que apunta a
+# <archivo>_dic.txt, donde cada texto aparece una sola vez como
+# (código, 'texto'). Las líneas viejas, con el texto completo, se siguen
+# leyendo igual. Al leer, cada texto distinto de estas columnas existe una
+# sola vez en memoria (sale del diccionario o se interna).
+
+CODIFICADOS = {
+    'cobros.txt': (
+        'nombreCompleto', 'numParcela',
+        'imputacion1', 'concepto1', 'imputacion2', 'concepto2',
+        'imputacion3', 'concepto3', 'numCuentaA', 'numCuentaB',
+    ),
+    'pagos.txt': (
+        'razonSocial', 'tipoComprobante', 'numCuenta', 'cuentaAcreditar',
+    ),
+}
+
+_diccionarios = {}
+
+def _dic_path(filename):
+    return os.path.join(ensure_data_directory(), filename.replace('.txt', '_dic.txt'))
+
+def _diccionario(filename):
+    """
+    Diccionario en memoria de `filename` ({'valores': [...], 'codigos': {...}}),
+    sincronizado con lo que haya en su archivo _dic.txt.
+    """
+    path = _dic_path(filename)
+    tam = os.path.getsize(path) if os.path.exists(path) else 0
+    dic = _diccionarios.get(path)
+    if dic is None or tam < dic['offset']:
+        dic = _diccionarios[path] = {'valores': [], 'codigos': {}, 'offset': 0}
+    if tam > dic['offset']:
+        with open(path, 'rb') as f:
+            f.seek(dic['offset'])
+            datos = f.read()
+        fin = datos.rfind(b"\n") + 1
+        for l in datos[:fin].decode('utf-8').splitlines():
+            if not l.strip():
+                continue
+            cod, texto = ast.literal_eval(l)
+            texto = sys.intern(texto)
+            dic['valores'].append(texto)
+            dic['codigos'][texto] = cod
+        dic['offset'] += fin
+    return dic
+
+def _indices(tipo, campos):
+    return [tipo.__slots__.index(c) for c in campos]
+
+def _codificar(filename, tuplas):
+    """
+    Reemplaza los textos de las columnas CODIFICADOS por su código. Los
+    textos nuevos se agregan primero al _dic.txt, así ninguna línea de
+    datos apunta a un código que no esté grabado.
+    """
+    campos = CODIFICADOS.get(filename)
+    if not campos:
+        return tuplas
+    idx = _indices(ENTIDADES[filename], campos)
+    dic = _diccionario(filename)
+    codigos = dic['codigos']
+    nuevos = {}
+    resultado = []
+    for t in tuplas:
+        t = list(t)
+        for i in idx:
+            texto = t[i]
+            if not isinstance(texto, str) or not texto:
+                continue
+            cod = codigos.get(texto)
+            if cod is None:
+                cod = nuevos.get(texto)
+                if cod is None:
+                    cod = nuevos[texto] = len(dic['valores']) + len(nuevos)
+            t[i] = cod
+        resultado.append(tuple(t))
+    if nuevos:
+        path = _dic_path(filename)
+        with open(path, 'a', encoding='utf-8') as f:
+            for texto, cod in nuevos.items():
+                f.write(repr((cod, texto)) + "\n")
+        _diccionario(filename)
+    return resultado
+
+def _lector(filename):
+    """
+    Devuelve una función tupla leída → registro, que decodifica los textos
+    del diccionario y pasa a centavos los importes viejos grabados en
+    pesos (float).
+    """
+    tipo = ENTIDADES[filename]
+    idx_cod = _indices(tipo, CODIFICADOS.get(filename, ()))
+    idx_imp = _indices(tipo, tipo.IMPORTES)
+    valores = _diccionario(filename)['valores'] if idx_cod else None
+    intern = sys.intern
+
+    def leer(tupla):
+        t = list(tupla)
+        for i in idx_cod:
+            v = t[i]
+            t[i] = valores[v] if isinstance(v, int) else intern(v)
+        for i in idx_imp:
+            if not isinstance(t[i], int):
+                t[i] = a_centavos(t[i])
+        return tipo(*t)
+    return leer
+
+# — Lectura en bloques ————————————————————
+#
+# Los archivos grandes se parten en bloques que empiezan y terminan en un
+# salto de línea, y cada bloque se interpreta en un proceso aparte. Los
+# resultados se juntan en el orden original. Por debajo de
+# PARALELO_MIN_BYTES se lee todo en el proceso actual, que sale más barato
+# que levantar el pool.
+
+PARALELO_MIN_BYTES = 4 * 1024 * 1024
+
+def _fin_ultima_linea(path, desde, hasta):
+    """Posición justo después del último salto de línea entre `desde` y `hasta`."""
+    with open(path, 'rb') as f:
+        pos = hasta
+        while pos > desde:
+            ini = max(desde, pos - 65536)
+            f.seek(ini)
+            datos = f.read(pos - ini)
+            i = datos.rfind(b"\n")
+            if i != -1:
+                return ini + i + 1
+            pos = ini
+    return desde
+
+def _linea_final_completa(path, ini, fin):
+    """¿El tramo [ini, fin) de `path` (una última línea sin salto) es un registro entero?"""
+    with open(path, 'rb') as f:
+        f.seek(ini)
+        datos = f.read(fin - ini)
+    if not datos.strip():
+        return False
+    try:
+        ast.literal_eval(datos.decode('utf-8'))
+    except (SyntaxError, ValueError, UnicodeDecodeError):
+        return False
+    return True
+
+def _fin_lectura(path, desde, completo):
+    """
+    Hasta dónde leer `path` desde `desde`: la última línea completa. Una
+    última línea sin salto puede estar a medio escribir y se deja para la
+    próxima lectura incremental; en una lectura completa (`completo`) se
+    incluye si ya es un registro entero.
+    """
+    tam = os.path.getsize(path)
+    fin = _fin_ultima_linea(path, desde, tam)
+    if completo and fin < tam and _linea_final_completa(path, fin, tam):
+        return tam
+    return fin
+
+def terminar_ultima_linea(filename):
+    """
+    Si el archivo vivo termina en un registro entero sin salto de línea
+    (por ejemplo, editado a mano), le agrega el salto para que los
+    lectores incrementales lo tomen. Devuelve True si lo agregó.
+    """
+    path = os.path.join(ensure_data_directory(), filename)
     if not os.path.exists(path):
-        return 1
-    return len([l for l in open(path,'r',encoding='utf-8') if l.strip()]) + 1
+        return False
+    tam = os.path.getsize(path)
+    fin = _fin_ultima_linea(path, 0, tam)
+    if fin == tam or not _linea_final_completa(path, fin, tam):
+        return False
+    with open(path, 'ab') as f:
+        f.write(b"\n")
+    return True
 
-# — Guardar cobros ———————————————————
+def dividir_en_bloques(path, desde, hasta, n_bloques):
+    """
+    Parte el rango [desde, hasta) de `path` en hasta `n_bloques` tramos
+    [(ini, fin), ...] que empiezan siempre al comienzo de una línea.
+    """
+    paso = max(1, (hasta - desde) // max(1, n_bloques))
+    cortes = [desde]
+    with open(path, 'rb') as f:
+        for k in range(1, n_bloques):
+            f.seek(desde + k * paso)
+            f.readline()
+            pos = f.tell()
+            if pos >= hasta:
+                break
+            if pos > cortes[-1]:
+                cortes.append(pos)
+    cortes.append(hasta)
+    return list(zip(cortes[:-1], cortes[1:]))
 
-def save_cobros(cobros_tuple):
+def parsear_bloque(args):
+    """(path, ini, fin) → lista de tuplas de las líneas de ese tramo."""
+    path, ini, fin = args
+    with open(path, 'rb') as f:
+        f.seek(ini)
+        datos = f.read(fin - ini)
+    return [ast.literal_eval(l) for l in datos.decode('utf-8').splitlines() if l.strip()]
+
+def mapear_bloques(funcion, path, desde=0, extra=(), hasta=None):
+    """
+    Aplica `funcion((path, ini, fin, *extra))` a cada bloque de `path`
+    desde `desde` hasta `hasta` (por defecto, la última línea completa), en
+    procesos aparte si el rango es grande. `funcion` tiene que ser de nivel
+    de módulo (se manda a otro proceso). Devuelve (resultados en orden, fin).
     """
-    Graba la tupla de 20 campos en cobros.txt
+    if hasta is None:
+        hasta = _fin_ultima_linea(path, desde, os.path.getsize(path))
+    fin = hasta
+    procesos = os.cpu_count() or 1
+    if fin - desde < PARALELO_MIN_BYTES or procesos < 2:
+        return [funcion((path, desde, fin, *extra))], fin
+    bloques = dividir_en_bloques(path, desde, fin, procesos)
+    with ProcessPoolExecutor(max_workers=procesos) as ex:
+        resultados = list(ex.map(funcion, [(path, ini, f, *extra) for ini, f in bloques]))
+    return resultados, fin
+
+def _leer_tuplas(path, desde=0, completo=False):
+    """
+    Tuplas crudas de `path` desde `desde` hasta la última línea completa
+    (ver _fin_lectura). Devuelve (tuplas, fin).
+    """
+    hasta = _fin_lectura(path, desde, completo)
+    partes, fin = mapear_bloques(parsear_bloque, path, desde, hasta=hasta)
+    return [t for parte in partes for t in parte], fin
+
+# — Registros (cobros / pagos / clientes) ——————————
+
+def load_records(filename):
+    """
+    Lee `filename` y devuelve la lista de registros (cobro, pago o cliente).
+    """
+    path = os.path.join(ensure_data_directory(), filename)
+    if not os.path.exists(path):
+        return []
+    leer = _lector(filename)
+    tuplas, _ = _leer_tuplas(path, completo=True)
+    return [leer(t) for t in tuplas]
+
+def save_records(filename, registros):
+    """
+    Agrega los registros al final de `filename`.
     """
     try:
-        path = os.path.join(ensure_data_directory(), 'cobros.txt')
+        tuplas = _codificar(filename, [r.to_tuple() for r in registros])
+        path = os.path.join(ensure_data_directory(), filename)
         with open(path, 'a', encoding='utf-8') as f:
-            for c in cobros_tuple:
-                record = (
-                    c.id, c.fecha, c.nombreCompleto, c.numParcela,
-                    c.imputacion1, c.concepto1, c.importeBruto1,
-                    c.imputacion2, c.concepto2, c.importeBruto2,
-                    c.imputacion3, c.concepto3, c.importeBruto3,
-                    c.numCuentaA, c.montoA, c.numCuentaB, c.montoB,
-                    c.impuestoDBCRb, c.anticipoIIBB, c.iva, c.observaciones
-                )
-                f.write(repr(record) + "\n")
+            for t in tuplas:
+                f.write(repr(t) + "\n")
         return True
     except Exception as e:
-        print("Error saving cobros:", e)
+        print(f"Error saving {filename}:", e)
         return False
 
+def save_records_bulk(filename, lotes):
+    """
+    Agrega al final de `filename` todos los registros de `lotes` (un
+    iterable de listas de registros, que puede ir generándose mientras se
+    escribe). Es todo o nada: si falla algo, incluida una excepción del
+    propio iterable, el archivo se trunca al tamaño que tenía y la
+    excepción se propaga. Devuelve la cantidad de registros grabados.
+    """
+    return save_records_transaccion({filename: lotes})[filename]
+
+def save_records_transaccion(altas):
+    """
+    Como save_records_bulk pero para varios archivos a la vez
+    ({filename: lotes}): si falla cualquiera, todos vuelven a su tamaño
+    original. Devuelve {filename: cantidad grabada}.
+    """
+    tam_original = {}
+    totales = {}
+    try:
+        for filename, lotes in altas.items():
+            path = os.path.join(ensure_data_directory(), filename)
+            tam_original[path] = os.path.getsize(path) if os.path.exists(path) else 0
+            totales[filename] = 0
+            with open(path, 'a', encoding='utf-8', buffering=1 << 20) as f:
+                for lote in lotes:
+                    tuplas = _codificar(filename, [r.to_tuple() for r in lote])
+                    f.write(''.join(repr(t) + "\n" for t in tuplas))
+                    totales[filename] += len(tuplas)
+    except BaseException:
+        for path, tam in tam_original.items():
+            if os.path.exists(path):
+                with open(path, 'r+b') as f:
+                    f.truncate(tam)
+        raise
+    return totales
+
+def rewrite_records(filename, registros):
+    """
+    Reescribe completamente `filename` con la lista de registros. Se
+    escribe en un archivo temporal que reemplaza al original de una vez:
+    si algo falla, el archivo queda como estaba.
+    """
+    tuplas = _codificar(filename, [r.to_tuple() for r in registros])
+    path = os.path.join(ensure_data_directory(), filename)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for t in tuplas:
+            f.write(repr(t) + "\n")
+    os.replace(path + '.tmp', path)
+    _bump_generacion(filename)
+
+def rewrite_tuples(filename, tuplas):
+    """
+    Reescribe `filename` (plan de cuentas, tablas de impuestos u otro
+    archivo de tuplas sin codificar) con `tuplas`.
+    """
+    path = os.path.join(ensure_data_directory(), filename)
+    with open(path, 'w', encoding='utf-8') as f:
+        for t in tuplas:
+            f.write(repr(t) + "\n")
+    _bump_generacion(filename)
+
+# — Versiones de archivos ——————————————————
+#
+# Cada archivo de datos tiene una "generación" que sólo cambia cuando se
+# reescribe (edición o borrado). Mientras la generación no cambie, el
+# archivo sólo pudo crecer por el final, y quien tenga datos derivados
+# (snapshots, índices, reportes) puede leer únicamente lo agregado.
+
+VERSIONES_FILE = '_versiones.txt'
+
+def _load_generaciones():
+    path = os.path.join(ensure_data_directory(), VERSIONES_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        contenido = f.read().strip()
+    return ast.literal_eval(contenido) if contenido else {}
+
+def _bump_generacion(filename):
+    gens = _load_generaciones()
+    gens[filename] = gens.get(filename, 0) + 1
+    path = os.path.join(ensure_data_directory(), VERSIONES_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(repr(gens) + "\n")
+
+def version_archivo(filename):
+    """
+    Devuelve (generación, tamaño en bytes) de `filename`, contando los
+    períodos archivados. Si la generación es la misma que antes y el
+    tamaño creció, sólo hubo altas al final.
+    """
+    path = os.path.join(ensure_data_directory(), filename)
+    tam = os.path.getsize(path) if os.path.exists(path) else 0
+    return (_load_generaciones().get(filename, 0), _bytes_archivados(filename) + tam)
+
+def leer_desde(filename, offset=0):
+    """
+    Lee los registros de `filename` a partir de la posición `offset` (en
+    bytes, al comienzo de una línea). Con offset 0 incluye primero los
+    períodos archivados. Devuelve (registros, nuevo_offset); una última
+    línea incompleta se deja para la próxima lectura.
+    """
+    base = _bytes_archivados(filename)
+    leer = _lector(filename)
+    registros = []
+    if offset < base:
+        for mes in segmentos(filename):
+            registros.extend(leer(ast.literal_eval(l)) for l in _lineas_segmento(filename, mes))
+        offset = base
+    path = os.path.join(ensure_data_directory(), filename)
+    if not os.path.exists(path):
+        return registros, base
+    tuplas, fin = _leer_tuplas(path, offset - base)
+    registros.extend(leer(t) for t in tuplas)
+    return registros, base + fin
+
+def leer_vivos(filename):
+    """
+    Registros del archivo vivo de `filename`, sin los períodos archivados
+    (meses cerrados). Devuelve (registros, nuevo_offset) como leer_desde.
+    """
+    return leer_desde(filename, _bytes_archivados(filename))
+
+def load_periodo(filename, desde=None, hasta=None):
+    """
+    Registros de `filename` con fecha entre `desde` y `hasta`
+    (datetime.date, inclusive; None = sin límite). De los períodos
+    archivados sólo se leen los meses que toca el rango. Sin límites
+    devuelve toda la historia, incluidos los registros con fecha inválida.
+    """
+    if desde is None and hasta is None:
+        return leer_desde(filename, 0)[0]
+    mes_desde = f'{desde.year:04d}-{desde.month:02d}' if desde else ''
+    mes_hasta = f'{hasta.year:04d}-{hasta.month:02d}' if hasta else '9999-99'
+    leer = _lector(filename)
+    registros = []
+    for mes in segmentos(filename):
+        if mes_desde <= mes <= mes_hasta:
+            registros.extend(leer(ast.literal_eval(l)) for l in _lineas_segmento(filename, mes))
+    registros.extend(load_records(filename))
+    resultado = []
+    for r in registros:
+        f = parse_fecha(r.fecha)
+        if f is not None and (desde is None or f >= desde) and (hasta is None or f <= hasta):
+            resultado.append(r)
+    return resultado
+
+# — Períodos archivados ——————————————————
+#
+# Los meses cerrados (ver cierre.py) salen de cobros.txt / pagos.txt y
+# pasan a un segmento comprimido data/archivo/<archivo>_AAAA-MM.txt.gz con
+# las mismas líneas, que ya no cambia. El archivo vivo queda con los
+# períodos abiertos y es lo único que leen las pantallas del día a día
+# (load_records). data/archivo/_segmentos.txt lleva, por archivo y mes,
+# (cantidad de registros, bytes sin comprimir).
+#
+# Para las lecturas incrementales (leer_desde / version_archivo) los
+# segmentos van delante del archivo vivo: las posiciones cuentan primero
+# los bytes de todos los segmentos, así que leer desde 0 trae toda la
+# historia y leer desde una posición posterior sólo lo nuevo del archivo
+# vivo. Archivar y desarchivar mueven las líneas byte a byte, así que el
+# tamaño total no cambia y tampoco la generación: los datos derivados
+# siguen valiendo sin reconstruirse. Por eso, antes de mover nada, todos
+# los lectores incrementales tienen que estar al día (cierre.py se ocupa).
+
+ARCHIVO_DIR = 'archivo'
+SEGMENTOS_FILE = '_segmentos.txt'
+
+# id y fecha al comienzo de una línea: (12, '05/03/2025', ...
+_RE_ID_FECHA = re.compile(rb"\(\s*(\d+)\s*,\s*'([^']*)'")
+
+def _archivo_path(nombre):
+    directorio = os.path.join(ensure_data_directory(), ARCHIVO_DIR)
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, nombre)
+
+def _load_segmentos():
+    path = os.path.join(ensure_data_directory(), ARCHIVO_DIR, SEGMENTOS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        contenido = f.read().strip()
+    return ast.literal_eval(contenido) if contenido else {}
+
+def _grabar_segmentos(segs):
+    path = _archivo_path(SEGMENTOS_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(repr(segs) + "\n")
+    os.replace(path + '.tmp', path)
+
+def segmentos(filename):
+    """Meses 'AAAA-MM' archivados de `filename`, ordenados."""
+    return sorted(_load_segmentos().get(filename, {}))
+
+def _bytes_archivados(filename):
+    return sum(tam for _, tam in _load_segmentos().get(filename, {}).values())
+
+def _segmento_path(filename, mes):
+    return _archivo_path(filename.replace('.txt', f'_{mes}.txt.gz'))
+
+def _lineas_segmento(filename, mes):
+    with gzip.open(_segmento_path(filename, mes), 'rt', encoding='utf-8') as f:
+        return [l for l in f if l.strip()]
+
+def _id_fecha(filename, linea):
+    """(id, fecha) de una línea cruda (bytes), sin interpretarla entera si se puede."""
+    m = _RE_ID_FECHA.match(linea)
+    if m:
+        return int(m.group(1)), m.group(2).decode('utf-8')
+    t = ast.literal_eval(linea.decode('utf-8'))
+    campos = ENTIDADES[filename].__slots__
+    id_reg = t[campos.index('id')]
+    return (id_reg if isinstance(id_reg, int) else 0), t[campos.index('fecha')]
+
+def _lineas_vivas(filename):
+    """Líneas crudas (bytes, con su fin de línea) del archivo vivo."""
+    path = os.path.join(ensure_data_directory(), filename)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+def _reemplazar_vivas(filename, lineas):
+    path = os.path.join(ensure_data_directory(), filename)
+    with open(path + '.tmp', 'wb') as f:
+        f.writelines(lineas)
+    os.replace(path + '.tmp', path)
+
+def archivar(filename, mes):
+    """
+    Pasa los registros de `mes` ('AAAA-MM') de `filename` a su segmento
+    comprimido y los quita del archivo vivo. Devuelve la cantidad archivada.
+    """
+    segs = _load_segmentos()
+    if mes in segs.get(filename, {}):
+        raise ValueError(f'{filename}: el período {mes} ya está archivado.')
+    terminar_ultima_linea(filename)
+    lineas = _lineas_vivas(filename)
+    del_mes, resto = [], []
+    for l in lineas:
+        # Las líneas en blanco y una última línea incompleta quedan en el vivo
+        if l.strip() and l.endswith(b"\n") and periodo(_id_fecha(filename, l)[1]) == mes:
+            del_mes.append(l)
+        else:
+            resto.append(l)
+    if not del_mes:
+        return 0
+
+    # Primero el segmento y el índice: si algo se corta a mitad, los
+    # registros quedan repetidos en el archivo vivo, nunca perdidos
+    seg_path = _segmento_path(filename, mes)
+    with gzip.open(seg_path + '.tmp', 'wb') as f:
+        f.writelines(del_mes)
+    os.replace(seg_path + '.tmp', seg_path)
+    segs.setdefault(filename, {})[mes] = (len(del_mes), sum(len(l) for l in del_mes))
+    _grabar_segmentos(segs)
+    _reemplazar_vivas(filename, resto)
+    return len(del_mes)
+
+def desarchivar(filename, mes):
+    """
+    Devuelve los registros archivados de `mes` al archivo vivo, en orden
+    de ID, y borra el segmento. Devuelve la cantidad recuperada.
+    """
+    segs = _load_segmentos()
+    if mes not in segs.get(filename, {}):
+        return 0
+    with gzip.open(_segmento_path(filename, mes), 'rb') as f:
+        recuperadas = f.read().splitlines(keepends=True)
+    terminar_ultima_linea(filename)
+    vivas = _lineas_vivas(filename)
+    # Una última línea incompleta (se está escribiendo) sigue al final
+    incompleta = [vivas.pop()] if vivas and not vivas[-1].endswith(b"\n") else []
+    clave = lambda l: _id_fecha(filename, l)[0] if l.strip() else 0
+    _reemplazar_vivas(filename, list(heapq.merge(vivas, recuperadas, key=clave)) + incompleta)
+    del segs[filename][mes]
+    _grabar_segmentos(segs)
+    os.remove(_segmento_path(filename, mes))
+    return len(recuperadas)
+
+LOTE_LECTURA = 5000
+
+def _lotes(lineas, leer, tam_lote):
+    lote = []
+    for l in lineas:
+        if not l.strip():
+            continue
+        try:
+            tupla = ast.literal_eval(l)
+        except (SyntaxError, ValueError):
+            # Una última línea sin salto puede estar a medio escribir
+            if l.endswith("\n"):
+                raise
+            continue
+        lote.append(leer(tupla))
+        if len(lote) >= tam_lote:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def iterar_registros(filename, tam_lote=LOTE_LECTURA):
+    """
+    Recorre toda la historia de `filename` (períodos archivados y archivo
+    vivo) en listas de hasta `tam_lote` registros, leyendo de a una línea:
+    nunca tiene más de un lote en memoria.
+    """
+    leer = _lector(filename)
+    for mes in segmentos(filename):
+        with gzip.open(_segmento_path(filename, mes), 'rt', encoding='utf-8') as f:
+            yield from _lotes(f, leer, tam_lote)
+    path = os.path.join(ensure_data_directory(), filename)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from _lotes(f, leer, tam_lote)
+
+# — Ediciones por ID ————————————————————
+#
+# Para corregir muchos registros sin interpretar el archivo entero: sólo
+# se leen y se reescriben las líneas de los IDs pedidos (el ID sale del
+# comienzo de la línea, ver _id_fecha); las demás se copian byte a byte.
+
+def registros_por_id(filename, ids):
+    """{id: registro} de los registros del archivo vivo con esos IDs."""
+    ids = set(ids)
+    leer = _lector(filename)
+    resultado = {}
+    for linea in _lineas_vivas(filename):
+        if not linea.strip():
+            continue
+        id_reg, _ = _id_fecha(filename, linea)
+        if id_reg in ids:
+            resultado[id_reg] = leer(ast.literal_eval(linea.decode('utf-8')))
+    return resultado
+
+def reemplazar_por_id(filename, registros):
+    """
+    Reescribe `filename` cambiando sólo las líneas de `registros` (las del
+    mismo ID). El archivo se reemplaza de una vez (o queda como estaba) y
+    cambia su generación. Lanza ValueError si algún ID no está en el
+    archivo vivo.
+    """
+    tuplas = _codificar(filename, [r.to_tuple() for r in registros])
+    nuevas = {int(r.id): (repr(t) + "\n").encode('utf-8') for r, t in zip(registros, tuplas)}
+    lineas = _lineas_vivas(filename)
+    pendientes = set(nuevas)
+    for i, linea in enumerate(lineas):
+        if not linea.strip():
+            continue
+        id_reg, _ = _id_fecha(filename, linea)
+        if id_reg in pendientes:
+            lineas[i] = nuevas[id_reg]
+            pendientes.discard(id_reg)
+    if pendientes:
+        raise ValueError(f'{filename}: no se encontraron los IDs {sorted(pendientes)[:10]}.')
+    _reemplazar_vivas(filename, lineas)
+    _bump_generacion(filename)
+
+def load_cobros():
+    return load_records('cobros.txt')
+
+def load_pagos():
+    return load_records('pagos.txt')
+
+def load_clients():
+    return load_records('clientes.txt')
+
+# — Guardar cobros ———————————————————
+
+def save_cobros(cobros_tuple):
+    """
+    Graba los cobros (21 campos) en cobros.txt
+    """
+    return save_records('cobros.txt', cobros_tuple)
+
 # — Guardar pagos ———————————————————
 
 def save_pagos(pagos_tuple):
     """
-    Graba la tupla de 9 campos en pagos.txt
+    Graba los pagos (10 campos) en pagos.txt
     """
-    try:
-        path = os.path.join(ensure_data_directory(), 'pagos.txt')
-        with open(path, 'a', encoding='utf-8') as f:
-            for p in pagos_tuple:
-                record = (
-                    p.id, p.fecha, p.razonSocial, p.concepto, p.tipoComprobante,
-                    p.numCuenta, p.montoNeto, p.iva, p.cuentaAcreditar, p.impuestoDBCRb
-                )
-                f.write(repr(record) + "\n")
-        return True
-    except Exception as e:
-        print("Error saving pagos:", e)
-        return False
+    return save_records('pagos.txt', pagos_tuple)
 
 # — Guardar clientes ——————————————————
 
 def save_clients(clients_tuple):
     """
-    Graba la tupla de 13 campos en clientes.txt
+    Graba los clientes (12 campos) en clientes.txt
     """
-    try:
-        path = os.path.join(ensure_data_directory(), 'clientes.txt')
-        with open(path, 'a', encoding='utf-8') as f:
-            for c in clients_tuple:
-                record = (
-                    c.id, c.nombreCompleto, c.DNI, c.direccion,
-                    c.telefono1, c.telefono2, c.email,
-                    c.parcela1, c.parcela2, c.parcela3,
-                    c.superficie, c.observaciones
-                )
-                f.write(repr(record) + "\n")
-        return True
-    except Exception as e:
-        print("Error saving clientes:", e)
-        return False
+    return save_records('clientes.txt', clients_tuple)
 
 # — Plan de Cuentas ——————————————————
 
@@ -110,39 +706,43 @@ def save_plan_cuentas(plan_tuple):
             f.write(repr(pc) + "\n")
     return True
 
+# Tablas impositivas con vigencia (ver tasas.py). Cada línea es
+#   (cuenta, %IIBB, %DByCR, desde, hasta)   en tax_cobros.txt
+#   (cuenta, %DByCR, desde, hasta)           en tax_pagos.txt (solo DByCR bancario)
+# con desde/hasta 'DD/MM/AAAA' o '' (sin límite). Las líneas sin fechas de
+# versiones anteriores valen desde siempre.
 TAX_COBROS_FILE = 'tax_cobros.txt'
-def load_tax_cobros():
-    path = os.path.join(ensure_data_directory(), TAX_COBROS_FILE)
-    tbl = {}
+TAX_PAGOS_FILE = 'tax_pagos.txt'
+TAX_PORCENTAJES = {TAX_COBROS_FILE: 2, TAX_PAGOS_FILE: 1}
+
+def load_tax_historial(filename):
+    """
+    Líneas de una tabla impositiva como (cuenta, (porcentajes...), desde,
+    hasta), en el orden del archivo.
+    """
+    n = TAX_PORCENTAJES[filename]
+    path = os.path.join(ensure_data_directory(), filename)
+    filas = []
     if os.path.exists(path):
         for l in open(path, 'r', encoding='utf-8'):
             if not l.strip(): continue
-            num, pct_iibb, pct_dbcr = ast.literal_eval(l)
-            tbl[str(num)] = (float(pct_iibb), float(pct_dbcr))
-    return tbl
+            t = ast.literal_eval(l)
+            desde, hasta = (t[n + 1:] + ('', ''))[:2]
+            filas.append((str(t[0]), tuple(float(x) for x in t[1:n + 1]), desde or '', hasta or ''))
+    return filas
 
 def save_tax_cobros(tax_tuple):
+    """Agrega (cuenta, %IIBB, %DByCR) o (cuenta, %IIBB, %DByCR, desde, hasta)."""
     path = os.path.join(ensure_data_directory(), TAX_COBROS_FILE)
     with open(path, 'a', encoding='utf-8') as f:
-        for num, pct_iibb, pct_dbcr in tax_tuple:
-            f.write(repr((num, pct_iibb, pct_dbcr)) + "\n")
+        for t in tax_tuple:
+            f.write(repr(tuple(t)) + "\n")
     return True
 
-# Para Pagos (solo DByCR bancario)
-TAX_PAGOS_FILE = 'tax_pagos.txt'
-def load_tax_pagos():
-    path = os.path.join(ensure_data_directory(), TAX_PAGOS_FILE)
-    tbl = {}
-    if os.path.exists(path):
-        for l in open(path, 'r', encoding='utf-8'):
-            if not l.strip(): continue
-            num, pct_dbcr = ast.literal_eval(l)
-            tbl[str(num)] = float(pct_dbcr)
-    return tbl
-
 def save_tax_pagos(tax_tuple):
+    """Agrega (cuenta, %DByCR) o (cuenta, %DByCR, desde, hasta)."""
     path = os.path.join(ensure_data_directory(), TAX_PAGOS_FILE)
     with open(path, 'a', encoding='utf-8') as f:
-        for num, pct_dbcr in tax_tuple:
-            f.write(repr((num, pct_dbcr)) + "\n")
+        for t in tax_tuple:
+            f.write(repr(tuple(t)) + "\n")
     return True
@@ -0,0 +1,167 @@
+# tasas.py
+#
+# Tasas impositivas con vigencia. tax_cobros.txt y tax_pagos.txt guardan
+# la historia de tasas de cada cuenta (ver storage.load_tax_historial):
+# una tasa rige desde su 'desde' hasta su 'hasta' o hasta el día anterior
+# a la tasa siguiente de la misma cuenta, lo que llegue antes. Para
+# cambiar una tasa basta agregar la nueva con su fecha de vigencia: la
+# anterior sigue valiendo para los registros viejos.
+#
+# El índice guarda, por cuenta, los intervalos ordenados por inicio (en
+# días ordinales), así que la tasa de (cuenta, fecha) sale con una
+# búsqueda binaria: O(log k) con k tasas de esa cuenta. Se arma una vez
+# por versión del archivo y lo comparten los formularios, las
+# importaciones y las expensas; como los formularios lo piden en cada
+# tecla, la versión es sólo el stat de la tabla (fecha de modificación,
+# tamaño e inodo), sin leer storage.version_archivo. vector() hace la misma
+# búsqueda para columnas enteras (NumPy) en los recálculos por lote, y
+# primer_cambio() dice desde qué día difieren dos tablas, para que los
+# acumulados recalculen sólo lo que el cambio toca.
+
+import os
+import bisect
+import datetime
+
+from columnar import np
+from fechas import parse_fecha
+from storage import ensure_data_directory, TAX_COBROS_FILE, TAX_PAGOS_FILE, load_tax_historial
+
+# Tasa de una cuenta sin tabla: (%IIBB, %DByCR) en cobros, %DByCR en pagos
+DEFECTO = {TAX_COBROS_FILE: (0.0, 0.0), TAX_PAGOS_FILE: 0.0}
+
+_SIN_LIMITE = datetime.date.max.toordinal()
+
+
+def dia(fecha):
+    """date, 'DD/MM/AAAA', día ordinal o None → día ordinal (hoy si no es una fecha válida)."""
+    if isinstance(fecha, int):
+        return fecha
+    if isinstance(fecha, datetime.date):
+        return fecha.toordinal()
+    f = parse_fecha(fecha) if fecha else None
+    return (f or datetime.date.today()).toordinal()
+
+
+class IndiceTasas:
+    """Intervalos de vigencia por cuenta: cuenta → (inicios, fines, tasas)."""
+
+    def __init__(self, filas, defecto):
+        self.filas = [tuple(f) for f in filas]
+        self.defecto = defecto
+        por_cuenta = {}
+        # El orden del archivo desempata dos tasas con el mismo 'desde'
+        for orden, (cuenta, pcts, desde, hasta) in enumerate(filas):
+            d, h = parse_fecha(desde), parse_fecha(hasta)
+            ini = d.toordinal() if d else 0
+            fin = h.toordinal() if h else _SIN_LIMITE
+            tasa = pcts if isinstance(defecto, tuple) else pcts[0]
+            por_cuenta.setdefault(cuenta.strip(), []).append((ini, orden, fin, tasa))
+
+        self.cuentas = {}
+        for cuenta, tramos in por_cuenta.items():
+            tramos.sort()
+            inicios, fines, tasas = [], [], []
+            for i, (ini, _, fin, tasa) in enumerate(tramos):
+                if i + 1 < len(tramos):
+                    fin = min(fin, tramos[i + 1][0] - 1)
+                if fin < ini:
+                    continue
+                inicios.append(ini)
+                fines.append(fin)
+                tasas.append(tasa)
+            self.cuentas[cuenta] = (inicios, fines, tasas)
+
+    def _tramo(self, cuenta, dia):
+        """(tasas, posición) del intervalo de `cuenta` que contiene `dia`, o None."""
+        tramos = self.cuentas.get(cuenta)
+        if tramos is None:
+            return None
+        inicios, fines, tasas = tramos
+        i = bisect.bisect_right(inicios, dia) - 1
+        if i >= 0 and dia <= fines[i]:
+            return tasas, i
+        return None
+
+    def tasa(self, cuenta, fecha=None):
+        """Tasa de `cuenta` vigente en `fecha` (por defecto, hoy)."""
+        tramo = self._tramo(str(cuenta).strip(), dia(fecha))
+        return tramo[0][tramo[1]] if tramo else self.defecto
+
+    def vigentes(self, fecha=None):
+        """{cuenta: tasa} de las cuentas con tasa vigente en `fecha`."""
+        d = dia(fecha)
+        resultado = {}
+        for cuenta in self.cuentas:
+            tramo = self._tramo(cuenta, d)
+            if tramo:
+                resultado[cuenta] = tramo[0][tramo[1]]
+        return resultado
+
+    def vector(self, diccionario, codigos, dias):
+        """
+        Tasas de muchas filas a la vez: `codigos` (array) son códigos de
+        cuenta de `diccionario` (columnar.Diccionario) y `dias` los días
+        ordinales de cada fila. Devuelve un array float (filas, porcentajes)
+        con la tasa vigente de cada fila (una columna en pagos).
+        """
+        if np is None:
+            raise RuntimeError('El cálculo de tasas por lote necesita NumPy.')
+        defecto = np.atleast_1d(np.array(self.defecto, float))
+        resultado = np.tile(defecto, (len(codigos), 1))
+        for cuenta, (inicios, fines, tasas) in self.cuentas.items():
+            cod = diccionario.codigos.get(cuenta)
+            if cod is None or not inicios:
+                continue
+            filas = np.flatnonzero(codigos == cod)
+            d = dias[filas]
+            i = np.searchsorted(np.array(inicios), d, side='right') - 1
+            dentro = i >= 0
+            dentro[dentro] = d[dentro] <= np.array(fines)[i[dentro]]
+            valores = np.array(tasas, float).reshape(len(tasas), len(defecto))
+            resultado[filas[dentro]] = valores[i[dentro]]
+        return resultado
+
+
+def primer_cambio(anterior, nuevo):
+    """
+    Primer día ordinal en el que alguna cuenta tiene distinta tasa en los
+    índices `anterior` y `nuevo`, o None si rigen las mismas tasas. Las
+    tasas sólo cambian en el inicio de un intervalo o el día siguiente a
+    su fin, así que basta comparar esos días.
+    """
+    primero = None
+    for cuenta in anterior.cuentas.keys() | nuevo.cuentas.keys():
+        bordes = {0}
+        for idx in (anterior, nuevo):
+            inicios, fines, _ = idx.cuentas.get(cuenta, ((), (), ()))
+            bordes.update(inicios)
+            bordes.update(f + 1 for f in fines if f < _SIN_LIMITE)
+        for d in sorted(bordes):
+            if primero is not None and d >= primero:
+                break
+            if anterior.tasa(cuenta, d) != nuevo.tasa(cuenta, d):
+                primero = d
+                break
+    return primero
+
+
+_indices = {}
+
+
+def _version(filename):
+    try:
+        st = os.stat(os.path.join(ensure_data_directory(), filename))
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def obtener(filename):
+    """Índice de `filename` (TAX_COBROS_FILE o TAX_PAGOS_FILE), al día."""
+    version = _version(filename)
+    actual = _indices.get(filename)
+    if actual is None or actual[0] != version:
+        actual = (version, IndiceTasas(load_tax_historial(filename), DEFECTO[filename]))
+        _indices[filename] = actual
+    return actual[1]
+
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+
+@pytest.fixture
+def datos(tmp_path, monkeypatch):
+    """
+    Directorio de datos vacío para la prueba: todos los módulos que usan
+    storage.ensure_data_directory pasan a usar `tmp_path`, y se vacían las
+    cachés en memoria (índices, snapshots, mayor) para no arrastrar nada
+    del directorio real.
+    """
+    original = storage.ensure_data_directory
+
+    def directorio():
+        return str(tmp_path)
+
+    for modulo in list(sys.modules.values()):
+        if getattr(modulo, 'ensure_data_directory', None) is original:
+            monkeypatch.setattr(modulo, 'ensure_data_directory', directorio)
+
+    import tasas
+    import columnar
+    import mayor
+    import indices
+    import impuestos
+    monkeypatch.setattr(storage, '_diccionarios', {})
+    monkeypatch.setattr(tasas, '_indices', {})
+    monkeypatch.setattr(columnar, '_snapshots', {})
+    monkeypatch.setattr(indices, '_indices', {})
+    monkeypatch.setattr(mayor, '_mayor', None)
+    impuestos._tasas_par.cache_clear()
+    return tmp_path
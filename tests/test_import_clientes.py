@@ -0,0 +1,38 @@
+import pytest
+
+from import_clientes import importar_clientes_desde_csv
+from storage import load_records
+
+ENCABEZADO = ',' * 11 + '\nNum,Nombre,DNI,Dir,Tel1,Tel2,email,P1,P2,P3,Sup,Obs\n'
+
+
+def _fila(num, nombre, dni, obs=''):
+    return f'{num},{nombre},{dni},Calle 1,,,,L{num},,,100,"{obs}"\n'
+
+
+def _importar(tmp_path, filas, **kw):
+    ruta = tmp_path / 'clientes.csv'
+    ruta.write_text(ENCABEZADO + ''.join(filas), encoding='latin-1')
+    return importar_clientes_desde_csv(str(ruta), progreso=lambda n: None, **kw)
+
+
+def test_repetido_en_el_csv_no_se_toma_por_ya_cargado(datos, capsys):
+    # Más de 1 MB de observaciones: los primeros lotes llegan al disco
+    # antes de filtrar el último
+    filas = [_fila(i, f'Cliente {i}', str(i), 'x' * 100000) for i in range(1, 13)]
+    filas.append(_fila(13, 'Cliente 1', '1'))
+    assert _importar(datos, filas, tam_lote=1) == 13
+    salida = capsys.readouterr().out
+    assert 'omitieron' not in salida
+    assert 'Cliente 1 (ID 13) repite' in salida
+
+    # Volver a importar el mismo CSV no agrega nada
+    assert _importar(datos, filas, tam_lote=1) == 0
+    assert len(load_records('clientes.txt')) == 13
+
+
+def test_numero_de_linea_con_campos_de_varias_lineas(datos):
+    filas = [_fila(1, 'Gomez Luis', '1', 'dos\nlíneas'), _fila(2, 'Diaz Eva', '2'), _fila(3, '', '3')]
+    with pytest.raises(ValueError, match='Línea 6:'):
+        _importar(datos, filas)
+    assert load_records('clientes.txt') == []
@@ -0,0 +1,29 @@
+import pytest
+
+from import_movimientos import parse_importe
+
+
+@pytest.mark.parametrize('texto, centavos', [
+    ('1.234,56', 123456),
+    ('1,234.56', 123456),
+    ('-1234.5', -123450),
+    ('$ 1.234', 123),
+    ('1.234.567', 123456700),
+    ('1,234,567', 123456700),
+    ('-$ 500', -50000),
+    ('', 0),
+])
+def test_parse_importe(texto, centavos):
+    assert parse_importe(texto) == centavos
+
+
+def test_parse_importe_con_separador_del_banco():
+    assert parse_importe('$ 1.234', decimal=',') == 123400
+    assert parse_importe('1,5', decimal=',') == 150
+    assert parse_importe('1,234', decimal='.') == 123400
+
+
+@pytest.mark.parametrize('texto', ['abc', '1.2.3,4,5', '12-3'])
+def test_parse_importe_invalido(texto):
+    with pytest.raises(ValueError):
+        parse_importe(texto)
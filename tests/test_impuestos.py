@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from impuestos import calcular_cobro, calcular_pago, repartir_cobro
+
+np = pytest.importorskip('numpy')
+
+# Porcentajes en la escala de diezmilésimos y fuera de ella
+PORCENTAJES = (0.0, 0.6, 1.2, 5.0, 3.5, 0.12345, 3.3333, 0.005, 0.00005, 12.3456789)
+
+
+def _montos(n, semilla):
+    azar = random.Random(semilla)
+    montos = [azar.randint(-10**9, 10**9) for _ in range(n)]
+    # Casos de borde del redondeo: medios centavos positivos y negativos
+    montos += [0, 1, -1, 5, -5, 50, -50, 12345, -12345, 10**12, -10**12]
+    return montos
+
+
+def test_cobro_escalar_igual_a_array():
+    azar = random.Random(7)
+    n = 2000
+    monto_a = _montos(n, 1)
+    monto_b = _montos(n, 2)
+    total = _montos(n, 3)
+    filas = len(monto_a)
+    tasa_a = [(azar.choice(PORCENTAJES), azar.choice(PORCENTAJES)) for _ in range(filas)]
+    tasa_b = [(azar.choice(PORCENTAJES), azar.choice(PORCENTAJES)) for _ in range(filas)]
+
+    dbcr, iibb, iva = calcular_cobro(
+        np.array(monto_a, np.int64), np.array(monto_b, np.int64), np.array(total, np.int64),
+        np.array(tasa_a).T, np.array(tasa_b).T,
+    )
+    for k in range(filas):
+        esperado = calcular_cobro(monto_a[k], monto_b[k], total[k], tasa_a[k], tasa_b[k])
+        assert (int(dbcr[k]), int(iibb[k]), int(iva[k])) == esperado, k
+
+
+@pytest.mark.parametrize('pct', PORCENTAJES)
+def test_cobro_un_porcentaje_para_todas_las_filas(pct):
+    montos = _montos(500, 4)
+    arr = np.array(montos, np.int64)
+    dbcr, iibb, _ = calcular_cobro(arr, arr, arr, (pct, pct), (0.0, pct))
+    for k, m in enumerate(montos):
+        esperado_dbcr, esperado_iibb, _ = calcular_cobro(m, m, m, (pct, pct), (0.0, pct))
+        assert int(dbcr[k]) == esperado_dbcr
+        assert int(iibb[k]) == esperado_iibb
+
+
+def test_pago_escalar_igual_a_array():
+    azar = random.Random(11)
+    netos = _montos(2000, 5)
+    pcts = [azar.choice(PORCENTAJES) for _ in netos]
+    iva, dbcr = calcular_pago(np.array(netos, np.int64), np.array(pcts))
+    for k, neto in enumerate(netos):
+        assert (int(iva[k]), int(dbcr[k])) == calcular_pago(neto, pcts[k])
+
+
+def test_reparto_suma_lo_grabado():
+    azar = random.Random(13)
+    monto_a, monto_b = _montos(500, 6), _montos(500, 7)
+    iibb = [azar.randint(-10**6, 10**6) for _ in monto_a]
+    dbcr = [azar.randint(-10**6, 10**6) for _ in monto_a]
+    tasa_a, tasa_b = (5.0, 0.6), (0.12345, 1.2)
+    arrays = repartir_cobro(np.array(monto_a, np.int64), np.array(monto_b, np.int64),
+                            np.array(iibb, np.int64), np.array(dbcr, np.int64), tasa_a, tasa_b)
+    for k in range(len(monto_a)):
+        partes = repartir_cobro(monto_a[k], monto_b[k], iibb[k], dbcr[k], tasa_a, tasa_b)
+        assert partes[0] + partes[2] == iibb[k]
+        assert partes[1] + partes[3] == dbcr[k]
+        assert tuple(int(a[k]) for a in arrays) == partes
+
+
+def test_reparto_exacto_si_no_cambiaron_las_tasas():
+    tasa_a, tasa_b = (5.0, 0.6), (3.5, 1.2)
+    dbcr, iibb, _ = calcular_cobro(1000000, 250050, 0, tasa_a, tasa_b)
+    iibb_a, dbcr_a, iibb_b, dbcr_b = repartir_cobro(1000000, 250050, iibb, dbcr, tasa_a, tasa_b)
+    assert (iibb_a, dbcr_a) == calcular_cobro(1000000, 0, 0, tasa_a, tasa_b)[1::-1]
+    assert (iibb_b, dbcr_b) == calcular_cobro(0, 250050, 0, tasa_a, tasa_b)[1::-1]
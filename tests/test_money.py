@@ -0,0 +1,23 @@
+import pytest
+
+from money import a_centavos
+
+
+@pytest.mark.parametrize('texto, centavos', [
+    ('1234.50', 123450),
+    ('150.000,00', 15000000),
+    ('1,234.50', 123450),
+    ('-3,25', -325),
+    ('0.005', 1),
+    ('', 0),
+    (None, 0),
+    (12.5, 1250),
+])
+def test_a_centavos(texto, centavos):
+    assert a_centavos(texto) == centavos
+
+
+@pytest.mark.parametrize('texto', ['abc', 'inf', '-Infinity', 'nan', 'sNaN', '1e30', '1e400'])
+def test_a_centavos_rechaza_no_finitos_y_enormes(texto):
+    with pytest.raises(ValueError):
+        a_centavos(texto)
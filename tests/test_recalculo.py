@@ -0,0 +1,167 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+import datetime  # noqa: E402
+
+import asientos  # noqa: E402
+import cierre  # noqa: E402
+import mayor  # noqa: E402
+import recalculo  # noqa: E402
+import reporte_impuestos  # noqa: E402
+from impuestos import impuestos_cobro, impuestos_pago  # noqa: E402
+from model import cobro, pago  # noqa: E402
+from storage import (  # noqa: E402
+    load_records, rewrite_records, save_records_bulk, save_tax_cobros, save_tax_pagos,
+)
+
+FECHAS = ('15/12/2024', '10/01/2025', '28/02/2025', '01/06/2025', '30/06/2025')
+CUENTAS = ('11-10-001', '11-10-002', '')
+
+
+def _cobros():
+    """Cobros grabados con los impuestos en cero."""
+    registros = []
+    for i in range(1, 61):
+        fecha = FECHAS[i % len(FECHAS)]
+        cuenta_a, cuenta_b = CUENTAS[i % 2], CUENTAS[(i + i // 2) % 3]
+        monto_a = 1000 * i + 55
+        monto_b = 777 * i if cuenta_b else 0
+        total = monto_a + monto_b
+        registros.append(cobro(i, fecha, f'Cliente {i}', f'P{i}', '21-60-003', 'Expensas', total,
+                               '', '', 0, '', '', 0, cuenta_a, monto_a, cuenta_b, monto_b,
+                               0, 0, 0, ''))
+    return registros
+
+
+def _mixtos():
+    """Cobros repartidos entre dos cuentas con tasas distintas."""
+    return [cobro(60 + i, fecha, f'Mixto {i}', f'M{i}', '21-60-003', 'Expensas', 300000 + i,
+                  '', '', 0, '', '', 0, '11-10-001', 100000, '11-10-002', 200000 + i,
+                  0, 0, 0, '')
+            for i, fecha in enumerate(('20/12/2024', '20/12/2024', '20/02/2025', '20/06/2025'), 1)]
+
+
+def _pagos():
+    return [pago(i, FECHAS[i % len(FECHAS)], f'Proveedor {i}', 'Servicio', 'FC', '21-10-060',
+                 1500 * i + 5, 0, CUENTAS[i % 2], 0)
+            for i in range(1, 41)]
+
+
+@pytest.fixture
+def con_tasas(datos):
+    save_tax_cobros([('11-10-001', 5.0, 0.6),
+                     ('11-10-001', 3.5, 1.2, '01/06/2025', ''),
+                     ('11-10-002', 0.12345, 0.6, '01/01/2025', '')])
+    save_tax_pagos([('11-10-001', 0.6, '01/01/2025', ''),
+                    ('11-10-002', 1.2, '01/02/2025', '')])
+    save_records_bulk('cobros.txt', [_cobros()])
+    save_records_bulk('pagos.txt', [_pagos()])
+    return datos
+
+
+def _esperado_cobro(c):
+    total = c.importeBruto1 + c.importeBruto2 + c.importeBruto3
+    return impuestos_cobro(c.numCuentaA, c.montoA, c.numCuentaB, c.montoB, total, c.fecha)
+
+
+def _mayor_reconstruido():
+    m = mayor.Mayor.__new__(mayor.Mayor)
+    m.path = mayor.Mayor().path + '.prueba'
+    m.oyentes = []
+    m._vaciar()
+    m.refrescar()
+    return m
+
+
+def _reporte_recalculado():
+    r = reporte_impuestos.ReporteImpuestos.__new__(reporte_impuestos.ReporteImpuestos)
+    r.path = reporte_impuestos.ReporteImpuestos().path + '.prueba'
+    r.versiones, r.filas_tasas, r.meses = {}, None, {}
+    r.refrescar()
+    return r
+
+
+def test_recalculo_de_cobros_ida_y_vuelta(con_tasas):
+    mayor.obtener()
+    r = recalculo.calcular('cobros.txt')
+    assert r.revisados == 60
+    for viejo, nuevo in r.cambios:
+        assert (nuevo.impuestoDBCRb, nuevo.anticipoIIBB, nuevo.iva) == _esperado_cobro(viejo)
+        assert nuevo.to_tuple()[:17] == viejo.to_tuple()[:17]
+
+    assert recalculo.aplicar(r) == len(r.cambios)
+    for c in load_records('cobros.txt'):
+        assert (c.impuestoDBCRb, c.anticipoIIBB, c.iva) == _esperado_cobro(c)
+    assert len(recalculo.calcular('cobros.txt')) == 0
+    assert mayor.obtener().totales == _mayor_reconstruido().totales
+
+
+def test_recalculo_de_pagos_ida_y_vuelta(con_tasas):
+    r = recalculo.calcular('pagos.txt')
+    assert len(r) == 40
+    assert recalculo.aplicar(r) == 40
+    for p in load_records('pagos.txt'):
+        assert (p.iva, p.impuestoDBCRb) == impuestos_pago(p.cuentaAcreditar, p.montoNeto, p.fecha)
+    assert len(recalculo.calcular('pagos.txt')) == 0
+
+
+def test_recalculo_por_rango_y_cuenta(con_tasas):
+    import datetime
+    r = recalculo.calcular('cobros.txt', desde=datetime.date(2025, 6, 1), cuenta='11-10-002')
+    assert r.cambios
+    for viejo, _ in r.cambios:
+        assert viejo.fecha in ('01/06/2025', '30/06/2025')
+        assert '11-10-002' in (viejo.numCuentaA, viejo.numCuentaB)
+
+
+def test_vista_previa_vieja_no_se_aplica(con_tasas):
+    r = recalculo.calcular('cobros.txt')
+    save_records_bulk('cobros.txt', [[cobro(61, '01/07/2025', 'Nuevo', 'P', '21-60-003', 'x', 100,
+                                            '', '', 0, '', '', 0, '11-10-001', 100, '', 0,
+                                            0, 0, 0, '')]])
+    with pytest.raises(ValueError):
+        recalculo.aplicar(r)
+    assert all(c.iva == 0 for c in load_records('cobros.txt'))
+
+
+def test_diario_sigue_a_la_tabla_de_tasas(con_tasas):
+    save_records_bulk('cobros.txt', [_mixtos()])
+    recalculo.aplicar(recalculo.calcular('cobros.txt'))
+    asientos.actualizar()
+    save_tax_cobros([('11-10-002', 2.0, 0.3, '01/02/2025', '')])
+    asientos.actualizar()
+    cobros = {c.id: c for c in load_records('cobros.txt')}
+    lineas = [l for l in asientos.leer_asientos() if l[1] == 'cobro']
+    assert sorted(lineas) == sorted(l for c in cobros.values() for l in asientos.asiento('cobros.txt', c))
+
+
+def test_cambio_de_tasas_no_mueve_meses_cerrados(con_tasas):
+    save_records_bulk('cobros.txt', [_mixtos()])
+    recalculo.aplicar(recalculo.calcular('cobros.txt'))
+    cierre.cerrar('2024-12', hoy=datetime.date(2025, 7, 1))
+    m, rep = mayor.obtener(), reporte_impuestos.obtener()
+    diario = [l for l in asientos.leer_asientos() if l[0].endswith('/12/2024')]
+    cerrado = rep.filas('2024-12', '2024-12')
+    saldos = {c: dict(d) for c, d in m.saldos.items()}
+
+    # Cambia el reparto desde antes del mes cerrado
+    save_tax_cobros([('11-10-002', 2.0, 0.3, '01/11/2024', '')])
+    m, rep = mayor.obtener(), reporte_impuestos.obtener()
+    asientos.actualizar()
+
+    assert rep.filas('2024-12', '2024-12') == cerrado
+    assert _reporte_recalculado().filas('2024-12', '2024-12') != cerrado
+    assert rep.filas('2025-01') == _reporte_recalculado().filas('2025-01')
+    assert [l for l in asientos.leer_asientos() if l[0].endswith('/12/2024')] == diario
+    nuevo, fin_cerrado = _mayor_reconstruido(), datetime.date(2024, 12, 31).toordinal()
+    for cuenta in set(saldos) | set(nuevo.saldos):
+        dias = m.saldos.get(cuenta, {})
+        assert {d: v for d, v in dias.items() if d <= fin_cerrado} == \
+            {d: v for d, v in saldos.get(cuenta, {}).items() if d <= fin_cerrado}
+        assert {d: v for d, v in dias.items() if d > fin_cerrado} == \
+            {d: v for d, v in nuevo.saldos.get(cuenta, {}).items() if d > fin_cerrado}
+
+    # Reescribir el archivo vivo tampoco recalcula los meses archivados
+    rewrite_records('cobros.txt', load_records('cobros.txt'))
+    assert reporte_impuestos.obtener().filas('2024-12', '2024-12') == cerrado
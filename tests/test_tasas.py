@@ -0,0 +1,99 @@
+import datetime
+
+import pytest
+
+import tasas
+from storage import TAX_PAGOS_FILE, rewrite_tuples, save_tax_pagos
+from tasas import IndiceTasas, dia, primer_cambio
+
+
+def _indice(*filas):
+    """Índice de pagos (una tasa por línea, 0.0 por defecto)."""
+    return IndiceTasas([(cuenta, (pct,), desde, hasta) for cuenta, pct, desde, hasta in filas], 0.0)
+
+
+def test_mismo_desde_gana_la_ultima_linea():
+    idx = _indice(('11-10-001', 1.0, '01/01/2025', ''),
+                  ('11-10-001', 2.0, '01/01/2025', ''))
+    assert idx.tasa('11-10-001', '31/12/2024') == 0.0
+    assert idx.tasa('11-10-001', '01/01/2025') == 2.0
+    assert idx.tasa('11-10-001', '01/01/2030') == 2.0
+
+
+def test_hasta_antes_de_la_tasa_siguiente_deja_un_hueco():
+    idx = _indice(('11-10-001', 1.0, '01/01/2025', '31/01/2025'),
+                  ('11-10-001', 2.0, '01/03/2025', ''))
+    assert idx.tasa('11-10-001', '01/01/2025') == 1.0
+    assert idx.tasa('11-10-001', '31/01/2025') == 1.0
+    assert idx.tasa('11-10-001', '01/02/2025') == 0.0
+    assert idx.tasa('11-10-001', '28/02/2025') == 0.0
+    assert idx.tasa('11-10-001', '01/03/2025') == 2.0
+
+
+def test_hasta_posterior_se_corta_en_la_tasa_siguiente():
+    idx = _indice(('11-10-001', 1.0, '01/01/2025', '31/12/2025'),
+                  ('11-10-001', 2.0, '01/06/2025', ''))
+    assert idx.tasa('11-10-001', '31/05/2025') == 1.0
+    assert idx.tasa('11-10-001', '01/06/2025') == 2.0
+    assert idx.tasa('11-10-001', '01/01/2026') == 2.0
+
+
+def test_lineas_sin_fecha_rigen_desde_siempre():
+    idx = _indice(('11-10-001', 1.0, '', ''),
+                  ('11-10-001', 2.0, '01/06/2025', ''),
+                  ('11-10-002', 3.0, '', ''))
+    assert idx.tasa('11-10-001', '01/01/1990') == 1.0
+    assert idx.tasa('11-10-001', '31/05/2025') == 1.0
+    assert idx.tasa('11-10-001', '01/06/2025') == 2.0
+    assert idx.tasa('11-10-002', '01/01/1990') == 3.0
+    assert idx.vigentes('01/01/2025') == {'11-10-001': 1.0, '11-10-002': 3.0}
+    assert idx.tasa('99-99-999', '01/01/2025') == 0.0
+
+
+def test_cobros_devuelve_el_par_y_el_defecto():
+    idx = IndiceTasas([('11-10-001', (5.0, 0.6), '01/01/2025', '')], (0.0, 0.0))
+    assert idx.tasa(' 11-10-001 ', datetime.date(2025, 1, 1)) == (5.0, 0.6)
+    assert idx.tasa('11-10-001', datetime.date(2024, 12, 31)) == (0.0, 0.0)
+
+
+def test_vector_igual_a_tasa():
+    np = pytest.importorskip('numpy')
+    from columnar import Diccionario
+    idx = _indice(('11-10-001', 1.0, '', ''),
+                  ('11-10-001', 2.0, '01/06/2025', '30/06/2025'),
+                  ('11-10-001', 3.0, '01/06/2025', '15/06/2025'),
+                  ('11-10-002', 4.0, '10/06/2025', ''))
+    dic = Diccionario()
+    cuentas = ['11-10-001', '11-10-002', '11-10-003']
+    for c in cuentas:
+        dic.codificar(c)
+    inicio = dia('25/05/2025')
+    filas = [(c, inicio + k) for c in cuentas for k in range(50)]
+    codigos = np.array([dic.codigos[c] for c, _ in filas])
+    dias = np.array([d for _, d in filas], np.int64)
+    vector = idx.vector(dic, codigos, dias)
+    assert [float(v) for v in vector[:, 0]] == [idx.tasa(c, d) for c, d in filas]
+
+
+def test_primer_cambio():
+    base = (('11-10-001', 1.0, '', ''), ('11-10-002', 2.0, '01/03/2025', '31/03/2025'))
+    assert primer_cambio(_indice(*base), _indice(*base)) is None
+    nuevo = _indice(*base, ('11-10-001', 1.5, '10/02/2025', ''))
+    assert primer_cambio(_indice(*base), nuevo) == dia('10/02/2025')
+    corrido = _indice(base[0], ('11-10-002', 2.0, '01/03/2025', '30/04/2025'))
+    assert primer_cambio(_indice(*base), corrido) == dia('01/04/2025')
+    assert primer_cambio(_indice(*base), _indice(('11-10-001', 3.0, '', ''))) == 0
+    # Misma tasa con otras líneas: no cambia nada
+    partido = _indice(('11-10-001', 1.0, '', '31/12/2024'), ('11-10-001', 1.0, '01/01/2025', ''),
+                      base[1])
+    assert primer_cambio(_indice(*base), partido) is None
+
+
+def test_obtener_sigue_al_archivo(datos):
+    assert tasas.obtener(TAX_PAGOS_FILE).tasa('11-10-001') == 0.0
+    save_tax_pagos([('11-10-001', 0.6)])
+    idx = tasas.obtener(TAX_PAGOS_FILE)
+    assert idx.tasa('11-10-001') == 0.6
+    assert tasas.obtener(TAX_PAGOS_FILE) is idx
+    rewrite_tuples(TAX_PAGOS_FILE, [('11-10-001', 1.2)])
+    assert tasas.obtener(TAX_PAGOS_FILE).tasa('11-10-001') == 1.2